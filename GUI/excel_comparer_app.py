@@ -5,13 +5,35 @@ import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import pandas as pd
+import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from ui_components import create_ui
-from excel_operations import read_excel_file, update_common_columns, select_multiple_sheets
+from excel_operations import probe_excel_file, show_excel_file, update_common_columns, select_multiple_sheets
 from excel_operations import select_sheet_for_file as ops_select_sheet, select_column_for_file as ops_select_column
 from report_generator import perform_comparison
+from file_model import FileEntry, ERROR_STATUS, source_names
+from core.cache import SheetCache
+from core.cancel import CancelToken
+from core.workbooks import WorkbookPool
+
+# الفترة بين تفريغ رسائل خيط المقارنة إلى الواجهة (بالمللي ثانية)
+MESSAGE_POLL_MS = 100
+
+# أقصى عدد أسطر في سجل العمليات (تُحذف الأسطر الأقدم)
+MAX_LOG_LINES = 5000
+
+# عدد خيوط تحميل الملفات المختارة (قراءة أسماء الأوراق وصف العناوين)
+LOAD_WORKERS = 4
+
+# الجزء من شريط التقدم الخاص بكل مرحلة من مراحل المقارنة (بداية ونهاية من 100)
+PROGRESS_STAGES = {
+    'read': (0, 70, "قراءة الملفات"),
+    'index': (70, 80, "مقارنة القيم"),
+    'write': (80, 100, "كتابة النتائج"),
+}
 
 class ExcelComparerApp:
     """تطبيق مقارنة ملفات الإكسل"""
@@ -22,35 +44,165 @@ class ExcelComparerApp:
         self.root.geometry("1000x700")  # زيادة حجم النافذة الرئيسية
         
         # متغيرات لتخزين البيانات
-        self.excel_files = []  # قائمة بمسارات الملفات
-        self.file_columns = {}  # قاموس للأعمدة في كل ملف
-        self.selected_columns = {}  # قاموس للأعمدة المختارة للمقارنة
-        self.file_sheets = {}  # قاموس لأوراق العمل في كل ملف
-        self.selected_sheets = {}  # قاموس لأوراق العمل المختارة
+        self.files = {}  # بيانات كل صف في جدول الملفات حسب رقمه (iid -> FileEntry)
+        self.main_item = None  # صف الملف الأساسي للمقارنة
         self.is_running = False  # حالة تشغيل المقارنة
-        self.main_file = None  # الملف الأساسي للمقارنة
+        self.cancel_token = None  # إشارة إيقاف المقارنة الجارية
+        self.sheet_cache = SheetCache()  # الذاكرة المؤقتة للأوراق المحللة (مشتركة مع سطر الأوامر)
+        self.workbooks = WorkbookPool()  # الملفات المفتوحة خلال الجلسة (يُفتح كل ملف مرة واحدة)
+        # رسائل السجل والتقدم من خيط المقارنة، تُفرغ في الخيط الرئيسي فقط لأن tkinter غير آمن للخيوط
+        self.messages = queue.Queue()
+        # تحميل الملفات المختارة في الخلفية: صفوف الملفات قيد التحميل، ورقم دفعة التحميل
+        # لتجاهل نتائج الملفات التي تم مسحها قبل انتهاء تحميلها
+        self.loader = ThreadPoolExecutor(max_workers=LOAD_WORKERS)
+        self.loading = set()
+        self.load_generation = 0
         
         # متغيرات Tkinter
         self.input_folder = tk.StringVar()
         self.output_file = tk.StringVar()
         self.common_column = tk.StringVar()
         self.use_same_column = tk.BooleanVar(value=True)
+        self.read_jobs = tk.IntVar(value=1)  # عدد العمليات المتوازية لقراءة الملفات
+        self.normalize_keys = tk.BooleanVar(value=False)  # توحيد قيم المقارنة (المسافات والحروف والأرقام)
         
         # إنشاء واجهة المستخدم
         create_ui(self)
+        self.root.after(MESSAGE_POLL_MS, self.process_messages)
         
         # طباعة رسالة ترحيبية
         self.log("مرحباً بك في برنامج مقارنة ملفات الإكسل!")
         self.log("يرجى اختيار الملفات أو المجلد للبدء.")
     
     def log(self, message):
-        """إضافة رسالة إلى سجل العمليات"""
-        self.log_text.configure(state="normal")
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state="disabled")
-        # تحديث الواجهة
-        self.root.update_idletasks()
+        """إضافة رسالة إلى سجل العمليات (يمكن استدعاؤها من أي خيط)"""
+        self.messages.put(('log', message))
+    
+    def report_progress(self, stage, done, total):
+        """تحديث شريط التقدم بمرحلة المقارنة وعدد الخطوات المنجزة فيها (يمكن استدعاؤها من أي خيط)"""
+        self.messages.put(('progress', (stage, done, total)))
+    
+    def process_messages(self):
+        """
+        تفريغ رسائل السجل والتقدم المتراكمة إلى الواجهة
+        
+        تُضاف جميع أسطر السجل المتراكمة في عملية إدراج واحدة، ويُطبق آخر تحديث
+        للتقدم فقط، ثم يُعاد جدولة التفريغ بعد MESSAGE_POLL_MS.
+        """
+        lines = []
+        progress = None
+        loaded = []
+        finished = []
+        while True:
+            try:
+                kind, value = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'log':
+                lines.append(f"{value}\n")
+            elif kind == 'progress':
+                progress = value
+            elif kind == 'loaded':
+                loaded.append(value)
+            else:
+                finished.append(value)
+        
+        if lines:
+            self.log_text.configure(state="normal")
+            self.log_text.insert(tk.END, "".join(lines))
+            # حذف الأسطر الأقدم حتى لا يبطئ السجل الطويل الواجهة
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - MAX_LOG_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.see(tk.END)
+            self.log_text.configure(state="disabled")
+        
+        if progress is not None:
+            self.show_progress(*progress)
+        
+        for value in loaded:
+            self.file_loaded(*value)
+        
+        for success, cancelled in finished:
+            self.show_result(success, cancelled)
+        
+        self.root.after(MESSAGE_POLL_MS, self.process_messages)
+    
+    def show_progress(self, stage, done, total):
+        """عرض التقدم الكلي من موقع المرحلة في PROGRESS_STAGES ونسبة الخطوات المنجزة فيها"""
+        start, end, label = PROGRESS_STAGES.get(stage, (0, 100, stage))
+        fraction = done / total if total else 1
+        self.progress['value'] = start + (end - start) * fraction
+        self.progress_label.config(text=f"{label} ({done}/{total})" if total > 1 else label)
+    
+    def add_file(self, entry):
+        """إضافة مدخل ملف كصف جديد في الجدول وإرجاع رقم الصف"""
+        item = self.files_tree.insert("", "end", values=entry.values())
+        self.files[item] = entry
+        return item
+    
+    def refresh_file(self, item):
+        """تحديث صف الملف في الجدول من بيانات مدخله"""
+        self.files_tree.item(item, values=self.files[item].values(item == self.main_item))
+    
+    def remove_file(self, item):
+        """حذف صف الملف ومدخله (مع إغلاق الملف إذا لم تعد أي ورقة منه في القائمة)"""
+        entry = self.files.pop(item)
+        self.loading.discard(item)
+        if item == self.main_item:
+            self.main_item = None
+        self.files_tree.delete(item)
+        if not any(other.path == entry.path for other in self.files.values()):
+            self.workbooks.close(entry.path)
+        return entry
+    
+    def clear_files(self):
+        """مسح جميع الملفات وتجاهل نتائج الملفات التي لم ينته تحميلها"""
+        self.load_generation += 1
+        self.loading = set()
+        self.workbooks.close_all()
+        self.files = {}
+        self.main_item = None
+        self.files_tree.delete(*self.files_tree.get_children())
+    
+    def load_files(self, file_paths, use_first_sheet=False):
+        """
+        إضافة الملفات إلى الجدول فوراً بحالة "جاري التحميل..." وتحميلها في الخلفية
+        
+        تُقرأ أسماء الأوراق وصف العناوين في خيوط التحميل (LOAD_WORKERS) باستخدام
+        الملفات المفتوحة للجلسة، وتُعرض نتيجة كل ملف عند انتهائه عبر file_loaded،
+        لذلك تبقى الواجهة متجاوبة أثناء تحميل الملفات الكبيرة.
+        """
+        for file_path in file_paths:
+            item = self.add_file(FileEntry(file_path))
+            self.loading.add(item)
+            self.loader.submit(self._load_file, self.load_generation, item, file_path, use_first_sheet)
+    
+    def _load_file(self, generation, item, file_path, use_first_sheet):
+        """تحميل ملف في خيط التحميل وإرسال النتيجة إلى الخيط الرئيسي"""
+        if generation != self.load_generation:
+            return
+        schema, error = probe_excel_file(file_path, self.workbooks)
+        self.messages.put(('loaded', (generation, item, use_first_sheet, schema, error)))
+    
+    def file_loaded(self, generation, item, use_first_sheet, schema, error):
+        """عرض نتيجة تحميل ملف في صفه من الجدول (في الخيط الرئيسي)"""
+        # الملف تم مسحه أو إزالته من القائمة قبل انتهاء تحميله
+        if generation != self.load_generation or item not in self.loading:
+            return
+        self.loading.discard(item)
+        
+        if error is not None:
+            entry = self.files[item]
+            entry.status = ERROR_STATUS
+            entry.error = error
+            self.refresh_file(item)
+            self.log(f"خطأ في قراءة الملف {entry.display_name}: {error}")
+        else:
+            show_excel_file(self, item, schema, use_first_sheet)
+        
+        if not self.loading:
+            self.log("تم الانتهاء من تحميل الملفات.")
     
     def select_files(self):
         """اختيار ملفات محددة"""
@@ -62,18 +214,12 @@ class ExcelComparerApp:
         if not files:
             return
             
-        # إضافة الملفات المختارة
-        for file_path in files:
-            if file_path not in self.excel_files:
-                self.excel_files.append(file_path)
-                self.input_folder.set(os.path.dirname(file_path))
-                
-                # محاولة قراءة الملف وعرض الأعمدة
-                try:
-                    read_excel_file(self, file_path)
-                except Exception as e:
-                    self.files_tree.insert("", "end", values=(os.path.basename(file_path), "خطأ", str(e), "-", "-"))
-                    self.log(f"خطأ في قراءة الملف {os.path.basename(file_path)}: {str(e)}")
+        # إضافة الملفات المختارة (غير الموجودة في القائمة) وتحميلها في الخلفية
+        existing = {entry.path for entry in self.files.values()}
+        new_files = [file_path for file_path in files if file_path not in existing]
+        if new_files:
+            self.input_folder.set(os.path.dirname(new_files[-1]))
+        self.load_files(new_files)
     
     def select_folder(self):
         """اختيار مجلد يحتوي على ملفات إكسل"""
@@ -92,28 +238,12 @@ class ExcelComparerApp:
             messagebox.showinfo("تنبيه", "لم يتم العثور على ملفات إكسل في المجلد المحدد.")
             return
             
-        # مسح الملفات الحالية
-        self.excel_files = []
-        self.file_columns = {}
-        self.selected_columns = {}
-        self.file_sheets = {}
-        self.selected_sheets = {}
-        self.files_tree.delete(*self.files_tree.get_children())
-        self.main_file = None  # إعادة تعيين الملف الأساسي
-        
-        # إضافة الملفات الجديدة
-        for file_path in excel_files:
-            self.excel_files.append(file_path)
-            
-            # محاولة قراءة الملف وعرض الأعمدة
-            try:
-                read_excel_file(self, file_path, use_first_sheet=True)
-            except Exception as e:
-                self.files_tree.insert("", "end", values=(os.path.basename(file_path), "خطأ", str(e), "-", "-"))
-                self.log(f"خطأ في قراءة الملف {os.path.basename(file_path)}: {str(e)}")
+        # مسح الملفات الحالية (مع إعادة تعيين الملف الأساسي)
+        self.clear_files()
         
-        # تحديث قائمة الأعمدة المشتركة
-        update_common_columns(self)
+        # إضافة الملفات الجديدة وتحميلها في الخلفية
+        # (تُحدث قائمة الأعمدة المشتركة عند انتهاء تحميل كل ملف)
+        self.load_files(excel_files, use_first_sheet=True)
     
     # إضافة الدوال المفقودة
     def select_sheet_for_file(self, event=None, file_path=None):
@@ -127,38 +257,16 @@ class ExcelComparerApp:
     def set_as_main_file(self):
         """تعيين الملف المحدد كملف أساسي للمقارنة"""
         selection = self.files_tree.selection()
-        if not selection:
-            return
-            
-        item = self.files_tree.item(selection[0])
-        file_name = item['values'][0]
-        
-        # البحث عن مسار الملف
-        file_path = None
-        for path in self.excel_files:
-            # التعامل مع الملفات العادية والملفات ذات المسار الافتراضي (للأوراق المتعددة)
-            if os.path.basename(path) == file_name or ("::" in path and file_name.endswith(path.split("::")[-1])):
-                file_path = path
-                break
-                
-        if not file_path:
+        if not selection or selection[0] not in self.files:
             return
         
-        # تحديث الملف الأساسي
-        self.main_file = file_path
-        
-        # تحديث العرض في الجدول
-        for item in self.files_tree.get_children():
-            current_values = self.files_tree.item(item)['values']
-            current_file_name = current_values[0]
-            
-            # تحديث حالة الملف (إضافة علامة للملف الأساسي)
-            if current_file_name == file_name:
-                self.files_tree.item(item, values=(current_values[0], "ملف أساسي", current_values[2], current_values[3], current_values[4]))
-            elif current_values[1] == "ملف أساسي":
-                self.files_tree.item(item, values=(current_values[0], "تم القراءة", current_values[2], current_values[3], current_values[4]))
+        # تحديث الملف الأساسي وصفه في الجدول وصف الملف الأساسي السابق
+        previous, self.main_item = self.main_item, selection[0]
+        if previous is not None:
+            self.refresh_file(previous)
+        self.refresh_file(self.main_item)
         
-        self.log(f"تم تعيين الملف '{file_name}' كملف أساسي للمقارنة")
+        self.log(f"تم تعيين الملف '{self.files[self.main_item].display_name}' كملف أساسي للمقارنة")
     
     def toggle_column_selection(self):
         """تبديل وضع اختيار العامود"""
@@ -166,9 +274,9 @@ class ExcelComparerApp:
             self.common_column_frame.pack(fill=tk.X, pady=5)
             # تحديث الأعمدة المختارة لجميع الملفات
             if self.common_column.get():
-                for file_path in self.excel_files:
-                    if file_path in self.file_columns and self.common_column.get() in self.file_columns[file_path]:
-                        self.selected_columns[file_path] = self.common_column.get()
+                for entry in self.files.values():
+                    if self.common_column.get() in entry.columns:
+                        entry.selected_column = self.common_column.get()
                 
                 # تحديث العرض
                 self.update_file_display()
@@ -177,42 +285,12 @@ class ExcelComparerApp:
     
     def update_file_display(self):
         """تحديث عرض الملفات في الجدول"""
-        for item in self.files_tree.get_children():
-            file_name = self.files_tree.item(item)['values'][0]
-            
-            # البحث عن مسار الملف
-            file_path = None
-            for path in self.excel_files:
-                # التعامل مع الملفات العادية والملفات ذات المسار الافتراضي (للأوراق المتعددة)
-                if os.path.basename(path) == file_name or ("::" in path and file_name.endswith(path.split("::")[-1])):
-                    file_path = path
-                    break
-            
-            if file_path:
-                selected_column = "لم يتم التحديد"
-                if file_path in self.selected_columns:
-                    selected_column = self.selected_columns[file_path]
-                elif self.use_same_column.get() and self.common_column.get():
-                    if file_path in self.file_columns and self.common_column.get() in self.file_columns[file_path]:
-                        selected_column = self.common_column.get()
-                        self.selected_columns[file_path] = selected_column
-                
-                selected_sheet = "الافتراضية"
-                if file_path in self.selected_sheets:
-                    selected_sheet = self.selected_sheets[file_path]
-                elif "::" in file_path:
-                    selected_sheet = file_path.split("::")[1]
-                
-                # تحديث حالة الملف (الحفاظ على علامة الملف الأساسي)
-                status = self.files_tree.item(item)['values'][1]
-                if file_path == self.main_file:
-                    status = "ملف أساسي"
-                elif status != "خطأ" and status != "ملف أساسي":
-                    status = "تم القراءة"
-                
-                # تحديث العرض
-                columns_text = self.files_tree.item(item)['values'][2]
-                self.files_tree.item(item, values=(file_name, status, columns_text, selected_column, selected_sheet))
+        common_column = self.common_column.get() if self.use_same_column.get() else None
+        for item, entry in self.files.items():
+            # العامود المشترك للملفات التي لم يُحدد لها عامود
+            if entry.selected_column is None and common_column and common_column in entry.columns:
+                entry.selected_column = common_column
+            self.refresh_file(item)
     
     def select_output_file(self):
         """اختيار ملف الإخراج"""
@@ -228,13 +306,7 @@ class ExcelComparerApp:
     def clear_all(self):
         """مسح جميع البيانات"""
         if messagebox.askyesno("تأكيد", "هل أنت متأكد من مسح جميع البيانات؟"):
-            self.excel_files = []
-            self.file_columns = {}
-            self.selected_columns = {}
-            self.file_sheets = {}
-            self.selected_sheets = {}
-            self.main_file = None  # إعادة تعيين الملف الأساسي
-            self.files_tree.delete(*self.files_tree.get_children())
+            self.clear_files()
             self.input_folder.set("")
             self.common_column.set("")
             self.common_column_combobox.config(state="disabled")
@@ -249,38 +321,25 @@ class ExcelComparerApp:
             return
             
         # التحقق من وجود ملفات في القائمة
-        if not self.files_tree.get_children():
+        if not self.files:
             messagebox.showwarning("تحذير", "لم يتم اختيار أي ملفات للمقارنة.")
             return
         
-        # جمع معلومات الملفات من القائمة المعروضة
-        files_info = []
-        for item in self.files_tree.get_children():
-            values = self.files_tree.item(item)['values']
-            file_name = values[0]
-            status = values[1]
-            selected_column = values[3]
-            
-            # تخطي الملفات التي بها خطأ
-            if status == "خطأ":
+        if self.loading:
+            messagebox.showwarning("تحذير", f"جاري تحميل {len(self.loading)} ملف. يرجى الانتظار حتى ينتهي التحميل.")
+            return
+        
+        # الملفات الصالحة للمقارنة بترتيب الجدول (بدون الملفات التي بها خطأ)
+        entries = []
+        for item, entry in self.files.items():
+            if entry.status == ERROR_STATUS:
                 continue
-                
-            # البحث عن مسار الملف
-            file_path = None
-            for path in self.excel_files:
-                if os.path.basename(path) == file_name or ("::" in path and file_name.endswith(path.split("::")[-1])):
-                    file_path = path
-                    break
-            
-            if file_path:
-                files_info.append({
-                    'name': file_name,
-                    'path': file_path,
-                    'column': selected_column,
-                    'is_main': (status == "ملف أساسي")
-                })
-        
-        if not files_info:
+            if entry.sheet is None:
+                self.log(f"تحذير: الملف '{entry.display_name}' يحتوي على أكثر من ورقة ولم يتم تحديد ورقة. سيتم تخطيه.")
+                continue
+            entries.append((item, entry))
+        
+        if not entries:
             messagebox.showwarning("تحذير", "لم يتم العثور على ملفات صالحة للمقارنة.")
             return
             
@@ -290,23 +349,20 @@ class ExcelComparerApp:
                 messagebox.showwarning("تحذير", "يرجى اختيار العامود المشترك للمقارنة.")
                 return
             
-            # تعيين العامود المشترك لجميع الملفات
-            comparison_column = self.common_column.get()
+            # العامود المشترك لجميع الملفات
+            key_columns = [self.common_column.get()]
+            file_key_columns = [key_columns for _ in entries]
         else:
             # التحقق من أن جميع الملفات لها عامود محدد
-            missing_columns = []
-            for file_info in files_info:
-                if file_info['column'] == "لم يتم التحديد":
-                    missing_columns.append(file_info['name'])
-            
+            missing_columns = [entry.display_name for _, entry in entries if not entry.key_columns]
             if missing_columns:
                 messagebox.showwarning("تحذير", f"يرجى تحديد عامود للمقارنة للملفات التالية:\n{', '.join(missing_columns)}")
                 return
-                
-            # إنشاء قاموس للأعمدة المختارة
-            comparison_column = {}
-            for file_info in files_info:
-                comparison_column[file_info['path']] = file_info['column']
+            
+            # أسماء أعمدة المفتاح في التقرير من الملف الأساسي إذا تم تحديده
+            file_key_columns = [entry.key_columns for _, entry in entries]
+            main_entry = self.files.get(self.main_item)
+            key_columns = main_entry.key_columns if main_entry is not None and main_entry.key_columns else None
         
         # التحقق من اسم ملف الإخراج
         output_file = self.output_file.get()
@@ -318,69 +374,74 @@ class ExcelComparerApp:
             output_file += '.xlsx'
             self.output_file.set(output_file)
         
-        # تعيين الملف الأساسي إذا تم تحديده
-        main_file_info = None
-        for file_info in files_info:
-            if file_info['is_main']:
-                main_file_info = file_info
-                break
+        # قائمة ملفات المقارنة من بيانات الصفوف مباشرة
+        names = source_names([entry for _, entry in entries])
+        sources = [
+            {'name': name, 'path': entry.path, 'sheet': entry.sheet, 'key_columns': columns, 'is_main': item == self.main_item}
+            for name, (item, entry), columns in zip(names, entries, file_key_columns)
+        ]
         
         # تعطيل الواجهة أثناء المعالجة
         self.is_running = True
         self.run_button.config(state="disabled")
-        self.progress.start()
+        self.cancel_button.config(state="normal")
+        self.progress['value'] = 0
+        self.progress_label.config(text="")
+        self.cancel_token = CancelToken()
         
         # تشغيل المقارنة في خيط منفصل
         thread = threading.Thread(
             target=perform_comparison, 
-            args=(self, comparison_column, output_file, main_file_info)
+            args=(self, sources, output_file, key_columns, self.read_jobs.get(), self.sheet_cache,
+                  self.normalize_keys.get(), self.report_progress, self.cancel_token)
         )
         thread.daemon = True
         thread.start()
     
-    def finish_comparison(self, success=True):
-        """إنهاء عملية المقارنة وإعادة تفعيل الواجهة"""
+    def cancel_comparison(self):
+        """
+        طلب إيقاف المقارنة الجارية
+        
+        لا يتم إيقاف الخيط بالقوة، بل تتوقف المقارنة عند أقرب نقطة تحقق (بعد كل ملف
+        أو دفعة صفوف) وتحذف ما كتبته جزئياً، ثم تُعرض النتيجة عبر finish_comparison.
+        """
+        if not self.is_running or self.cancel_token is None:
+            return
+        self.cancel_token.cancel()
+        self.cancel_button.config(state="disabled")
+        self.log("جاري إيقاف المقارنة...")
+    
+    def finish_comparison(self, success=True, cancelled=False):
+        """إنهاء عملية المقارنة (يمكن استدعاؤها من خيط المقارنة، وتُعرض النتيجة بعد رسائل السجل السابقة)"""
+        self.messages.put(('finish', (success, cancelled)))
+    
+    def show_result(self, success, cancelled=False):
+        """إعادة تفعيل الواجهة وعرض نتيجة المقارنة"""
         self.is_running = False
+        self.cancel_token = None
         self.run_button.config(state="normal")
-        self.progress.stop()
+        self.cancel_button.config(state="disabled")
+        if success:
+            self.progress['value'] = self.progress['maximum']
+        elif cancelled:
+            self.progress['value'] = 0
+        self.progress_label.config(text="")
         
         if success:
             messagebox.showinfo("اكتمال", f"تمت عملية المقارنة بنجاح وتم حفظ النتائج في:\n{self.output_file.get()}")
+        elif cancelled:
+            messagebox.showinfo("إلغاء", "تم إيقاف المقارنة ولم يتم إنشاء ملف النتائج.")
         else:
             messagebox.showerror("خطأ", "حدث خطأ أثناء عملية المقارنة. يرجى التحقق من سجل العمليات.")
     
     def remove_selected_file(self):
         """إزالة الملف المحدد من القائمة"""
         selection = self.files_tree.selection()
-        if not selection:
+        if not selection or selection[0] not in self.files:
             return
-            
-        item = self.files_tree.item(selection[0])
-        file_name = item['values'][0]
-        
-        # البحث عن مسار الملف وإزالته
-        for path in self.excel_files[:]:
-            # التعامل مع الملفات العادية والملفات ذات المسار الافتراضي (للأوراق المتعددة)
-            if os.path.basename(path) == file_name or ("::" in path and file_name.endswith(path.split("::")[-1])):
-                self.excel_files.remove(path)
-                if path in self.file_columns:
-                    del self.file_columns[path]
-                if path in self.selected_columns:
-                    del self.selected_columns[path]
-                if path in self.file_sheets:
-                    del self.file_sheets[path]
-                if path in self.selected_sheets:
-                    del self.selected_sheets[path]
-                
-                # إذا كان هذا هو الملف الأساسي، قم بإعادة تعيينه
-                if path == self.main_file:
-                    self.main_file = None
-                
-                break
-                
-        # إزالة العنصر من الجدول
-        self.files_tree.delete(selection[0])
-        self.log(f"تمت إزالة الملف: {file_name}")
+        
+        entry = self.remove_file(selection[0])
+        self.log(f"تمت إزالة الملف: {entry.display_name}")
         
         # تحديث قائمة الأعمدة المشتركة
         update_common_columns(self)
@@ -2,55 +2,73 @@
 # -*- coding: utf-8 -*-
 
 import os
-import pandas as pd
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 
-def read_excel_file(app, file_path, use_first_sheet=False):
-    """قراءة ملف إكسل وعرض الأعمدة"""
-    # قراءة أسماء أوراق العمل في الملف
-    xl = pd.ExcelFile(file_path)
-    sheet_names = xl.sheet_names
-    app.file_sheets[file_path] = sheet_names
+from core.ingest import probe_workbook, probe_sheet
+from file_model import FileEntry, READ_STATUS
+
+def probe_excel_file(file_path, pool):
+    """
+    قراءة أسماء أوراق العمل وصف العناوين للورقة الأولى فقط
+    (يتم تأجيل قراءة البيانات الكاملة إلى وقت المقارنة)
+    
+    تُستدعى من خيوط التحميل، لذلك لا تستخدم أي عنصر من عناصر الواجهة.
+    
+    القيمة المرجعة:
+    tuple: (مخطط الملف من probe_workbook، None) أو (None، وصف الخطأ)
+    """
+    try:
+        return probe_workbook(file_path, pool=pool), None
+    except Exception as e:
+        return None, str(e)
+
+def show_excel_file(app, item, schema, use_first_sheet=False):
+    """عرض أعمدة الملف في صفه من الجدول بعد انتهاء تحميله (في الخيط الرئيسي)"""
+    entry = app.files[item]
+    entry.sheet_names = schema['sheet_names']
+    entry.status = READ_STATUS
     
     # إذا كان هناك أكثر من ورقة ولم يتم تحديد استخدام الورقة الأولى
-    if len(sheet_names) > 1 and not use_first_sheet:
-        select_multiple_sheets(app, file_path=file_path)
+    # (يُستبدل صف الملف بصف لكل ورقة مختارة)
+    if len(entry.sheet_names) > 1 and not use_first_sheet:
+        app.refresh_file(item)
+        select_multiple_sheets(app, item=item)
     else:
-        # استخدم الورقة الأولى
-        selected_sheet = sheet_names[0]
-        app.selected_sheets[file_path] = selected_sheet
-        
-        # قراءة البيانات من الورقة المحددة
-        df = pd.read_excel(file_path, sheet_name=selected_sheet)
-        columns = df.columns.tolist()
-        app.file_columns[file_path] = columns
+        # استخدم الورقة الأولى وأعمدتها من صف العناوين
+        entry.sheet = entry.sheet_names[0]
+        sheet_info = schema['sheets'][entry.sheet]
+        entry.columns = sheet_info['columns']
+        app.refresh_file(item)
         
-        # إضافة الملف إلى الجدول
-        file_name = os.path.basename(file_path)
-        app.files_tree.insert("", "end", values=(file_name, "تم القراءة", ", ".join(columns[:3]) + "...", "لم يتم التحديد", selected_sheet))
-        
-        app.log(f"تمت إضافة الملف: {file_name} (الورقة: {selected_sheet})")
+        app.log(f"تمت إضافة الملف: {entry.display_name} (الورقة: {entry.sheet}، عدد الصفوف: {format_rows(sheet_info)})")
         
         # تحديث قائمة الأعمدة المشتركة
         update_common_columns(app)
 
+def format_rows(sheet_info):
+    """عدد صفوف الورقة من بيانات الملف الوصفية كنص"""
+    return sheet_info['rows'] if sheet_info['rows'] is not None else "غير معروف"
+
 def update_common_columns(app):
     """تحديث قائمة الأعمدة المشتركة بين جميع الملفات"""
-    if not app.file_columns:
+    column_lists = [entry.columns for entry in app.files.values() if entry.columns]
+    if not column_lists:
         return
         
     # الحصول على الأعمدة المشتركة
-    common_columns = set(next(iter(app.file_columns.values())))
+    common_columns = set(column_lists[0])
     
-    for columns in app.file_columns.values():
+    for columns in column_lists:
         common_columns &= set(columns)
     
     # تحديث قائمة الأعمدة المشتركة
     app.common_column_combobox['values'] = list(common_columns)
     
     if common_columns:
-        app.common_column.set(next(iter(common_columns)))
+        # الإبقاء على العامود الذي اختاره المستخدم إذا بقي مشتركاً بعد تحميل ملف جديد
+        if app.common_column.get() not in common_columns:
+            app.common_column.set(next(iter(common_columns)))
         app.common_column_combobox.config(state="readonly")
         app.log(f"تم العثور على {len(common_columns)} عامود مشترك بين جميع الملفات.")
     else:
@@ -58,37 +76,29 @@ def update_common_columns(app):
         app.common_column_combobox.config(state="disabled")
         app.log("لا توجد أعمدة مشتركة بين جميع الملفات.")
 
-def select_multiple_sheets(app, event=None, file_path=None):
-    """اختيار ورقة عمل أو أكثر لملف محدد"""
-    # إذا لم يتم تمرير مسار الملف، استخدم العنصر المحدد
-    if file_path is None:
+def select_multiple_sheets(app, event=None, item=None):
+    """اختيار ورقة عمل أو أكثر لملف محدد (صف الملف في الجدول أو الصف المحدد)"""
+    # إذا لم يتم تمرير صف الملف، استخدم العنصر المحدد
+    if item is None:
         selection = app.files_tree.selection()
         if not selection:
             return
-            
-        item = app.files_tree.item(selection[0])
-        file_name = item['values'][0]
-        
-        # البحث عن مسار الملف
-        file_path = None
-        for path in app.excel_files:
-            if os.path.basename(path) == file_name:
-                file_path = path
-                break
-                
-        if not file_path:
-            return
+        item = selection[0]
+    
+    entry = app.files.get(item)
+    if entry is None:
+        return
+    file_path = entry.path
     
     # التحقق من وجود أوراق عمل للملف
-    if file_path not in app.file_sheets:
+    if not entry.sheet_names:
         try:
-            xl = pd.ExcelFile(file_path)
-            app.file_sheets[file_path] = xl.sheet_names
+            entry.sheet_names = app.workbooks.sheet_names(file_path)
         except Exception as e:
             messagebox.showerror("خطأ", f"تعذر قراءة أوراق العمل: {str(e)}")
             return
     
-    sheet_names = app.file_sheets[file_path]
+    sheet_names = entry.sheet_names
     if not sheet_names:
         messagebox.showinfo("تنبيه", "لا توجد أوراق عمل في هذا الملف.")
         return
@@ -131,37 +141,26 @@ def select_multiple_sheets(app, event=None, file_path=None):
             messagebox.showinfo("تنبيه", "يرجى اختيار ورقة عمل واحدة على الأقل.")
             return
         
-        # مسح الملف الحالي من القائمة إذا كان موجوداً
-        original_file_name = os.path.basename(file_path)
-        for item in app.files_tree.get_children():
-            if app.files_tree.item(item)['values'][0] == original_file_name:
-                app.files_tree.delete(item)
-                break
-        
-        # إضافة كل ورقة مختارة كملف منفصل
+        # إضافة كل ورقة مختارة كملف منفصل (قراءة صف العناوين فقط من كل ورقة)
         for idx in selections:
             sheet = sheet_names[idx]
             try:
-                # قراءة البيانات من الورقة المحددة
-                df = pd.read_excel(file_path, sheet_name=sheet)
-                columns = df.columns.tolist()
-                
-                # إنشاء اسم فريد للملف مع ورقة العمل
-                display_name = f"{original_file_name} - {sheet}"
-                
-                # تخزين البيانات
-                virtual_path = f"{file_path}::{sheet}"  # استخدام مسار افتراضي لتمييز الورقة
-                app.excel_files.append(virtual_path)
-                app.file_columns[virtual_path] = columns
-                app.selected_sheets[virtual_path] = sheet
+                with app.workbooks.open(file_path) as xl:
+                    sheet_info = probe_sheet(xl, sheet)
                 
-                # إضافة إلى الجدول
-                app.files_tree.insert("", "end", values=(display_name, "تم القراءة", ", ".join(columns[:3]) + "...", "لم يتم التحديد", sheet))
+                # صف منفصل لكل ورقة يظهر فيه اسم الورقة مع اسم الملف
+                sheet_entry = FileEntry(file_path, sheet=sheet, sheet_names=sheet_names, columns=sheet_info['columns'],
+                                        status=READ_STATUS, per_sheet=True)
+                app.add_file(sheet_entry)
                 
-                app.log(f"تمت إضافة الملف: {display_name}")
+                app.log(f"تمت إضافة الملف: {sheet_entry.display_name} (عدد الصفوف: {format_rows(sheet_info)})")
             except Exception as e:
                 app.log(f"خطأ في قراءة الورقة '{sheet}': {str(e)}")
         
+        # مسح صف الملف الحالي بعد إضافة أوراقه، حتى يبقى الملف مفتوحاً لها ولا يُعاد فتحه
+        if item in app.files:
+            app.remove_file(item)
+        
         # تحديث قائمة الأعمدة المشتركة
         update_common_columns(app)
         popup.destroy()
@@ -197,19 +196,11 @@ def select_column_for_file(app, event=None):
     if not selection:
         return
         
-    item = app.files_tree.item(selection[0])
-    file_name = item['values'][0]
-    
-    # البحث عن مسار الملف
-    file_path = None
-    for path in app.excel_files:
-        if os.path.basename(path) == file_name or path.endswith(f"::{file_name.split(' - ')[-1]}"):
-            file_path = path
-            break
-            
-    if not file_path or file_path not in app.file_columns:
+    entry = app.files.get(selection[0])
+    if entry is None or not entry.columns:
         return
-        
+    file_name = entry.display_name
+    
     # إنشاء نافذة منبثقة لاختيار العامود
     popup = tk.Toplevel(app.root)
     popup.title(f"اختر عامود للمقارنة - {file_name}")
@@ -218,13 +209,14 @@ def select_column_for_file(app, event=None):
     popup.grab_set()
     
     # إنشاء قائمة للأعمدة
-    ttk.Label(popup, text="اختر العامود للمقارنة:").pack(pady=10)
+    ttk.Label(popup, text="اختر العامود للمقارنة (أو عدة أعمدة لمفتاح مركب):").pack(pady=10)
     
     # إطار للقائمة وشريط التمرير
     list_frame = ttk.Frame(popup)
     list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
     
-    columns_listbox = tk.Listbox(list_frame, width=40, height=15)
+    # استخدام اختيار متعدد (ترتيب الأعمدة في الملف هو ترتيب أجزاء المفتاح)
+    columns_listbox = tk.Listbox(list_frame, width=40, height=15, selectmode=tk.MULTIPLE)
     columns_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     
     # إضافة شريط تمرير
@@ -233,13 +225,13 @@ def select_column_for_file(app, event=None):
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
     # إضافة الأعمدة إلى القائمة
-    for column in app.file_columns[file_path]:
+    for column in entry.columns:
         columns_listbox.insert(tk.END, column)
         
-    # تحديد العامود الحالي إذا كان موجوداً
-    if file_path in app.selected_columns:
+    # تحديد الأعمدة الحالية إذا كانت موجودة
+    for column in entry.key_columns:
         try:
-            index = app.file_columns[file_path].index(app.selected_columns[file_path])
+            index = entry.columns.index(column)
             columns_listbox.selection_set(index)
             columns_listbox.see(index)
         except ValueError:
@@ -253,10 +245,11 @@ def select_column_for_file(app, event=None):
         """عند اختيار عامود"""
         selection = columns_listbox.curselection()
         if selection:
-            column = app.file_columns[file_path][selection[0]]
-            app.selected_columns[file_path] = column
+            columns = [entry.columns[index] for index in selection]
+            # عامود واحد يُحفظ كنص، وعدة أعمدة كقائمة لمفتاح مركب
+            entry.selected_column = columns[0] if len(columns) == 1 else columns
             app.update_file_display()
-            app.log(f"تم تحديد العامود '{column}' للملف {file_name}")
+            app.log(f"تم تحديد العامود '{' + '.join(columns)}' للملف {file_name}")
             popup.destroy()
     
     def on_cancel():
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+
+# حالات الملف في الجدول
+LOADING_STATUS = "جاري التحميل..."
+READ_STATUS = "تم القراءة"
+ERROR_STATUS = "خطأ"
+MAIN_STATUS = "ملف أساسي"
+
+NOT_SELECTED = "لم يتم التحديد"
+
+@dataclass
+class FileEntry:
+    """
+    ملف (أو ورقة من ملف) في قائمة الملفات
+    
+    يُحفظ في app.files برقم صفه في الجدول (iid)، لذلك يتم الوصول إلى بيانات الصف
+    المحدد مباشرة بدلاً من البحث عن مساره باسم الملف المعروض، ويعرض الجدول
+    بيانات المدخل فقط (انظر values).
+    """
+    path: str  # مسار الملف الحقيقي
+    sheet: str = None  # الورقة المختارة (None حتى يتم تحديدها)
+    sheet_names: list = field(default_factory=list)  # أوراق العمل في الملف
+    columns: list = field(default_factory=list)  # أعمدة الورقة المختارة من صف العناوين
+    selected_column: object = None  # عامود المقارنة، أو قائمة أعمدة لمفتاح مركب
+    status: str = LOADING_STATUS
+    error: str = None  # وصف خطأ القراءة عندما تكون الحالة ERROR_STATUS
+    per_sheet: bool = False  # ورقة مختارة من ملف متعدد الأوراق (يظهر اسمها مع اسم الملف)
+    
+    @property
+    def display_name(self):
+        """اسم الملف في الجدول وفي التقرير"""
+        file_name = os.path.basename(self.path)
+        return f"{file_name} - {self.sheet}" if self.per_sheet else file_name
+    
+    @property
+    def key_columns(self):
+        """أعمدة المفتاح المختارة كقائمة (فارغة إذا لم يتم التحديد)"""
+        if self.selected_column is None:
+            return []
+        return [self.selected_column] if isinstance(self.selected_column, str) else list(self.selected_column)
+    
+    def values(self, is_main=False):
+        """قيم صف الجدول: الاسم والحالة والأعمدة والعامود المختار والورقة"""
+        if self.status == ERROR_STATUS:
+            return (self.display_name, ERROR_STATUS, self.error, "-", "-")
+        
+        status = MAIN_STATUS if is_main and self.status == READ_STATUS else self.status
+        if self.columns:
+            columns_text = ", ".join(self.columns[:3]) + "..."
+        elif len(self.sheet_names) > 1:
+            columns_text = f"{len(self.sheet_names)} أوراق عمل"
+        else:
+            columns_text = ""
+        selected_column = " + ".join(self.key_columns) if self.key_columns else NOT_SELECTED
+        sheet = "-" if self.status == LOADING_STATUS else (self.sheet or NOT_SELECTED)
+        return (self.display_name, status, columns_text, selected_column, sheet)
+
+def source_names(entries):
+    """
+    أسماء الملفات في التقرير بنفس ترتيب المدخلات
+    
+    الاسم المعروض لكل ملف، وإذا تكرر الاسم (ملفات بنفس الاسم من مجلدات مختلفة)
+    تُضاف إليه المجلدات الأقرب واحداً تلو الآخر حتى يختلف عن غيره، ثم رقم إذا
+    بقي مكرراً (نفس الملف مرتين)، لأن التقرير يربط بيانات كل ملف باسمه.
+    """
+    folders = [[part for part in os.path.dirname(os.path.abspath(entry.path)).split(os.sep) if part]
+               for entry in entries]
+    depths = [0] * len(entries)
+    names = [entry.display_name for entry in entries]
+    while True:
+        counts = Counter(names)
+        deeper = [i for i, name in enumerate(names) if counts[name] > 1 and depths[i] < len(folders[i])]
+        if not deeper:
+            break
+        for i in deeper:
+            depths[i] += 1
+            names[i] = "/".join(folders[i][-depths[i]:] + [entries[i].display_name])
+    
+    counts = Counter(names)
+    seen = Counter()
+    for i, name in enumerate(names):
+        if counts[name] > 1:
+            seen[name] += 1
+            names[i] = f"{name} ({seen[name]})"
+    return names
@@ -1,7 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import sys
 import tkinter as tk
+
+# إضافة المجلد الرئيسي للمشروع إلى مسار البحث لاستخدام النواة المشتركة
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from excel_comparer_app import ExcelComparerApp
 
 def main():
@@ -20,6 +26,9 @@ def main():
     
     # تشغيل الحلقة الرئيسية
     root.mainloop()
+    
+    # إغلاق الملفات المفتوحة عند الخروج
+    app.workbooks.close_all()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
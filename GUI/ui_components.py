@@ -97,6 +97,23 @@ def create_ui(app):
     )
     app.common_column_combobox.pack(side=tk.LEFT, padx=5)
     
+    # توحيد القيم قبل المقارنة (المسافات وحالة الأحرف وأشكال الحروف العربية والأرقام العربية الهندية)
+    ttk.Checkbutton(
+        column_frame,
+        text="توحيد القيم قبل المقارنة",
+        variable=app.normalize_keys
+    ).pack(side=tk.LEFT, padx=5)
+    
+    # عدد العمليات المتوازية لقراءة الملفات (0 لاستخدام جميع المعالجات)
+    ttk.Spinbox(
+        column_frame,
+        from_=0,
+        to=64,
+        textvariable=app.read_jobs,
+        width=5
+    ).pack(side=tk.RIGHT, padx=5)
+    ttk.Label(column_frame, text="عمليات القراءة المتوازية:").pack(side=tk.RIGHT, padx=5)
+    
     # إطار ملف الإخراج
     output_frame = ttk.LabelFrame(main_frame, text="ملف الإخراج", padding="5")
     output_frame.pack(fill=tk.X, pady=5)
@@ -112,11 +129,17 @@ def create_ui(app):
     app.run_button = ttk.Button(control_frame, text="تشغيل المقارنة", command=app.run_comparison)
     app.run_button.pack(side=tk.LEFT, padx=5)
     
+    # زر إيقاف المقارنة الجارية (مفعل أثناء التشغيل فقط)
+    app.cancel_button = ttk.Button(control_frame, text="إلغاء", command=app.cancel_comparison, state="disabled")
+    app.cancel_button.pack(side=tk.LEFT, padx=5)
+    
     ttk.Button(control_frame, text="مسح الكل", command=app.clear_all).pack(side=tk.LEFT, padx=5)
     
     # شريط التقدم
-    app.progress = ttk.Progressbar(control_frame, mode="indeterminate", length=200)
+    app.progress = ttk.Progressbar(control_frame, mode="determinate", maximum=100, length=200)
     app.progress.pack(side=tk.LEFT, padx=10)
+    app.progress_label = ttk.Label(control_frame, text="")
+    app.progress_label.pack(side=tk.LEFT, padx=5)
     
     # إطار سجل العمليات
     log_frame = ttk.LabelFrame(main_frame, text="سجل العمليات", padding="5")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+قياس زمن كل مرحلة من مراحل المقارنة بدون واجهة باستخدام ComparisonJob
+
+يتم تسجيل وقت كل رسالة تقدم (قراءة الملفات ثم بناء الفهرس)، لذلك يمكن قياس
+أثر أي تحسين في النواة المشتركة لسطر الأوامر والواجهة الرسومية.
+
+الاستخدام:
+python benchmarks/bench_comparison.py --files 4 --rows 50000 --jobs 1
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.comparison import ComparisonJob, folder_sources
+
+KEY_COLUMN = 'رقم الحساب'
+
+def write_files(folder, files, rows):
+    """ملفات بمفاتيح متداخلة جزئياً وعامودين إضافيين"""
+    rng = np.random.default_rng(0)
+    file_names = []
+    for i in range(files):
+        df = pd.DataFrame({
+            KEY_COLUMN: rng.integers(0, rows * 2, rows),
+            'الاسم': np.array(['أحمد', 'فاطمة', 'عمر', 'هدى'], dtype=object)[rng.integers(0, 4, rows)],
+            'الرصيد': np.round(rng.random(rows) * 10000, 2),
+        })
+        file_name = f"file_{i}.xlsx"
+        df.to_excel(os.path.join(folder, file_name), index=False)
+        file_names.append(file_name)
+    return file_names
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن مراحل المقارنة")
+    parser.add_argument("--files", type=int, default=4, help="عدد الملفات")
+    parser.add_argument("--rows", type=int, default=50000, help="عدد الصفوف في كل ملف")
+    parser.add_argument("--jobs", type=int, default=1, help="عدد العمليات المتوازية للقراءة")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        file_names = write_files(folder, args.files, args.rows)
+        
+        stages = {}
+        start = time.perf_counter()
+        
+        def on_progress(stage, done, total):
+            stages[stage] = time.perf_counter() - start
+        
+        job = ComparisonJob(folder_sources(folder, file_names), [KEY_COLUMN], jobs=args.jobs, on_progress=on_progress)
+        result = job.run()
+        elapsed = time.perf_counter() - start
+    
+    print(f"الملفات: {args.files} × {args.rows} صف - القيم الفريدة {len(result.membership)}")
+    previous = 0.0
+    for stage, finished in stages.items():
+        print(f"{stage}: {finished - previous:.2f} ثانية")
+        previous = finished
+    print(f"الإجمالي: {elapsed:.2f} ثانية")
+
+if __name__ == "__main__":
+    main()
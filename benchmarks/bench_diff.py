@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+مقارنة زمن البحث عن السجلات المتغيرة بزمن مقارنة وجود المفاتيح فقط
+
+تتم محاذاة الصفوف برموز فهرس العضوية ومقارنة كل عامود بعمليات على المصفوفات
+كاملة، لذلك يبقى الزمن الإضافي قريباً من زمن بناء الفهرس.
+
+الاستخدام:
+python benchmarks/bench_diff.py --rows 500000 --changes 0.01 --tolerance 0.01
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.diff import changed_records
+from core.membership import MembershipIndex
+
+KEY_COLUMN = 'رقم الحساب'
+
+def build_frames(rows, changes):
+    """ملفان بنفس المفاتيح بترتيب مختلف مع تغيير قيم نسبة من الصفوف في الملف الثاني"""
+    rng = np.random.default_rng(0)
+    first = pd.DataFrame({
+        KEY_COLUMN: rng.choice(np.arange(10 ** 7, 10 ** 8), rows, replace=False),
+        'الاسم': np.array(['أحمد', 'فاطمة', 'عمر', 'هدى'], dtype=object)[rng.integers(0, 4, rows)],
+        'الفرع': rng.integers(1, 50, rows),
+        'الرصيد': np.round(rng.random(rows) * 10000, 2),
+        'التاريخ': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        'ملاحظات': np.where(rng.random(rows) < 0.5, 'نعم', None).astype(object),
+    })
+    second = first.sample(frac=1, random_state=1).reset_index(drop=True)
+    changed = rng.random(rows) < changes
+    second.loc[changed, 'الرصيد'] += 0.001  # ضمن الفرق المسموح
+    changed = rng.random(rows) < changes
+    second.loc[changed, 'الرصيد'] += 5
+    changed = rng.random(rows) < changes
+    second.loc[changed, 'الاسم'] = 'سارة'
+    return [first, second]
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن البحث عن السجلات المتغيرة")
+    parser.add_argument("--rows", type=int, default=500000, help="عدد الصفوف في كل ملف")
+    parser.add_argument("--changes", type=float, default=0.01, help="نسبة الصفوف المتغيرة لكل نوع تغيير")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="أكبر فرق مسموح بين القيم الرقمية")
+    args = parser.parse_args()
+    
+    frames = build_frames(args.rows, args.changes)
+    
+    start = time.perf_counter()
+    index = MembershipIndex.from_columns([df[KEY_COLUMN] for df in frames], ["a.xlsx", "b.xlsx"], sort=False)
+    index_time = time.perf_counter() - start
+    print(f"المفاتيح: 2 ملف × {args.rows} صف")
+    print(f"مقارنة وجود المفاتيح: {index_time:.2f} ثانية")
+    
+    start = time.perf_counter()
+    changes = changed_records(frames, index, [KEY_COLUMN], tolerance=args.tolerance)
+    elapsed = time.perf_counter() - start
+    print(f"السجلات المتغيرة: {elapsed:.2f} ثانية - القيم المختلفة {len(changes)}"
+          f" في {changes[KEY_COLUMN].nunique()} سجل")
+
+if __name__ == "__main__":
+    main()
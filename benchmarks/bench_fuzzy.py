@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+قياس زمن البحث عن التطابقات المحتملة بالفهرس المقلوب للنصوص المحذوف منها
+مقارنة بالزمن المقدر لمقارنة كل مفتاح بجميع المفاتيح
+
+الاستخدام:
+python benchmarks/bench_fuzzy.py --keys 100000 --typos 0.01 --distance 1
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fuzzy import possible_matches, edit_distance
+from core.membership import MembershipIndex
+
+def build_columns(keys, typos):
+    """ملفان بنفس المفاتيح (أرقام من 8 خانات) مع تبديل خانتين متجاورتين في نسبة من مفاتيح الملف الثاني"""
+    rng = np.random.default_rng(0)
+    first = rng.choice(np.arange(10 ** 7, 10 ** 8), keys, replace=False).astype(str).astype(object)
+    second = first.copy()
+    rng.shuffle(second)
+    for i in np.flatnonzero(rng.random(keys) < typos):
+        chars = list(second[i])
+        position = rng.integers(0, len(chars) - 1)
+        chars[position], chars[position + 1] = chars[position + 1], chars[position]
+        second[i] = "".join(chars)
+    return [pd.Series(first), pd.Series(second)]
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن البحث عن التطابقات المحتملة")
+    parser.add_argument("--keys", type=int, default=100000, help="عدد المفاتيح في كل ملف")
+    parser.add_argument("--typos", type=float, default=0.01, help="نسبة المفاتيح التي بها خطأ كتابة في الملف الثاني")
+    parser.add_argument("--distance", type=int, default=1, help="أقصى مسافة تعديل")
+    args = parser.parse_args()
+    
+    columns = build_columns(args.keys, args.typos)
+    index = MembershipIndex.from_columns(columns, ["a.xlsx", "b.xlsx"], sort=False)
+    unique = index.unique_counts()
+    print(f"المفاتيح: 2 ملف × {args.keys} - القيم الفريدة لكل ملف {unique.tolist()}")
+    
+    start = time.perf_counter()
+    matches = possible_matches(index, args.distance, 0)
+    elapsed = time.perf_counter() - start
+    print(f"الفهرس المقلوب: {elapsed:.2f} ثانية - التطابقات المحتملة {len(matches)}")
+    
+    # تقدير زمن مقارنة كل قيمة فريدة بجميع القيم من عينة
+    texts = [str(value) for value in index.values]
+    rng = np.random.default_rng(1)
+    sample = rng.integers(0, len(texts), (20000, 2))
+    start = time.perf_counter()
+    for i, j in sample:
+        edit_distance(texts[i], texts[j], args.distance)
+    per_pair = (time.perf_counter() - start) / len(sample)
+    estimate = per_pair * int(unique.sum()) * len(texts)
+    print(f"مقارنة كل قيمة فريدة بجميع القيم (تقدير): {estimate:.0f} ثانية")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+مقارنة الزمن والذاكرة عند بناء فهرس العضوية بين الطريقة السابقة (تحويل كل صف
+إلى نص ثم دمج جميع الأعمدة وترميزها) وترميز كل عامود على حدة مع دمج القيم الفريدة
+فقط، أو مقارنة الأعمدة الرقمية كأرقام int64 مرتبة
+
+تختلف القيم المشتركة بين الطريقتين لأن الطريقة السابقة تعتبر 123 و 123.0 قيمتين مختلفتين.
+
+الاستخدام:
+python benchmarks/bench_key_index.py --rows 1000000 --files 10 --distinct 0.5 [--numeric]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.membership import MembershipIndex
+
+def build_columns(rows, files, distinct, numeric=False):
+    """إنشاء أعمدة مفاتيح عشوائية (أرقام صحيحة وعشرية، ونصوص إلا عند طلب أعمدة رقمية فقط) تتداخل بين الملفات"""
+    rng = np.random.default_rng(0)
+    columns = []
+    for i in range(files):
+        keys = rng.integers(0, max(1, int(rows * distinct)), rows)
+        if i % 3 == 0:
+            column = pd.Series(keys)
+        elif i % 3 == 1:
+            column = pd.Series(keys.astype(np.float64))
+        elif numeric:
+            column = pd.Series(keys.astype(object))
+        else:
+            column = pd.Series(np.char.add('ID', keys.astype(str)).astype(object))
+        columns.append(column)
+    return columns
+
+def text_rows(columns, file_names):
+    """الطريقة السابقة: تحويل كل صف إلى نص ثم ترميز جميع الصفوف المدمجة"""
+    arrays = [np.asarray(column.astype(str), dtype=object) for column in columns]
+    codes, values = pd.factorize(np.concatenate(arrays), sort=True)
+    offsets = np.cumsum([0] + [len(array) for array in arrays])
+    file_codes = [codes[offsets[i]:offsets[i + 1]] for i in range(len(arrays))]
+    return MembershipIndex.from_codes(values, file_codes, file_names)
+
+def text_uniques(columns, file_names):
+    """الطريقة الجديدة: ترميز كل عامود على حدة وتحويل القيم الفريدة فقط إلى نصوص"""
+    return MembershipIndex.from_columns(columns, file_names, as_text=True)
+
+def index_size(index):
+    """حجم الفهرس المحتفظ به بالبايت (الرموز والأقنعة والقيم النصية)"""
+    size = index.masks.nbytes + sum(codes.nbytes for codes in index.file_codes)
+    return size + sum(sys.getsizeof(value) for value in index.values)
+
+def measure(function, *args, memory=False):
+    """قياس الزمن (وذروة الذاكرة عند الطلب لأن tracemalloc يبطئ التنفيذ كثيراً)"""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس ذاكرة فهرس العضوية")
+    parser.add_argument("--rows", type=int, default=1000000, help="عدد الصفوف في كل ملف")
+    parser.add_argument("--files", type=int, default=10, help="عدد الملفات")
+    parser.add_argument("--distinct", type=float, default=0.5, help="عدد القيم المختلفة الممكنة كنسبة من عدد الصفوف")
+    parser.add_argument("--numeric", action="store_true", help="أعمدة رقمية فقط (بعضها مقروء كأرقام عشرية)")
+    parser.add_argument("--memory", action="store_true", help="قياس ذروة الذاكرة باستخدام tracemalloc")
+    args = parser.parse_args()
+    
+    columns = build_columns(args.rows, args.files, args.distinct, args.numeric)
+    file_names = [f"file_{i}.xlsx" for i in range(args.files)]
+    print(f"المفاتيح: {args.files} ملف × {args.rows} صف")
+    
+    for name, function in (("تحويل كل صف إلى نص", text_rows), ("ترميز القيم الفريدة", text_uniques)):
+        index, elapsed, peak = measure(function, columns, file_names, memory=args.memory)
+        line = (f"{name}: {elapsed:.2f} ثانية - حجم الفهرس {index_size(index) / 1024 / 1024:.1f} ميجابايت"
+                f" - القيم المشتركة بين جميع الملفات {int(index.in_all().sum())}")
+        if peak is not None:
+            line += f" - ذروة الذاكرة {peak / 1024 / 1024:.1f} ميجابايت"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+مقارنة زمن توحيد عامود المقارنة بزمن قراءته من الملف، وبالطريقة البسيطة
+(دالة Python لكل صف)
+
+يتم توحيد القيم الفريدة فقط بعمليات .str و str.translate، لذلك يبقى زمن
+التوحيد جزءاً صغيراً من زمن القراءة.
+
+الاستخدام:
+python benchmarks/bench_normalize.py --rows 200000 --distinct 0.5
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ingest import read_sheets
+from core.normalize import normalize_column, ARABIC_TABLE, DIGITS_TABLE
+
+KEY_COLUMN = 'الاسم'
+
+NAMES = ['أحمد', 'إبراهيم', 'آمنة', 'فاطمة', 'مصطفى', 'هدى', 'Omar', 'SARA']
+
+def build_keys(rows, distinct):
+    """إنشاء مفاتيح نصية عشوائية بأشكال مختلفة للحروف والأرقام والمسافات"""
+    rng = np.random.default_rng(0)
+    names = np.array(NAMES, dtype=object)[rng.integers(0, len(NAMES), rows)]
+    numbers = rng.integers(0, max(1, int(rows * distinct)), rows).astype(str).astype(object)
+    # نصف الأرقام بالأرقام العربية الهندية وبعض المفاتيح بمسافات زائدة
+    arabic_digits = rng.random(rows) < 0.5
+    numbers[arabic_digits] = [number.translate(str.maketrans('0123456789', '٠١٢٣٤٥٦٧٨٩')) for number in numbers[arabic_digits]]
+    spaces = np.where(rng.random(rows) < 0.2, '  ', ' ').astype(object)
+    return names + spaces + numbers
+
+def normalize_rows(column):
+    """الطريقة البسيطة: دالة Python لكل صف"""
+    def normalize(value):
+        if not isinstance(value, str):
+            return value
+        value = re.sub(r"\s+", " ", value.strip()).casefold()
+        return value.translate(ARABIC_TABLE).translate(DIGITS_TABLE)
+    return column.map(normalize)
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن توحيد عامود المقارنة")
+    parser.add_argument("--rows", type=int, default=200000, help="عدد الصفوف")
+    parser.add_argument("--distinct", type=float, default=0.5, help="عدد الأرقام المختلفة الممكنة كنسبة من عدد الصفوف")
+    args = parser.parse_args()
+    
+    df = pd.DataFrame({KEY_COLUMN: build_keys(args.rows, args.distinct), 'القيمة': np.arange(args.rows)})
+    
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "keys.xlsx")
+        df.to_excel(path, index=False)
+        
+        start = time.perf_counter()
+        result = read_sheets([{'path': path, 'columns': [KEY_COLUMN]}])[0]
+        read_time = time.perf_counter() - start
+    
+    column = result['df'][KEY_COLUMN]
+    print(f"المفاتيح: {args.rows} صف - القيم المختلفة قبل التوحيد {column.nunique()}")
+    print(f"قراءة العامود من الملف: {read_time:.2f} ثانية")
+    
+    for name, function in (("دالة لكل صف", normalize_rows), ("توحيد القيم الفريدة", normalize_column)):
+        start = time.perf_counter()
+        normalized = function(column)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed:.2f} ثانية ({elapsed / read_time:.2f} من زمن القراءة)"
+              f" - القيم المختلفة بعد التوحيد {normalized.nunique()}")
+
+if __name__ == "__main__":
+    main()
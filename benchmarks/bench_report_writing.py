@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+مقارنة زمن كتابة تقرير الواجهة الرسومية بين الطريقة السابقة (الكتابة ثم إعادة
+فتح الملف للتنسيق) والكتابة المنسقة في تمريرة واحدة
+
+الاستخدام:
+python benchmarks/bench_report_writing.py --values 200000 --files 12
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill, Alignment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.xlsx_writer import StreamingReportWriter
+
+def build_matrix(values, files):
+    """إنشاء مصفوفة مقارنة عشوائية بالحجم المطلوب"""
+    rng = np.random.default_rng(0)
+    data = {'القيمة': np.char.add('ID', np.arange(values).astype(str)).astype(object)}
+    for i in range(files):
+        data[f"file_{i}.xlsx"] = rng.integers(0, 2, values)
+    return pd.DataFrame(data)
+
+def build_summary(files):
+    """إنشاء جدول ملخص صغير"""
+    return pd.DataFrame({
+        'اسم الملف': [f"file_{i}.xlsx" for i in range(files)],
+        'عدد السجلات': [1000] * files,
+        'عدد السجلات الفريدة': [10] * files,
+    })
+
+def write_then_reload(summary_df, comparison_df, output_file):
+    """الطريقة السابقة: ExcelWriter ثم load_workbook للتنسيق ثم حفظ ثانٍ"""
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        summary_df.to_excel(writer, sheet_name='ملخص المقارنة', index=False)
+        comparison_df.to_excel(writer, sheet_name='مقارنة القيم', index=False)
+    
+    wb = load_workbook(output_file)
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    for ws in wb.worksheets:
+        ws.sheet_view.rightToLeft = True
+        for cell in ws[1]:
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+    wb.save(output_file)
+
+def single_pass(summary_df, comparison_df, output_file):
+    """الطريقة الجديدة: الكتابة المنسقة في تمريرة واحدة"""
+    writer = StreamingReportWriter()
+    ws = writer.create_sheet('ملخص المقارنة', right_to_left=True)
+    writer.append_frame(ws, summary_df, header_style='report_header_plain', data_style=None)
+    ws = writer.create_sheet('مقارنة القيم', right_to_left=True)
+    writer.append_frame(ws, comparison_df, header_style='report_header_plain', data_style=None)
+    writer.save(output_file)
+
+def measure(function, *args, memory=False):
+    """قياس الزمن (وذروة الذاكرة عند الطلب لأن tracemalloc يبطئ التنفيذ كثيراً)"""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء كتابة تقرير المقارنة")
+    parser.add_argument("--values", type=int, default=200000, help="عدد القيم في مصفوفة المقارنة")
+    parser.add_argument("--files", type=int, default=12, help="عدد الملفات")
+    parser.add_argument("--memory", action="store_true", help="قياس ذروة الذاكرة باستخدام tracemalloc")
+    args = parser.parse_args()
+    
+    comparison_df = build_matrix(args.values, args.files)
+    summary_df = build_summary(args.files)
+    
+    print(f"مصفوفة المقارنة: {args.values} قيمة × {args.files} ملف")
+    with tempfile.TemporaryDirectory() as folder:
+        for name, function in (("الكتابة ثم إعادة الفتح", write_then_reload), ("تمريرة واحدة", single_pass)):
+            output_file = os.path.join(folder, f"{function.__name__}.xlsx")
+            elapsed, peak = measure(function, summary_df, comparison_df, output_file, memory=args.memory)
+            line = f"{name}: {elapsed:.2f} ثانية"
+            if peak is not None:
+                line += f" - ذروة الذاكرة {peak / 1024 / 1024:.1f} ميجابايت"
+            print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+مقارنة ذروة الذاكرة عند بناء جدول جميع السجلات الفريدة بين الطريقة السابقة
+(دمج جميع الجداول ثم drop_duplicates) وأول ظهور لكل مفتاح من فهرس العضوية
+
+الاستخدام:
+python benchmarks/bench_unique_records.py --rows 200000 --files 8 --columns 20
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.membership import MembershipIndex
+
+KEY_COLUMN = 'id'
+
+def build_frames(rows, files, columns):
+    """إنشاء جداول عشوائية تتداخل مفاتيحها جزئياً"""
+    rng = np.random.default_rng(0)
+    frames = {}
+    for i in range(files):
+        data = {KEY_COLUMN: rng.integers(0, rows * 2, rows)}
+        for j in range(columns):
+            data[f"col_{j}"] = np.char.add('V', rng.integers(0, 1000, rows).astype(str)).astype(object)
+        frames[f"file_{i}.xlsx"] = pd.DataFrame(data)
+    return frames
+
+def concat_then_drop(frames):
+    """الطريقة السابقة: إضافة عامود المصدر لكل جدول ثم الدمج ثم drop_duplicates"""
+    all_data = []
+    for file_name, df in frames.items():
+        df = df.copy()
+        df['source_file'] = file_name
+        all_data.append(df)
+    combined_df = pd.concat(all_data, ignore_index=True)
+    return combined_df.drop_duplicates(subset=[KEY_COLUMN])
+
+def first_occurrences(frames):
+    """الطريقة الجديدة: أول ظهور لكل مفتاح من فهرس العضوية بدون دمج البيانات"""
+    file_names = list(frames.keys())
+    membership = MembershipIndex.from_columns([frames[file_name][KEY_COLUMN] for file_name in file_names],
+                                              file_names, sort=False)
+    first_frames = [frames[file_name].iloc[membership.first_rows_in(file_index)].assign(source_file=file_name)
+                    for file_index, file_name in enumerate(file_names)]
+    return pd.concat(first_frames, ignore_index=True)
+
+def measure(function, frames):
+    """قياس الزمن وذروة الذاكرة الإضافية فوق الجداول المقروءة"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(frames)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس ذروة الذاكرة عند بناء السجلات الفريدة")
+    parser.add_argument("--rows", type=int, default=200000, help="عدد الصفوف في كل ملف")
+    parser.add_argument("--files", type=int, default=8, help="عدد الملفات")
+    parser.add_argument("--columns", type=int, default=20, help="عدد الأعمدة الإضافية في كل ملف")
+    args = parser.parse_args()
+    
+    frames = build_frames(args.rows, args.files, args.columns)
+    print(f"البيانات: {args.files} ملف × {args.rows} صف × {args.columns + 1} عامود")
+    
+    results = []
+    for name, function in (("الدمج ثم drop_duplicates", concat_then_drop), ("أول ظهور من فهرس العضوية", first_occurrences)):
+        result, elapsed, peak = measure(function, frames)
+        results.append(result)
+        print(f"{name}: {elapsed:.2f} ثانية - ذروة الذاكرة {peak / 1024 / 1024:.1f} ميجابايت - السجلات الفريدة {len(result)}")
+    
+    expected, actual = (result.reset_index(drop=True) for result in results)
+    print(f"تطابق النتائج: {'نعم' if expected.equals(actual) else 'لا'}")
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,63 @@
 # -*- coding: utf-8 -*-
 
 import os
-import pandas as pd
+import sys
+import signal
 import argparse
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, Color
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.utils import get_column_letter
 from openpyxl.chart import BarChart, Reference
 
-def compare_excel_files(input_folder='in', comparison_column=None, output_file='comparison_results.xlsx'):
+# إضافة المجلد الرئيسي للمشروع إلى مسار البحث لاستخدام النواة المشتركة
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cache import SheetCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+from core.cancel import CancelToken, ComparisonCancelled
+from core.comparison import ComparisonJob, folder_sources
+from core.diff import changed_records, DEFAULT_TOLERANCE
+from core.fuzzy import possible_matches, DEFAULT_MAX_DISTANCE, DEFAULT_MIN_SIMILARITY
+from core.incremental import ComparisonState, DEFAULT_STATE_DIR
+from core.ingest import resolve_jobs, probe_workbook
+from core.normalize import NORMALIZATION_STEPS, resolve_steps
+from core.streaming import DEFAULT_CHUNK_SIZE
+from core.xlsx_writer import StreamingReportWriter, frame_widths, rows_widths, merge_widths
+
+def compare_excel_files(input_folder='in', comparison_column=None, output_file='comparison_results.xlsx', jobs=1,
+                        output_columns=None, cache=None, stream=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                        state_dir=None, verify_state=False, presorted=None, normalize=None, fuzzy_distance=None,
+                        fuzzy_similarity=DEFAULT_MIN_SIMILARITY, diff=False, tolerance=DEFAULT_TOLERANCE,
+                        cancel=None):
     """
     قارن بين ملفات الإكسل في المجلد المحدد بناءً على العامود المحدد
     
     المعاملات:
     input_folder (str): مسار المجلد الذي يحتوي على ملفات الإكسل
-    comparison_column (str): اسم العامود الذي سيتم المقارنة على أساسه
+    comparison_column (str أو list): اسم العامود الذي سيتم المقارنة على أساسه، أو قائمة أعمدة
+                                     لمفتاح مركب (مثل الفرع ورقم الفاتورة والتاريخ)
     output_file (str): اسم ملف الإكسل الناتج
+    jobs (int): عدد العمليات المتوازية لقراءة الملفات (0 لاستخدام جميع المعالجات)
+    output_columns (list): الأعمدة التي تظهر في سجلات التقرير إلى جانب عامود المقارنة
+                           (تتم قراءة هذه الأعمدة فقط من الملفات)
+    cache (SheetCache): الذاكرة المؤقتة للأوراق المحللة (None لتعطيلها)
+    stream (bool): القراءة المتدفقة صفاً بصف للملفات الأكبر من الذاكرة
+                   (لا تستخدم القراءة المتوازية ولا الذاكرة المؤقتة)
+    chunk_size (int): عدد الصفوف في كل دفعة عند القراءة المتدفقة
+    state_dir (str): مجلد حالة المقارنة لإعادة المقارنة بشكل تزايدي (None لتعطيلها)
+                     تُقرأ الملفات المتغيرة فقط، ويتطلب ذلك تحديد عامود للمقارنة
+    verify_state (bool): التحقق من محتوى الملفات بالإضافة إلى وقت التعديل والحجم في المقارنة التزايدية
+    presorted (bool): مقارنة عامود المقارنة بالدمج المرتب عندما يكون مرتباً تصاعدياً في جميع الملفات
+                      (None للاكتشاف التلقائي، True لطلبه لجميع أنواع القيم، False لتعطيله)
+                      لا يُستخدم الدمج المرتب مع المفاتيح المركبة
+    normalize (list): خطوات توحيد قيم عامود المقارنة قبل مقارنتها (انظر NORMALIZATION_STEPS،
+                      قائمة فارغة لجميع الخطوات، None لتعطيل التوحيد)
+                      تُقارن المفاتيح الموحدة وتعرض أوراق التقرير القيم الأصلية
+    fuzzy_distance (int): أقصى مسافة تعديل للبحث عن قيم متشابهة بين الملفات وإضافة ورقة
+                          "التطابقات المحتملة" (None لتعطيل البحث، يتطلب عامود مقارنة واحد)
+    fuzzy_similarity (float): أدنى نسبة تشابه للتطابقات المحتملة (بين 0 و 1)
+    diff (bool): مقارنة باقي الأعمدة للمفاتيح الموجودة في أكثر من ملف وإضافة ورقة
+                 "السجلات المتغيرة" (يتطلب عامود للمقارنة وقراءة الملفات في الذاكرة)
+    tolerance (float): أكبر فرق مسموح بين القيم الرقمية عند مقارنة السجلات المتغيرة
+    cancel (CancelToken): إشارة إيقاف المقارنة (ترفع ComparisonCancelled بدون إنشاء ملف المقارنة،
+                          وتبقى حالة المقارنة التزايدية كما كانت قبل التشغيل)
     """
     # التحقق من وجود المجلد
     if not os.path.exists(input_folder):
@@ -33,318 +73,153 @@ def compare_excel_files(input_folder='in', comparison_column=None, output_file='
         print(f"لم يتم العثور على ملفات إكسل في المجلد '{input_folder}'.")
         return
     
-    # قراءة جميع ملفات الإكسل
-    dataframes = {}
-    all_data = []
-    error_files = []  # ملفات بها أخطاء
-    skipped_files = []  # ملفات تم تخطيها لعدم وجود العامود المحدد
-    
-    for file in excel_files:
-        file_path = os.path.join(input_folder, file)
-        try:
-            df = pd.read_excel(file_path)
-            
-            # التحقق من وجود العامود المحدد للمقارنة
-            if comparison_column and comparison_column not in df.columns:
-                print(f"تحذير: العامود '{comparison_column}' غير موجود في الملف '{file}'. سيتم تخطي هذا الملف.")
-                print(f"الأعمدة المتاحة في الملف '{file}': {', '.join(df.columns)}")
-                skipped_files.append({
-                    'file': file,
-                    'reason': f"العامود '{comparison_column}' غير موجود",
-                    'available_columns': ', '.join(df.columns)
-                })
-                continue
-                
-            # إضافة عامود يحدد مصدر البيانات (اسم الملف)
-            df['source_file'] = file
-            
-            dataframes[file] = df
-            all_data.append(df)
-            print(f"تم قراءة الملف: {file} - عدد السجلات: {len(df)}")
-        except Exception as e:
-            print(f"خطأ في قراءة الملف '{file}': {str(e)}")
-            error_files.append({
-                'file': file,
-                'error': str(e)
-            })
-    
-    if not dataframes:
-        print("لم يتم قراءة أي ملفات إكسل بنجاح.")
-        return
-    
-    # دمج جميع البيانات
-    combined_df = pd.concat(all_data, ignore_index=True)
-    
-    # إنشاء مجموعة فريدة من السجلات بناءً على العامود المحدد
-    if comparison_column:
-        unique_records = combined_df.drop_duplicates(subset=[comparison_column])
+    # أعمدة المفتاح (عامود واحد أو عدة أعمدة لمفتاح مركب)
+    if isinstance(comparison_column, str):
+        key_columns = [comparison_column]
     else:
-        # إذا لم يتم تحديد عامود، استخدم جميع الأعمدة باستثناء source_file
-        columns_to_check = [col for col in combined_df.columns if col != 'source_file']
-        unique_records = combined_df.drop_duplicates(subset=columns_to_check)
-    
-    # إنشاء ملف إكسل جديد
-    wb = Workbook()
-    
-    # تنسيق الخلايا
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    centered_alignment = Alignment(horizontal='center', vertical='center')
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # تنسيقات إضافية
-    success_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-    warning_fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
-    error_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-    
-    success_font = Font(color="006100")
-    warning_font = Font(color="9C5700")
-    error_font = Font(color="9C0006")
+        key_columns = list(comparison_column or [])
+    column_label = " + ".join(key_columns)
+    
+    # تحديد الأعمدة المطلوب قراءتها (جميع الأعمدة افتراضياً)
+    read_columns = None
+    if output_columns:
+        if key_columns:
+            read_columns = key_columns + [col for col in output_columns if col not in key_columns]
+        else:
+            print("تحذير: يتطلب تحديد أعمدة التقرير تحديد عامود للمقارنة. سيتم استخدام جميع الأعمدة.")
     
-    # إنشاء ورقة للسجلات الفريدة
-    ws_unique = wb.active
-    ws_unique.title = "جميع السجلات الفريدة"
+    steps = resolve_steps(normalize)
+    if steps and not key_columns:
+        print("تحذير: يتطلب توحيد القيم تحديد عامود للمقارنة. ستتم المقارنة بدون توحيد.")
+        steps = ()
     
-    # إضافة عنوان للورقة
-    ws_unique.merge_cells('A1:E1')
-    title_cell = ws_unique.cell(row=1, column=1, value="جميع السجلات الفريدة (بدون تكرار)")
-    title_cell.font = Font(bold=True, size=14, color="366092")
-    title_cell.alignment = Alignment(horizontal='center', vertical='center')
+    if fuzzy_distance is not None and len(key_columns) != 1:
+        print("تحذير: يتطلب البحث عن التطابقات المحتملة تحديد عامود مقارنة واحد. سيتم تخطي البحث.")
+        fuzzy_distance = None
     
-    # إضافة وصف
-    if comparison_column:
-        description = f"السجلات الفريدة بناءً على العامود: {comparison_column}"
-    else:
-        description = "السجلات الفريدة بناءً على جميع الأعمدة"
+    if diff and (not key_columns or stream or state_dir):
+        print("تحذير: تتطلب مقارنة السجلات المتغيرة تحديد عامود للمقارنة وقراءة جميع الملفات في الذاكرة. سيتم تخطيها.")
+        diff = False
     
-    ws_unique.merge_cells('A2:E2')
-    desc_cell = ws_unique.cell(row=2, column=1, value=description)
-    desc_cell.font = Font(italic=True)
-    desc_cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # إضافة البيانات الفريدة
-    start_row = 4
-    for r_idx, row in enumerate(dataframe_to_rows(unique_records, index=False, header=True), start_row):
-        for c_idx, value in enumerate(row, 1):
-            cell = ws_unique.cell(row=r_idx, column=c_idx, value=value)
-            if r_idx == start_row:
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = centered_alignment
-            cell.border = border
-    
-    # تعديل عرض الأعمدة
-    for column in ws_unique.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws_unique.column_dimensions[column_letter].width = adjusted_width
+    if state_dir and (stream or not key_columns):
+        print("تحذير: تتطلب المقارنة التزايدية تحديد عامود للمقارنة ولا تعمل مع القراءة المتدفقة. ستتم مقارنة جميع الملفات.")
+        state_dir = None
     
-    # إنشاء ورقة لكل ملف تعرض السجلات الفريدة له
-    for file_name, df in dataframes.items():
-        sheet_name = os.path.splitext(file_name)[0]
-        if len(sheet_name) > 31:  # حد أقصى لاسم الورقة في إكسل
-            sheet_name = sheet_name[:31]
-        
-        ws_file = wb.create_sheet(title=sheet_name)
-        
-        # إضافة عنوان للورقة
-        ws_file.merge_cells('A1:E1')
-        title_cell = ws_file.cell(row=1, column=1, value=f"السجلات الفريدة في الملف: {file_name}")
-        title_cell.font = Font(bold=True, size=14, color="366092")
-        title_cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # إضافة وصف
-        if comparison_column:
-            description = f"السجلات الموجودة في هذا الملف فقط (بناءً على العامود: {comparison_column})"
-        else:
-            description = "السجلات الموجودة في هذا الملف فقط (بناءً على جميع الأعمدة)"
-        
-        ws_file.merge_cells('A2:E2')
-        desc_cell = ws_file.cell(row=2, column=1, value=description)
-        desc_cell.font = Font(italic=True)
-        desc_cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # البحث عن السجلات الفريدة لهذا الملف
-        unique_to_file = []
-        
-        if comparison_column:
-            # الحصول على قيم العامود المحدد من الملف الحالي
-            current_values = set(df[comparison_column].tolist())
-            
-            # الحصول على قيم العامود المحدد من الملفات الأخرى
-            other_values = set()
-            for other_file, other_df in dataframes.items():
-                if other_file != file_name:
-                    other_values.update(other_df[comparison_column].tolist())
-            
-            # السجلات الفريدة هي تلك الموجودة في الملف الحالي ولكن ليست في الملفات الأخرى
-            unique_values = current_values - other_values
-            unique_to_file = df[df[comparison_column].isin(unique_values)]
-        else:
-            # إذا لم يتم تحديد عامود، قم بمقارنة جميع الأعمدة باستثناء source_file
-            columns_to_check = [col for col in df.columns if col != 'source_file']
-            
-            for _, row in df.iterrows():
-                is_unique = True
-                for other_file, other_df in dataframes.items():
-                    if other_file != file_name:
-                        # التحقق مما إذا كانت هذه السجلة موجودة في الملف الآخر
-                        match_mask = True
-                        for col in columns_to_check:
-                            match_mask = match_mask & (other_df[col] == row[col])
-                        
-                        if match_mask.any():
-                            is_unique = False
-                            break
-                
-                if is_unique:
-                    unique_to_file.append(row)
-            
-            if unique_to_file:
-                unique_to_file = pd.DataFrame(unique_to_file)
-        
-        # إضافة معلومات إحصائية
-        ws_file.cell(row=4, column=1, value="إجمالي عدد السجلات في الملف:").font = Font(bold=True)
-        ws_file.cell(row=4, column=2, value=len(df))
-        
-        ws_file.cell(row=5, column=1, value="عدد السجلات الفريدة:").font = Font(bold=True)
-        ws_file.cell(row=5, column=2, value=len(unique_to_file) if isinstance(unique_to_file, pd.DataFrame) else len(unique_to_file))
-        
-        # إضافة البيانات الفريدة للملف
-        start_row = 7
-        if isinstance(unique_to_file, pd.DataFrame) and len(unique_to_file) > 0:
-            for r_idx, row in enumerate(dataframe_to_rows(unique_to_file, index=False, header=True), start_row):
-                for c_idx, value in enumerate(row, 1):
-                    cell = ws_file.cell(row=r_idx, column=c_idx, value=value)
-                    if r_idx == start_row:
-                        cell.font = header_font
-                        cell.fill = header_fill
-                        cell.alignment = centered_alignment
-                    cell.border = border
-            
-            # تعديل عرض الأعمدة
-            for column in ws_file.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                ws_file.column_dimensions[column_letter].width = adjusted_width
-        else:
-            # إذا لم تكن هناك سجلات فريدة، أضف رسالة
-            ws_file.merge_cells(f'A{start_row}:E{start_row}')
-            no_data_cell = ws_file.cell(row=start_row, column=1, value="لا توجد سجلات فريدة لهذا الملف")
-            no_data_cell.font = Font(italic=True, color="9C0006")
-            no_data_cell.alignment = centered_alignment
-    
-    # إنشاء ورقة ملخص
-    ws_summary = wb.create_sheet(title="ملخص المقارنة", index=0)
-    
-    # إضافة معلومات الملخص
-    ws_summary.merge_cells('A1:F1')
-    title_cell = ws_summary.cell(row=1, column=1, value="ملخص مقارنة ملفات الإكسل")
-    title_cell.font = Font(bold=True, size=16, color="366092")
-    title_cell.alignment = centered_alignment
-    
-    # إضافة تاريخ التقرير
-    from datetime import datetime
-    ws_summary.cell(row=2, column=1, value=f"تاريخ التقرير: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    ws_summary.cell(row=2, column=1).font = Font(italic=True)
-    
-    # إضافة معلومات المقارنة
-    ws_summary.cell(row=4, column=1, value="معلومات المقارنة").font = Font(bold=True, size=12, color="366092")
-    
-    ws_summary.cell(row=5, column=1, value="عدد الملفات التي تم العثور عليها:").font = Font(bold=True)
-    ws_summary.cell(row=5, column=2, value=len(excel_files))
-    
-    ws_summary.cell(row=6, column=1, value="عدد الملفات التي تمت قراءتها بنجاح:").font = Font(bold=True)
-    ws_summary.cell(row=6, column=2, value=len(dataframes))
-    ws_summary.cell(row=6, column=2).font = success_font
-    ws_summary.cell(row=6, column=2).fill = success_fill
-    
-    ws_summary.cell(row=7, column=1, value="عدد الملفات التي تم تخطيها:").font = Font(bold=True)
-    ws_summary.cell(row=7, column=2, value=len(skipped_files))
-    if skipped_files:
-        ws_summary.cell(row=7, column=2).font = warning_font
-        ws_summary.cell(row=7, column=2).fill = warning_fill
+    state = None
+    if state_dir:
+        options = {'column': key_columns[0] if len(key_columns) == 1 else key_columns, 'columns': read_columns}
+        if steps:
+            options['normalize'] = list(steps)
+        state = ComparisonState(state_dir, input_folder, options, verify_state)
     
-    ws_summary.cell(row=8, column=1, value="عدد الملفات التي بها أخطاء:").font = Font(bold=True)
-    ws_summary.cell(row=8, column=2, value=len(error_files))
-    if error_files:
-        ws_summary.cell(row=8, column=2).font = error_font
-        ws_summary.cell(row=8, column=2).fill = error_fill
+    job = ComparisonJob(folder_sources(input_folder, excel_files), key_columns, read_columns, jobs=jobs, cache=cache,
+                        steps=steps, presorted=presorted, stream=stream, chunk_size=chunk_size, state=state,
+                        on_log=print, cancel=cancel)
     
-    ws_summary.cell(row=10, column=1, value="إجمالي عدد السجلات:").font = Font(bold=True)
-    ws_summary.cell(row=10, column=2, value=len(combined_df))
+    # الدمج المرتب المطلوب صراحة يرفع ValueError إذا لم تكن الملفات مرتبة
+    try:
+        comparison = job.run()
+    except ValueError as e:
+        print(f"خطأ في المقارنة: {str(e)}")
+        return
     
-    ws_summary.cell(row=11, column=1, value="عدد السجلات الفريدة:").font = Font(bold=True)
-    ws_summary.cell(row=11, column=2, value=len(unique_records))
+    if comparison is None:
+        print("لم يتم قراءة أي ملفات إكسل بنجاح.")
+        return
     
-    if comparison_column:
-        ws_summary.cell(row=12, column=1, value="العامود المستخدم للمقارنة:").font = Font(bold=True)
-        ws_summary.cell(row=12, column=2, value=comparison_column)
+    file_names = comparison.file_names
+    row_counts = comparison.row_counts
+    unique_records = comparison.unique_records
+    unique_counts = comparison.unique_counts
+    skipped_files = comparison.skipped_files
+    error_files = comparison.error_files
+    
+    # القيم الفريدة في ملف والتي تشبه قيمة في ملف آخر (مثل خطأ في كتابة رقم)
+    matches = None
+    if fuzzy_distance is not None:
+        # التقرير يعرض القيم الأصلية (وليس القيم الموحدة) مثل باقي الأوراق
+        matches = possible_matches(comparison.membership, fuzzy_distance, fuzzy_similarity,
+                                   comparison.key_values())
+        print(f"عدد التطابقات المحتملة: {len(matches)}")
+    
+    # القيم المختلفة في باقي الأعمدة للمفاتيح الموجودة في أكثر من ملف
+    changes = None
+    if diff:
+        changes = changed_records(comparison.frames, comparison.membership, key_columns, tolerance=tolerance)
+        changed_keys = len(changes.drop_duplicates(subset=key_columns)) if len(changes) > 0 else 0
+        print(f"عدد السجلات المتغيرة: {changed_keys} - عدد القيم المختلفة: {len(changes)}")
+    
+    # إنشاء ملف إكسل جديد بنمط الكتابة فقط
+    # (تُكتب الصفوف مباشرة إلى الملف بأنماط مسماة مشتركة، لذلك لا تزيد الذاكرة مع حجم التقرير)
+    writer = StreamingReportWriter(cancel)
+    
+    # 1. ورقة الملخص (تُنشأ أولاً لأن أوراق الكتابة فقط تُحفظ بترتيب إنشائها)
+    summary_rows = [
+        [("ملخص مقارنة ملفات الإكسل", 'report_main_title')],
+        [(f"تاريخ التقرير: {datetime.now().strftime('%Y-%m-%d %H:%M')}", 'report_note')],
+        [],
+        [("معلومات المقارنة", 'report_section')],
+        [("عدد الملفات التي تم العثور عليها:", 'report_label'), len(excel_files)],
+        [("عدد الملفات التي تمت قراءتها بنجاح:", 'report_label'), (len(file_names), 'report_success')],
+        [("عدد الملفات التي تم تخطيها:", 'report_label'), (len(skipped_files), 'report_warning' if skipped_files else None)],
+        [("عدد الملفات التي بها أخطاء:", 'report_label'), (len(error_files), 'report_error' if error_files else None)],
+        [],
+        [("إجمالي عدد السجلات:", 'report_label'), sum(row_counts)],
+        # عدد المفاتيح المختلفة بدون المفتاح الفارغ، مثل عدد السجلات الفريدة لكل ملف
+        [("عدد السجلات الفريدة:", 'report_label'), len(comparison.membership.values)],
+    ]
+    
+    if key_columns:
+        summary_rows.append([("العامود المستخدم للمقارنة:", 'report_label'), column_label])
+        if steps:
+            summary_rows.append([("توحيد القيم:", 'report_label'), ", ".join(steps)])
+        if matches is not None:
+            summary_rows.append([("عدد التطابقات المحتملة:", 'report_label'), len(matches)])
+        if changes is not None:
+            summary_rows.append([("عدد السجلات المتغيرة:", 'report_label'), changed_keys])
+            summary_rows.append([("عدد القيم المختلفة:", 'report_label'), len(changes)])
     else:
-        ws_summary.cell(row=12, column=1, value="طريقة المقارنة:").font = Font(bold=True)
-        ws_summary.cell(row=12, column=2, value="مقارنة جميع الأعمدة")
+        summary_rows.append([("طريقة المقارنة:", 'report_label'), "مقارنة جميع الأعمدة"])
     
     # إضافة جدول تفاصيل الملفات
-    ws_summary.cell(row=14, column=1, value="تفاصيل الملفات التي تمت قراءتها بنجاح").font = Font(bold=True, size=12, color="366092")
-    
-    # إضافة رأس الجدول
+    summary_rows.append([])
+    summary_rows.append([("تفاصيل الملفات التي تمت قراءتها بنجاح", 'report_section')])
     headers = ["اسم الملف", "عدد السجلات", "عدد السجلات الفريدة", "النسبة المئوية للسجلات الفريدة"]
-    for i, header in enumerate(headers, 1):
-        cell = ws_summary.cell(row=15, column=i, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = centered_alignment
-        cell.border = border
-    
-    # إضافة بيانات الملفات
-    row_idx = 16
-    for file_name, df in dataframes.items():
-        # حساب عدد السجلات الفريدة لهذا الملف
-        if comparison_column:
-            current_values = set(df[comparison_column].tolist())
-            other_values = set()
-            for other_file, other_df in dataframes.items():
-                if other_file != file_name:
-                    other_values.update(other_df[comparison_column].tolist())
-            unique_values = current_values - other_values
-            unique_count = len(unique_values)
-        else:
-            # هذا تقريبي لأن الحساب الدقيق يتطلب مقارنة كل سجل
-            unique_count = len(df.drop_duplicates(subset=[col for col in df.columns if col != 'source_file']))
-            for other_file, other_df in dataframes.items():
-                if other_file != file_name:
-                    unique_count -= len(df.merge(other_df, how='inner', on=[col for col in df.columns if col != 'source_file']))
-            unique_count = max(0, unique_count)
+    summary_rows.append([(header, 'report_header') for header in headers])
+    header_idx = len(summary_rows)
+    
+    for file_index, (file_name, row_count) in enumerate(zip(file_names, row_counts)):
+        # عدد السجلات الفريدة لهذا الملف (قيم المفتاح الموجودة في هذا الملف فقط)
+        unique_count = int(unique_counts[file_index])
         
         # حساب النسبة المئوية
-        percentage = (unique_count / len(df)) * 100 if len(df) > 0 else 0
-        
-        # إضافة بيانات الملف
-        ws_summary.cell(row=row_idx, column=1, value=file_name).border = border
-        ws_summary.cell(row=row_idx, column=2, value=len(df)).border = border
-        ws_summary.cell(row=row_idx, column=3, value=unique_count).border = border
-        ws_summary.cell(row=row_idx, column=4, value=f"{percentage:.2f}%").border = border
+        percentage = (unique_count / row_count) * 100 if row_count > 0 else 0
         
-        row_idx += 1
+        summary_rows.append([(value, 'report_data') for value in (file_name, row_count, unique_count, f"{percentage:.2f}%")])
+    
+    row_idx = len(summary_rows) + 1
+    
+    # إضافة جدول للملفات التي تم تخطيها
+    if skipped_files:
+        summary_rows.extend([[], []])
+        summary_rows.append([("الملفات التي تم تخطيها", 'report_section_warning')])
+        headers = ["اسم الملف", "سبب التخطي", "الأعمدة المتاحة"]
+        summary_rows.append([(header, 'report_header_warning') for header in headers])
+        for file_info in skipped_files:
+            summary_rows.append([(file_info[key], 'report_data') for key in ('file', 'reason', 'available_columns')])
+    
+    # إضافة جدول للملفات التي بها أخطاء
+    if error_files:
+        summary_rows.extend([[], []])
+        summary_rows.append([("الملفات التي بها أخطاء", 'report_section_error')])
+        headers = ["اسم الملف", "وصف الخطأ"]
+        summary_rows.append([(header, 'report_header_error') for header in headers])
+        for file_info in error_files:
+            summary_rows.append([(file_info[key], 'report_data') for key in ('file', 'error')])
+    
+    ws_summary = writer.create_sheet("ملخص المقارنة", widths=rows_widths(summary_rows), merged=['A1:F1'])
+    for row in summary_rows:
+        writer.append(ws_summary, row)
     
     # إضافة رسم بياني للسجلات
     chart = BarChart()
@@ -353,102 +228,187 @@ def compare_excel_files(input_folder='in', comparison_column=None, output_file='
     chart.x_axis.title = "الملفات"
     chart.y_axis.title = "عدد السجلات"
     
-    data = Reference(ws_summary, min_col=2, min_row=15, max_row=row_idx-1, max_col=3)
-    cats = Reference(ws_summary, min_col=1, min_row=16, max_row=row_idx-1)
+    data = Reference(ws_summary, min_col=2, min_row=header_idx, max_row=row_idx-1, max_col=3)
+    cats = Reference(ws_summary, min_col=1, min_row=header_idx+1, max_row=row_idx-1)
     chart.add_data(data, titles_from_data=True)
     chart.set_categories(cats)
     chart.shape = 4
-    ws_summary.add_chart(chart, "H15")
+    ws_summary.add_chart(chart, f"H{header_idx}")
     
-    # إضافة جدول للملفات التي تم تخطيها
-    if skipped_files:
-        start_row = row_idx + 2
-        ws_summary.cell(row=start_row, column=1, value="الملفات التي تم تخطيها").font = Font(bold=True, size=12, color="9C5700")
-        
-        # إضافة رأس الجدول
-        headers = ["اسم الملف", "سبب التخطي", "الأعمدة المتاحة"]
-        for i, header in enumerate(headers, 1):
-            cell = ws_summary.cell(row=start_row+1, column=i, value=header)
-            cell.font = header_font
-            cell.fill = warning_fill
-            cell.alignment = centered_alignment
-            cell.border = border
-            cell.font = Font(bold=True, color="9C5700")
+    # 2. ورقة جميع السجلات الفريدة
+    if key_columns:
+        description = f"السجلات الفريدة بناءً على العامود: {column_label}"
+    else:
+        description = "السجلات الفريدة بناءً على جميع الأعمدة"
+    
+    header_rows = [
+        [("جميع السجلات الفريدة (بدون تكرار)", 'report_title')],
+        [(description, 'report_description')],
+        [],
+    ]
+    ws_unique = writer.create_sheet(
+        "جميع السجلات الفريدة",
+        widths=merge_widths(rows_widths(header_rows), frame_widths(unique_records)),
+        merged=['A1:E1', 'A2:E2']
+    )
+    for row in header_rows:
+        writer.append(ws_unique, row)
+    writer.append_frame(ws_unique, unique_records)
+    
+    # ورقة التطابقات المحتملة (عند تفعيل البحث عن القيم المتشابهة)
+    if matches is not None:
+        matches = matches.rename(columns={
+            'value': 'القيمة',
+            'file': 'الملف',
+            'match': 'القيمة المشابهة',
+            'match_files': 'ملفات القيمة المشابهة',
+            'distance': 'مسافة التعديل',
+            'similarity': 'نسبة التشابه',
+        })
+        header_rows = [
+            [("التطابقات المحتملة", 'report_title')],
+            [(f"قيم فريدة تختلف عن قيمة في ملف آخر بمسافة تعديل لا تتجاوز {fuzzy_distance} "
+              f"(العامود: {column_label})", 'report_description')],
+            [],
+        ]
+        ws_matches = writer.create_sheet(
+            "التطابقات المحتملة",
+            widths=merge_widths(rows_widths(header_rows), frame_widths(matches)),
+            merged=['A1:E1', 'A2:E2']
+        )
+        for row in header_rows:
+            writer.append(ws_matches, row)
+        if len(matches) > 0:
+            writer.append_frame(ws_matches, matches)
+        else:
+            writer.append(ws_matches, [("لا توجد تطابقات محتملة", 'report_no_data')])
+    
+    # ورقة السجلات المتغيرة (عند تفعيل مقارنة باقي الأعمدة)
+    if changes is not None:
+        changes = changes.rename(columns={'column': 'العامود'})
+        note = f" - الفرق المسموح للقيم الرقمية: {tolerance}" if tolerance else ""
+        header_rows = [
+            [("السجلات المتغيرة", 'report_title')],
+            [(f"قيم الأعمدة المختلفة للمفاتيح الموجودة في أكثر من ملف (العامود: {column_label}){note}",
+              'report_description')],
+            [],
+        ]
+        ws_changes = writer.create_sheet(
+            "السجلات المتغيرة",
+            widths=merge_widths(rows_widths(header_rows), frame_widths(changes)),
+            merged=['A1:E1', 'A2:E2']
+        )
+        for row in header_rows:
+            writer.append(ws_changes, row)
+        if len(changes) > 0:
+            writer.append_frame(ws_changes, changes)
+        else:
+            writer.append(ws_changes, [("لا توجد سجلات متغيرة", 'report_no_data')])
+    
+    # 3. ورقة لكل ملف تعرض السجلات الفريدة له
+    for file_index, (file_name, row_count) in enumerate(zip(file_names, row_counts)):
+        sheet_name = os.path.splitext(file_name)[0]
         
-        # إضافة بيانات الملفات التي تم تخطيها
-        for i, file_info in enumerate(skipped_files):
-            row = start_row + 2 + i
-            ws_summary.cell(row=row, column=1, value=file_info['file']).border = border
-            ws_summary.cell(row=row, column=2, value=file_info['reason']).border = border
-            ws_summary.cell(row=row, column=3, value=file_info['available_columns']).border = border
+        # السجلات الفريدة هي تلك التي لا يحمل قناع مفتاحها إلا بت هذا الملف
+        unique_to_file = comparison.unique_rows(file_index)
         
-        row_idx = start_row + 2 + len(skipped_files)
-    
-    # إضافة جدول للملفات التي بها أخطاء
-    if error_files:
-        start_row = row_idx + 2
-        ws_summary.cell(row=start_row, column=1, value="الملفات التي بها أخطاء").font = Font(bold=True, size=12, color="9C0006")
+        if key_columns:
+            description = f"السجلات الموجودة في هذا الملف فقط (بناءً على العامود: {column_label})"
+        else:
+            description = "السجلات الموجودة في هذا الملف فقط (بناءً على جميع الأعمدة)"
         
-        # إضافة رأس الجدول
-        headers = ["اسم الملف", "وصف الخطأ"]
-        for i, header in enumerate(headers, 1):
-            cell = ws_summary.cell(row=start_row+1, column=i, value=header)
-            cell.font = header_font
-            cell.fill = error_fill
-            cell.alignment = centered_alignment
-            cell.border = border
-            cell.font = Font(bold=True, color="9C0006")
+        header_rows = [
+            [(f"السجلات الفريدة في الملف: {file_name}", 'report_title')],
+            [(description, 'report_description')],
+            [],
+            [("إجمالي عدد السجلات في الملف:", 'report_label'), row_count],
+            [("عدد السجلات الفريدة:", 'report_label'), len(unique_to_file)],
+            [],
+        ]
         
-        # إضافة بيانات الملفات التي بها أخطاء
-        for i, file_info in enumerate(error_files):
-            row = start_row + 2 + i
-            ws_summary.cell(row=row, column=1, value=file_info['file']).border = border
-            ws_summary.cell(row=row, column=2, value=file_info['error']).border = border
-    
-    # تعديل عرض الأعمدة في ورقة الملخص
-    for column in ws_summary.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws_summary.column_dimensions[column_letter].width = adjusted_width
+        if len(unique_to_file) > 0:
+            ws_file = writer.create_sheet(
+                sheet_name,
+                widths=merge_widths(rows_widths(header_rows), frame_widths(unique_to_file)),
+                merged=['A1:E1', 'A2:E2']
+            )
+            for row in header_rows:
+                writer.append(ws_file, row)
+            writer.append_frame(ws_file, unique_to_file)
+        else:
+            # إذا لم تكن هناك سجلات فريدة، أضف رسالة
+            ws_file = writer.create_sheet(sheet_name, merged=['A1:E1', 'A2:E2', 'A7:E7'])
+            for row in header_rows:
+                writer.append(ws_file, row)
+            writer.append(ws_file, [("لا توجد سجلات فريدة لهذا الملف", 'report_no_data')])
     
     # حفظ الملف
     try:
-        wb.save(output_file)
+        writer.save(output_file)
         print(f"تم إنشاء ملف المقارنة بنجاح: {output_file}")
         return output_file
+    except ComparisonCancelled:
+        raise
     except Exception as e:
         print(f"خطأ في حفظ الملف: {str(e)}")
         # محاولة الحفظ باسم مختلف في حالة كان الملف مفتوحاً
         alternative_file = f"comparison_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         try:
-            wb.save(alternative_file)
+            writer.save(alternative_file)
             print(f"تم حفظ الملف باسم بديل: {alternative_file}")
             return alternative_file
         except Exception as e2:
             print(f"فشل في حفظ الملف البديل: {str(e2)}")
+            writer.discard()
             return None
 
 def main():
     # إعداد محلل وسائط سطر الأوامر
     parser = argparse.ArgumentParser(description="برنامج مقارنة ملفات الإكسل")
     parser.add_argument("--input", "-i", help="مجلد يحتوي على ملفات الإكسل للمقارنة", default="in")
-    parser.add_argument("--column", "-c", help="اسم العامود الذي سيتم المقارنة على أساسه")
+    parser.add_argument("--column", "-c", nargs="+", help="اسم العامود الذي سيتم المقارنة على أساسه (أو عدة أعمدة لمفتاح مركب)")
     parser.add_argument("--output", "-o", help="اسم ملف الإكسل الناتج", default="comparison_results.xlsx")
     parser.add_argument("--interactive", "-int", action="store_true", help="تشغيل البرنامج في الوضع التفاعلي")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="عدد العمليات المتوازية لقراءة الملفات (0 لاستخدام جميع المعالجات)")
+    parser.add_argument("--output-columns", nargs="+", help="الأعمدة التي تظهر في سجلات التقرير (تتم قراءة هذه الأعمدة وعامود المقارنة فقط)")
+    parser.add_argument("--cache-dir", help="مجلد الذاكرة المؤقتة للملفات المقروءة", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), help="الحجم الأقصى للذاكرة المؤقتة بالميجابايت")
+    parser.add_argument("--verify-cache", action="store_true", help="التحقق من محتوى الملفات قبل استخدام الذاكرة المؤقتة")
+    parser.add_argument("--no-cache", action="store_true", help="تعطيل الذاكرة المؤقتة وقراءة جميع الملفات من جديد")
+    parser.add_argument("--stream", action="store_true", help="قراءة الملفات صفاً بصف بدون تحميلها في الذاكرة (للملفات الكبيرة جداً)")
+    parser.add_argument("--incremental", action="store_true", help="إعادة قراءة الملفات المتغيرة فقط منذ التشغيل السابق (يتطلب --column)")
+    parser.add_argument("--state-dir", help="مجلد حالة المقارنة التزايدية", default=DEFAULT_STATE_DIR)
+    parser.add_argument("--verify-state", action="store_true", help="التحقق من محتوى الملفات قبل استخدام حالة المقارنة التزايدية")
+    parser.add_argument("--key-order", choices=["auto", "sorted", "hash"], default="auto",
+                        help="طريقة مقارنة عامود المقارنة: auto (الدمج المرتب عند اكتشاف أن الملفات مرتبة)، "
+                             "sorted (الملفات مرتبة حسب عامود المقارنة)، hash (جدول تجزئة دائماً)")
+    parser.add_argument("--normalize", nargs="*", choices=NORMALIZATION_STEPS, metavar="STEP",
+                        help="توحيد قيم عامود المقارنة قبل المقارنة: whitespace (المسافات)، case (حالة الأحرف)، "
+                             "arabic (أ/إ/ا و ة/ه و ى/ي والتشكيل)، digits (الأرقام العربية الهندية)؛ "
+                             "بدون خطوات لتطبيقها جميعاً")
+    parser.add_argument("--fuzzy", nargs="?", type=int, const=DEFAULT_MAX_DISTANCE, metavar="DISTANCE",
+                        help=f"البحث عن قيم متشابهة بين الملفات بمسافة تعديل لا تتجاوز DISTANCE "
+                             f"(الافتراضي: {DEFAULT_MAX_DISTANCE}) وإضافة ورقة التطابقات المحتملة")
+    parser.add_argument("--fuzzy-similarity", type=float, default=DEFAULT_MIN_SIMILARITY,
+                        help="أدنى نسبة تشابه للتطابقات المحتملة (بين 0 و 1)")
+    parser.add_argument("--diff", action="store_true",
+                        help="مقارنة باقي الأعمدة للمفاتيح الموجودة في أكثر من ملف وإضافة ورقة السجلات المتغيرة (يتطلب --column)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="أكبر فرق مسموح بين القيم الرقمية عند مقارنة السجلات المتغيرة")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="عدد الصفوف في كل دفعة عند القراءة المتدفقة")
+    parser.add_argument("--timeout", type=float, help="إيقاف المقارنة بعد عدد الثواني المحدد بدون إنشاء ملف المقارنة")
     
     # تحليل وسائط سطر الأوامر
     args = parser.parse_args()
     
+    # إعداد الذاكرة المؤقتة للملفات المقروءة
+    cache = None
+    if not args.no_cache:
+        cache = SheetCache(args.cache_dir, args.cache_size * 1024 * 1024, args.verify_cache)
+    
     # تحديد ما إذا كان يجب تشغيل البرنامج في الوضع التفاعلي
     if args.interactive:
-        run_interactive_mode()
+        run_interactive_mode(cache)
     else:
         # تشغيل البرنامج باستخدام الوسائط المحددة
         input_folder = args.input
@@ -464,16 +424,62 @@ def main():
         print("=" * 60)
         
         print(f"\nالمجلد المحدد: {input_folder}")
-        print(f"العامود المستخدم للمقارنة: {comparison_column if comparison_column else 'جميع الأعمدة'}")
+        print(f"العامود المستخدم للمقارنة: {' + '.join(comparison_column) if comparison_column else 'جميع الأعمدة'}")
         print(f"ملف الإخراج: {output_file}")
+        print(f"عدد العمليات المتوازية للقراءة: {resolve_jobs(args.jobs)}")
+        print(f"الذاكرة المؤقتة: {'معطلة' if cache is None else cache.cache_dir}")
+        if args.incremental:
+            print(f"المقارنة التزايدية: {args.state_dir}")
+        if args.stream:
+            print(f"القراءة المتدفقة: مفعلة (حجم الدفعة: {args.chunk_size})")
+        if args.normalize is not None:
+            print(f"توحيد القيم: {', '.join(resolve_steps(args.normalize))}")
+        if args.fuzzy is not None:
+            print(f"البحث عن التطابقات المحتملة: مسافة التعديل {args.fuzzy} - نسبة التشابه {args.fuzzy_similarity}")
+        if args.diff:
+            print(f"مقارنة السجلات المتغيرة: الفرق المسموح للقيم الرقمية {args.tolerance}")
+        if args.timeout:
+            print(f"المهلة القصوى للمقارنة: {args.timeout} ثانية")
+        print("اضغط Ctrl+C لإيقاف المقارنة")
         print("\n" + "-" * 60)
         
+        # إشارة الإيقاف: تنتهي بعد المهلة المحددة أو عند الضغط على Ctrl+C،
+        # وتتوقف المقارنة عند أقرب نقطة تحقق مع حذف ما كُتب جزئياً
+        cancel = CancelToken(args.timeout)
+        
+        def interrupt(signum, frame):
+            cancel.cancel("تم إيقاف المقارنة بالضغط على Ctrl+C")
+            # الضغط مرة أخرى يوقف البرنامج فوراً
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+        
+        signal.signal(signal.SIGINT, interrupt)
+        
         # تنفيذ المقارنة
-        result_file = compare_excel_files(
-            input_folder=input_folder,
-            comparison_column=comparison_column,
-            output_file=output_file
-        )
+        try:
+            result_file = compare_excel_files(
+                input_folder=input_folder,
+                comparison_column=comparison_column,
+                output_file=output_file,
+                jobs=args.jobs,
+                output_columns=args.output_columns,
+                cache=cache,
+                stream=args.stream,
+                chunk_size=args.chunk_size,
+                state_dir=args.state_dir if args.incremental else None,
+                verify_state=args.verify_state,
+                presorted={'auto': None, 'sorted': True, 'hash': False}[args.key_order],
+                normalize=args.normalize,
+                fuzzy_distance=args.fuzzy,
+                fuzzy_similarity=args.fuzzy_similarity,
+                diff=args.diff,
+                tolerance=args.tolerance,
+                cancel=cancel
+            )
+        except ComparisonCancelled as e:
+            print(f"\n{str(e)}. لم يتم إنشاء ملف المقارنة.")
+            result_file = None
+        finally:
+            signal.signal(signal.SIGINT, signal.default_int_handler)
         
         if result_file:
             print("\n" + "=" * 60)
@@ -489,8 +495,13 @@ def main():
         
         print("\n" + "=" * 60)
 
-def run_interactive_mode():
-    """تشغيل البرنامج في الوضع التفاعلي حيث يطلب من المستخدم إدخال المعلومات"""
+def run_interactive_mode(cache=None):
+    """
+    تشغيل البرنامج في الوضع التفاعلي حيث يطلب من المستخدم إدخال المعلومات
+    
+    المعلمات:
+    cache (SheetCache): الذاكرة المؤقتة للملفات المقروءة حسب خيارات سطر الأوامر (None لتعطيلها)
+    """
     print("\n" + "=" * 60)
     print("برنامج مقارنة ملفات الإكسل".center(60))
     print("=" * 60)
@@ -523,8 +534,8 @@ def run_interactive_mode():
     # محاولة قراءة أول ملف للحصول على قائمة الأعمدة المتاحة
     try:
         first_file = os.path.join(input_folder, excel_files[0])
-        df = pd.read_excel(first_file)
-        available_columns = df.columns.tolist()
+        schema = probe_workbook(first_file)
+        available_columns = schema['sheets'][schema['sheet_names'][0]]['columns']
         
         print("\nالأعمدة المتاحة في الملف الأول:")
         for i, col in enumerate(available_columns, 1):
@@ -557,7 +568,8 @@ def run_interactive_mode():
     print("جاري معالجة الملفات...")
     
     # تنفيذ المقارنة
-    result_file = compare_excel_files(input_folder=input_folder, comparison_column=comparison_column, output_file=output_file)
+    result_file = compare_excel_files(input_folder=input_folder, comparison_column=comparison_column, output_file=output_file,
+                                      cache=cache)
     
     if result_file:
         print("\n" + "=" * 60)
@@ -565,7 +577,6 @@ def run_interactive_mode():
         
         # محاولة فتح الملف تلقائياً
         try:
-            import os
             os.system(f'start excel "{result_file}"')
             print("تم فتح الملف تلقائياً.")
         except:
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""النواة المشتركة لمحرك المقارنة بين واجهة سطر الأوامر والواجهة الرسومية"""
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import uuid
+import hashlib
+import pandas as pd
+
+# يتم تغييره عند تغيير طريقة تخزين البيانات لإبطال الذاكرة المؤقتة القديمة
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".excel_compare_cache")
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024  # 1 جيجابايت
+
+def _parquet_available():
+    """التحقق من توفر مكتبة لقراءة وكتابة ملفات Parquet"""
+    for module in ("pyarrow", "fastparquet"):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+def file_content_hash(path):
+    """حساب بصمة محتوى الملف (SHA-256)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class SheetCache:
+    """
+    ذاكرة مؤقتة على القرص لأوراق العمل بعد تحليلها
+    
+    يتم تحديد كل ورقة بمسار الملف ووقت تعديله وحجمه واسم الورقة والأعمدة المقروءة
+    (ومحتوى الملف اختيارياً)، وتُخزن بصيغة Parquet فقط: لا يتم استخدام pickle لأن
+    المجلد مشترك وقراءة pickle قد تنفذ أوامر، كما قد لا يُقرأ بإصدار آخر من pandas.
+    بدون مكتبة Parquet (pyarrow) أو للأوراق التي لا يمكن حفظها بها لا يتم التخزين.
+    عند تجاوز الحجم الأقصى يتم حذف الأوراق الأقل استخداماً أولاً.
+    """
+    
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE, verify_content=False):
+        """
+        المعاملات:
+        cache_dir (str): مجلد الذاكرة المؤقتة
+        max_bytes (int): الحجم الأقصى للذاكرة المؤقتة بالبايت
+        verify_content (bool): التحقق من محتوى الملف بالإضافة إلى وقت التعديل والحجم
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.verify_content = verify_content
+    
+    def options(self):
+        """إعدادات الذاكرة المؤقتة كقاموس يمكن تمريره إلى العمليات المتوازية"""
+        return {'cache_dir': self.cache_dir, 'max_bytes': self.max_bytes, 'verify_content': self.verify_content}
+    
+    def entry_key(self, path, sheet, columns=None):
+        """مفتاح الورقة في الذاكرة المؤقتة"""
+        stat = os.stat(path)
+        parts = {
+            'version': CACHE_FORMAT_VERSION,
+            'path': os.path.abspath(path),
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sheet': sheet,
+            'columns': [str(column) for column in columns] if columns else None,
+        }
+        if self.verify_content:
+            parts['content'] = file_content_hash(path)
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    
+    def _entry_paths(self, key):
+        """مسارات ملفات المدخل: البيانات والبيانات الوصفية"""
+        base = os.path.join(self.cache_dir, key)
+        return base + ".parquet", base + ".json"
+    
+    def load(self, path, sheet, columns=None):
+        """
+        قراءة الورقة من الذاكرة المؤقتة
+        
+        المدخل التالف (مثل ملف غير مكتمل أو لا يمكن قراءته بإصدار المكتبة الحالي)
+        يتم حذفه ويُعامل كمدخل غير موجود، لتتم قراءة الورقة من الملف مرة أخرى.
+        
+        القيمة المرجعة:
+        tuple: (البيانات، جميع أعمدة الورقة) أو None إذا لم تكن موجودة
+        """
+        if not _parquet_available():
+            return None
+        try:
+            entry_paths = self._entry_paths(self.entry_key(path, sheet, columns))
+        except OSError:
+            return None
+        parquet_path, meta_path = entry_paths
+        
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove_entry(entry_paths)
+            return None
+        
+        try:
+            df = pd.read_parquet(parquet_path)
+            
+            # تحديث وقت الاستخدام لترتيب الحذف (الأقل استخداماً أولاً)
+            os.utime(meta_path)
+            os.utime(parquet_path)
+            return df, meta['columns']
+        except Exception:
+            self._remove_entry(entry_paths)
+            return None
+    
+    def _remove_entry(self, entry_paths):
+        """حذف ملفات مدخل تالف من الذاكرة المؤقتة"""
+        for file_path in entry_paths:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+    
+    def store(self, path, sheet, columns, df, all_columns):
+        """حفظ الورقة في الذاكرة المؤقتة (أخطاء الحفظ لا توقف المقارنة)"""
+        if not _parquet_available():
+            return
+        parquet_temp = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            parquet_path, meta_path = self._entry_paths(self.entry_key(path, sheet, columns))
+            temp_suffix = f".{uuid.uuid4().hex}.tmp"
+            
+            # بعض الأعمدة (مثل الأنواع المختلطة) لا يمكن حفظها بصيغة Parquet، ولا يتم تخزينها
+            parquet_temp = parquet_path + temp_suffix
+            df.to_parquet(parquet_temp)
+            os.replace(parquet_temp, parquet_path)
+            
+            # تُكتب البيانات الوصفية أخيراً حتى لا يُقرأ مدخل غير مكتمل
+            with open(meta_path + temp_suffix, "w", encoding="utf-8") as f:
+                json.dump({'format': "parquet", 'columns': [str(column) for column in all_columns]}, f, ensure_ascii=False)
+            os.replace(meta_path + temp_suffix, meta_path)
+        except Exception:
+            if parquet_temp is not None and os.path.exists(parquet_temp):
+                try:
+                    os.remove(parquet_temp)
+                except OSError:
+                    pass
+    
+    def evict(self):
+        """حذف المدخلات الأقل استخداماً حتى يصبح حجم الذاكرة المؤقتة ضمن الحد الأقصى"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        
+        entries = {}
+        for name in os.listdir(self.cache_dir):
+            key, extension = os.path.splitext(name)
+            # ملفات .pkl من إصدار سابق للذاكرة المؤقتة لا تُقرأ، ويتم حذفها مع الأقل استخداماً
+            if extension not in (".parquet", ".pkl", ".json"):
+                continue
+            file_path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entry = entries.setdefault(key, {'size': 0, 'used': 0, 'files': []})
+            entry['size'] += stat.st_size
+            entry['used'] = max(entry['used'], stat.st_mtime)
+            entry['files'].append(file_path)
+        
+        total = sum(entry['size'] for entry in entries.values())
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]['used']):
+            if total <= self.max_bytes:
+                break
+            for file_path in entry['files']:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+            total -= entry['size']
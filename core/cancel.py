@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+
+class ComparisonCancelled(Exception):
+    """تم إيقاف المقارنة قبل اكتمالها (بطلب المستخدم أو بعد انتهاء المهلة)"""
+
+class CancelToken:
+    """
+    إشارة إيقاف مشتركة بين من يطلب الإيقاف (زر الإلغاء أو Ctrl+C) وخيط المقارنة
+    
+    لا يتم إيقاف الخيط بالقوة، بل تتحقق مراحل المقارنة من الإشارة في نقاط محددة
+    (بعد كل ملف وكل دفعة صفوف وكل مجموعة صفوف في التقرير) وترفع ComparisonCancelled،
+    ثم تحذف كل مرحلة ما كتبته جزئياً (مثل الملفات المؤقتة للتقرير).
+    """
+    
+    def __init__(self, timeout=None):
+        """
+        المعاملات:
+        timeout (float): المهلة القصوى للمقارنة بالثواني (None بدون مهلة)
+        """
+        self._event = threading.Event()
+        self.reason = None
+        self.deadline = time.monotonic() + timeout if timeout else None
+    
+    def cancel(self, reason="تم إلغاء المقارنة"):
+        """طلب الإيقاف (يمكن استدعاؤها من أي خيط أو من معالج إشارة)"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+    
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("انتهت المهلة المحددة للمقارنة")
+        return self._event.is_set()
+    
+    def check(self):
+        """رفع ComparisonCancelled إذا طُلب الإيقاف"""
+        if self.cancelled:
+            raise ComparisonCancelled(self.reason)
+
+def check_cancelled(cancel):
+    """التحقق من إشارة الإيقاف إن وجدت (None بدون إيقاف)"""
+    if cancel is not None:
+        cancel.check()
@@ -0,0 +1,524 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+import pandas as pd
+
+from core.cancel import ComparisonCancelled, check_cancelled
+from core.fingerprint import row_fingerprints, composite_keys
+from core.ingest import read_sheets, resolve_jobs
+from core.membership import MembershipIndex, text_column
+from core.normalize import normalize_frame
+from core.streaming import index_sheets, fetch_rows, DEFAULT_CHUNK_SIZE
+
+def folder_sources(input_folder, file_names):
+    """مصادر المقارنة لملفات مجلد (الورقة الأولى من كل ملف باسم الملف)"""
+    return [{'name': file_name, 'path': os.path.join(input_folder, file_name)} for file_name in file_names]
+
+class ComparisonResult:
+    """
+    نتيجة مقارنة الملفات بغض النظر عن طريقة القراءة
+    
+    تحمل فهرس العضوية وإحصائيات الملفات، وتُحسب السجلات الفريدة والقيم الأصلية
+    للمفاتيح عند طلبها فقط لأن كل واجهة تكتب تقريراً مختلفاً منها.
+    """
+    
+    def __init__(self, file_names, row_counts, membership, key_columns, skipped_files, error_files,
+                 unique_records, unique_rows, labels=None, frames=None):
+        """
+        المعاملات:
+        file_names (list): أسماء الملفات المقروءة بترتيب الفهرس
+        row_counts (list): عدد السجلات في كل ملف
+        membership (MembershipIndex): فهرس العضوية لجميع الملفات
+        key_columns (list): أسماء أعمدة المفتاح (فارغة عند المقارنة بجميع الأعمدة)
+        skipped_files (list): الملفات التي تم تخطيها ('file' و 'reason' و 'available_columns')
+        error_files (list): الملفات التي بها أخطاء ('file' و 'error')
+        unique_records (callable): دالة تعيد أول ظهور لكل مفتاح بترتيب الملفات ثم الصفوف
+                                   مع عامود source_file
+        unique_rows (callable): دالة تعيد صفوف الملف (برقمه) التي لا يوجد مفتاحها في ملف آخر
+        labels (callable): دالة تعيد القيم الأصلية لأجزاء المفتاح لكل قيمة في الفهرس
+                           (None عندما تكون قيم الفهرس نفسها هي القيم المعروضة)
+        frames (list): جداول الملفات في الذاكرة بترتيب الفهرس (None في القراءة المتدفقة والتزايدية)
+        """
+        self.file_names = list(file_names)
+        self.row_counts = list(row_counts)
+        self.membership = membership
+        self.key_columns = list(key_columns)
+        self.skipped_files = skipped_files
+        self.error_files = error_files
+        self.frames = frames
+        self._unique_records = unique_records
+        self._unique_rows = unique_rows
+        self._labels = labels
+        self._unique_records_frame = None
+    
+    @property
+    def unique_counts(self):
+        """عدد القيم الموجودة في كل ملف فقط"""
+        return self.membership.unique_counts()
+    
+    @property
+    def unique_records(self):
+        """أول ظهور لكل مفتاح بجميع أعمدته (يُحسب مرة واحدة عند طلبه)"""
+        if self._unique_records_frame is None:
+            self._unique_records_frame = self._unique_records()
+        return self._unique_records_frame
+    
+    def unique_rows(self, file_index):
+        """صفوف الملف التي لا يوجد مفتاحها في أي ملف آخر مع عامود source_file"""
+        return self._unique_rows(file_index)
+    
+    def key_values(self):
+        """
+        القيمة الأصلية لعامود المقارنة كما تظهر في أوراق التقرير لكل قيمة في الفهرس
+        
+        تختلف عن قيم الفهرس عند توحيد القيم (مثل '١٢٣' بدلاً من 123). صفوف السجلات
+        الفريدة هي أول ظهور لكل قيمة بترتيب الملفات ثم الصفوف (انظر first_rows_in)،
+        لذلك تطابق رموز الفهرس لهذه الصفوف بنفس الترتيب بعد حذف صف المفتاح الفارغ.
+        
+        القيمة المرجعة:
+        ndarray: القيم الأصلية للعامود الأول من أعمدة المقارنة بترتيب قيم الفهرس
+        """
+        membership = self.membership
+        first_rows = [membership.first_rows_in(file_index) for file_index in range(len(self.file_names))]
+        records = self.unique_records
+        missing = membership.first_missing()
+        if missing is not None:
+            file_index, row = missing
+            position = sum(len(rows) for rows in first_rows[:file_index]) + np.searchsorted(first_rows[file_index], row)
+            records = records.drop(records.index[position])
+        
+        codes = np.concatenate([np.asarray(membership.file_codes[file_index])[rows]
+                                for file_index, rows in enumerate(first_rows)])
+        values = np.empty(len(membership.values), dtype=object)
+        values[codes] = records[self.key_columns[0]].to_numpy(dtype=object)
+        return values
+    
+    def labels(self):
+        """
+        بداية صف جدول المقارنة لكل قيمة في الفهرس (انظر MembershipIndex.iter_rows)
+        
+        القيمة المرجعة:
+        list: القيم الأصلية لأجزاء المفتاح بترتيب قيم الفهرس، أو None لاستخدام قيم الفهرس
+        """
+        return self._labels() if self._labels is not None else None
+
+class ComparisonJob:
+    """
+    مقارنة مجموعة أوراق عمل بدون واجهة (يستخدمها سطر الأوامر والواجهة الرسومية)
+    
+    تحدد المصادر وأعمدة المفتاح والإعدادات عند الإنشاء، ثم تعيد run نتيجة المقارنة
+    بإحدى ثلاث طرق: القراءة في الذاكرة (الافتراضية) أو القراءة المتدفقة أو المقارنة
+    التزايدية. تُرسل رسائل السجل والتقدم إلى الدوال المحددة بدلاً من الطباعة أو
+    عناصر الواجهة، لذلك يمكن تشغيل المقارنة وقياس زمنها في مهام دفعية.
+    """
+    
+    def __init__(self, sources, key_columns=None, read_columns=None, jobs=1, cache=None, pool=None, steps=(),
+                 presorted=None, as_text=False, sort=False, drop_empty_keys=False, stream=False,
+                 chunk_size=DEFAULT_CHUNK_SIZE, state=None, on_log=None, on_progress=None, cancel=None):
+        """
+        المعاملات:
+        sources (list): مصادر المقارنة، كل مصدر قاموس يحتوي على 'name' (اسم الملف في التقرير)
+                        و 'path' و 'sheet' (اختياري، الورقة الأولى افتراضياً)
+                        و 'key_columns' (اختياري، أعمدة المفتاح في هذا المصدر إذا اختلفت أسماؤها)
+                        و 'columns' (اختياري، الأعمدة المطلوب قراءتها من هذا المصدر)
+        key_columns (list): أعمدة المفتاح (None أو قائمة فارغة للمقارنة بجميع الأعمدة)
+        read_columns (list): الأعمدة المطلوب قراءتها من المصادر التي لا تحدد 'columns' (None لجميع الأعمدة)
+        jobs (int): عدد العمليات المتوازية للقراءة (0 لاستخدام جميع المعالجات)
+        cache (SheetCache): الذاكرة المؤقتة للأوراق المحللة (None لتعطيلها)
+        pool (WorkbookPool): ملفات الجلسة المفتوحة (للقراءة المتسلسلة فقط)
+        steps (tuple): خطوات توحيد قيم المفتاح (انظر core.normalize.resolve_steps)
+        presorted (bool): استخدام الدمج المرتب لعامود مفتاح واحد (انظر MembershipIndex.from_columns)
+        as_text (bool): مقارنة المفاتيح بصيغتها النصية (عندما تختلف أنواع العامود بين الملفات)
+        sort (bool): ترتيب قيم الفهرس تصاعدياً (ترتيب صفوف جدول المقارنة)
+        drop_empty_keys (bool): حذف الصفوف الفارغة في جميع أجزاء المفتاح قبل المقارنة
+        stream (bool): القراءة المتدفقة صفاً بصف للملفات الأكبر من الذاكرة
+        chunk_size (int): عدد الصفوف في كل دفعة عند القراءة المتدفقة
+        state (ComparisonState): حالة التشغيل السابق للمقارنة التزايدية (None لتعطيلها)
+        on_log (callable): دالة تستقبل كل رسالة سجل (None لتجاهل الرسائل)
+        on_progress (callable): دالة تستقبل (المرحلة، المنجز، الإجمالي) بعد كل خطوة
+        cancel (CancelToken): إشارة الإيقاف، يتم التحقق منها بعد كل ملف ودفعة ومرحلة
+        """
+        self.sources = list(sources)
+        self.key_columns = list(key_columns or [])
+        self.read_columns = read_columns
+        self.jobs = jobs
+        self.cache = cache
+        self.pool = pool
+        self.steps = tuple(steps)
+        self.presorted = presorted
+        self.as_text = as_text
+        self.sort = sort
+        self.drop_empty_keys = drop_empty_keys
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.state = state
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.skipped_files = []  # ملفات تم تخطيها لعدم وجود العامود المحدد
+        self.error_files = []  # ملفات بها أخطاء
+    
+    def log(self, message):
+        if self.on_log is not None:
+            self.on_log(message)
+    
+    def progress(self, stage, done, total):
+        if self.on_progress is not None:
+            self.on_progress(stage, done, total)
+        check_cancelled(self.cancel)
+    
+    def source_key_columns(self, source):
+        """أعمدة المفتاح في المصدر"""
+        columns = source.get('key_columns')
+        if columns is None:
+            return self.key_columns
+        return [columns] if isinstance(columns, str) else list(columns)
+    
+    def _task(self, source):
+        task = {'path': source['path'], 'columns': source.get('columns', self.read_columns)}
+        if source.get('sheet') is not None:
+            task['sheet'] = source['sheet']
+        return task
+    
+    def _error(self, source, error):
+        self.log(f"خطأ في قراءة الملف '{source['name']}': {error}")
+        self.error_files.append({
+            'file': source['name'],
+            'error': error
+        })
+    
+    def _skip(self, source, missing_label, available_columns):
+        self.log(f"تحذير: العامود '{missing_label}' غير موجود في الملف '{source['name']}'. سيتم تخطي هذا الملف.")
+        self.log(f"الأعمدة المتاحة في الملف '{source['name']}': {available_columns}")
+        self.skipped_files.append({
+            'file': source['name'],
+            'reason': f"العامود '{missing_label}' غير موجود",
+            'available_columns': available_columns
+        })
+    
+    def _missing_label(self, source, columns):
+        """أعمدة المفتاح غير الموجودة في المصدر (نص فارغ إذا وجدت جميعها)"""
+        return ', '.join(column for column in self.source_key_columns(source) if column not in columns)
+    
+    def run(self):
+        """
+        تشغيل المقارنة
+        
+        يرفع ValueError إذا تعذرت المقارنة، مثل اختلاف عدد أعمدة المفتاح بين الملفات
+        أو طلب الدمج المرتب لأعمدة غير مرتبة، و ComparisonCancelled عند طلب الإيقاف
+        (تبقى حالة المقارنة التزايدية كما حُفظت في التشغيل السابق).
+        
+        القيمة المرجعة:
+        ComparisonResult: نتيجة المقارنة، أو None إذا لم تتم قراءة أي ملف
+        """
+        self.skipped_files = []
+        self.error_files = []
+        if self.state is not None:
+            try:
+                return self._run_incremental()
+            except ComparisonCancelled:
+                self.state.discard()
+                raise
+        if self.stream:
+            return self._run_stream()
+        return self._run_memory()
+    
+    def _run_memory(self):
+        """قراءة جميع الملفات في الذاكرة ثم بناء فهرس العضوية"""
+        total_files = len(self.sources)
+        self.log(f"جاري قراءة {total_files} ملف باستخدام {min(resolve_jobs(self.jobs), max(total_files, 1))} عملية...")
+        
+        # قراءة الملفات (بالتوازي عند تحديد أكثر من عملية) مع الحفاظ على ترتيب الملفات
+        results = read_sheets([self._task(source) for source in self.sources], jobs=self.jobs, cache=self.cache,
+                              pool=self.pool, on_progress=lambda done, total: self.progress('read', done, total),
+                              cancel=self.cancel)
+        
+        sources = []
+        frames = []
+        for source, result in zip(self.sources, results):
+            if result['error'] is not None:
+                self._error(source, result['error'])
+                continue
+            
+            df = result['df']
+            
+            # التحقق من وجود الأعمدة المحددة للمقارنة
+            missing_label = self._missing_label(source, df.columns)
+            if missing_label:
+                self._skip(source, missing_label, ', '.join(str(column) for column in result['columns']))
+                continue
+            
+            # إزالة الصفوف التي تحتوي على قيم فارغة في جميع أجزاء المفتاح
+            key_columns = self.source_key_columns(source)
+            if self.drop_empty_keys and key_columns:
+                original_count = len(df)
+                df = df.dropna(subset=key_columns, how='all')
+                if len(df) < original_count:
+                    self.log(f"تم حذف {original_count - len(df)} صف يحتوي على قيم فارغة في عمود المقارنة"
+                             f" من الملف '{source['name']}'")
+            
+            sources.append(source)
+            frames.append(df)
+            cached = " (من الذاكرة المؤقتة)" if result['cached'] else ""
+            self.log(f"تم قراءة الملف: {source['name']}{cached} - عدد السجلات: {len(df)}")
+        
+        if not frames:
+            return None
+        
+        # أجزاء المفتاح المركب تُطابق حسب ترتيبها، لذلك يجب أن يتساوى عددها في جميع الملفات
+        file_names = [source['name'] for source in sources]
+        source_columns = [self.source_key_columns(source) for source in sources]
+        widths = {len(columns) for columns in source_columns}
+        if len(widths) > 1:
+            raise ValueError("يجب تحديد نفس عدد أعمدة المقارنة لجميع الملفات.")
+        width = widths.pop()
+        key_columns = self.key_columns or source_columns[0]
+        
+        self.progress('index', 0, 1)
+        parts = None
+        if width == 0:
+            # بصمة كل صف بناءً على جميع الأعمدة (بترتيب ظهورها في الملفات)
+            columns_to_check = list(dict.fromkeys(column for df in frames for column in df.columns))
+            keys = row_fingerprints(frames, columns_to_check)
+            presorted = False
+        elif width == 1 and not self.steps:
+            # from_columns يحول القيم الفريدة فقط إلى نصوص عند المقارنة بالصيغة النصية
+            keys = [df[columns[0]] for df, columns in zip(frames, source_columns)]
+            presorted = self.presorted
+        else:
+            # المفاتيح الموحدة تُحسب بجانب القيم الأصلية، لذلك تعرض التقارير القيم الأصلية
+            parts = [df[columns] for df, columns in zip(frames, source_columns)]
+            if self.as_text:
+                parts = [part.apply(text_column) for part in parts]
+            normalized = [normalize_frame(part, part.columns, self.steps) for part in parts]
+            if width == 1:
+                keys = [key.iloc[:, 0] for key in normalized]
+                presorted = self.presorted
+            else:
+                # مفتاح مركب واحد لكل صف من جميع أعمدة المقارنة (غير مرتب، لذلك بدون دمج مرتب)
+                keys = composite_keys(normalized, [key.columns for key in normalized])
+                presorted = False
+            if self.steps:
+                self.log(f"تم توحيد قيم المقارنة: {', '.join(self.steps)}")
+        
+        membership = MembershipIndex.from_columns(keys, file_names, sort=self.sort, as_text=self.as_text and width == 1,
+                                                  presorted=presorted)
+        self.progress('index', 1, 1)
+        
+        def unique_records():
+            # أول ظهور لكل مفتاح بترتيب الملفات ثم الصفوف (بدون دمج جميع البيانات)
+            first_frames = []
+            missing = membership.first_missing() if width else None
+            for file_index, (file_name, df) in enumerate(zip(file_names, frames)):
+                first_rows = membership.first_rows_in(file_index)
+                if missing is not None and missing[0] == file_index:
+                    first_rows = np.sort(np.append(first_rows, missing[1]))
+                first_frames.append(df.iloc[first_rows].assign(source_file=file_name))
+            return pd.concat(first_frames, ignore_index=True)
+        
+        def unique_rows(file_index):
+            df = frames[file_index]
+            rows = membership.row_mask(file_index, membership.only_in(file_index))
+            return df[rows].assign(source_file=file_names[file_index])
+        
+        labels = None
+        if parts is not None:
+            def labels():
+                # القيم الأصلية لكل مفتاح من أول صف ظهر فيه بترتيب رموز الفهرس
+                first_parts = []
+                for file_index, part in enumerate(parts):
+                    rows = membership.first_rows_in(file_index)
+                    codes = membership.file_codes[file_index][rows]
+                    first_parts.append(part.iloc[rows].set_axis(key_columns, axis=1).set_axis(codes))
+                first_parts = pd.concat(first_parts).sort_index()
+                return first_parts.astype(object).where(first_parts.notna(), None).to_numpy().tolist()
+        
+        return ComparisonResult(file_names, [len(df) for df in frames], membership, key_columns, self.skipped_files,
+                                self.error_files, unique_records, unique_rows, labels, frames)
+    
+    def _run_incremental(self):
+        """
+        إعادة المقارنة بشكل تزايدي بالاعتماد على حالة التشغيل السابق
+        
+        تُقرأ الملفات المتغيرة أو الجديدة فقط، وتؤخذ قيم المقارنة للملفات الأخرى من
+        الحالة المحفوظة. تُعاد قراءة ملف لم يتغير فقط إذا تغيرت قيمه الفريدة بسبب
+        ملف آخر، وإلا تُستخدم سجلاته الفريدة المحفوظة كما هي.
+        """
+        key_columns = self.key_columns
+        state = self.state
+        entries = {}  # بيانات كل ملف (من الحالة السابقة أو بعد قراءته)
+        frames = {}  # الملفات المقروءة في هذا التشغيل
+        sources = {source['name']: source for source in self.sources}
+        
+        def read(files):
+            tasks = [self._task(sources[file]) for file in files]
+            results = read_sheets(tasks, jobs=self.jobs, cache=self.cache, pool=self.pool,
+                                  on_progress=lambda done, total: self.progress('read', done, total),
+                                  cancel=self.cancel)
+            return zip(files, tasks, results)
+        
+        # استخدام الحالة السابقة للملفات التي لم تتغير
+        changed_files = []
+        for source in self.sources:
+            file = source['name']
+            if not state.is_current(file, source['path']):
+                changed_files.append(file)
+            elif state.record(file)['kind'] == 'skipped':
+                record = state.record(file)
+                self._skip(source, record.get('missing_columns', ', '.join(key_columns)), record['available_columns'])
+            else:
+                entry = state.load_entry(file)
+                if entry is None:
+                    changed_files.append(file)
+                else:
+                    entries[file] = entry
+                    self.log(f"لم يتغير الملف: {file} - عدد السجلات: {len(entry['keys'])}")
+        
+        for file, task, result in read(changed_files):
+            if result['error'] is not None:
+                self._error(sources[file], result['error'])
+                continue
+            
+            df = result['df']
+            missing_label = self._missing_label(sources[file], df.columns)
+            if missing_label:
+                available_columns = ', '.join(result['columns'])
+                self._skip(sources[file], missing_label, available_columns)
+                state.update(file, task['path'], {'kind': 'skipped', 'missing_columns': missing_label,
+                                                  'available_columns': available_columns})
+                continue
+            
+            # المفاتيح الموحدة تُحفظ في الحالة حتى لا يُعاد توحيدها للملفات التي لم تتغير
+            key_frame = normalize_frame(df, key_columns, self.steps).reset_index(drop=True)
+            
+            # أول صف لكل قيمة داخل الملف مع أرقام الصفوف كفهرس
+            first_positions = np.flatnonzero(~key_frame.duplicated().to_numpy())
+            first_rows = df.iloc[first_positions]
+            first_rows.index = first_positions
+            
+            frames[file] = df
+            # أجزاء المفتاح المركب تُحفظ كجدول لأن رموز المفاتيح المركبة تختلف بين التشغيلات
+            keys = key_frame[key_columns[0]].to_numpy() if len(key_columns) == 1 else key_frame
+            entries[file] = {'keys': keys, 'first_rows': first_rows}
+            cached = " (من الذاكرة المؤقتة)" if result['cached'] else ""
+            self.log(f"تم قراءة الملف: {file}{cached} - عدد السجلات: {len(df)}")
+        
+        all_files = [source['name'] for source in self.sources]
+        file_names = [file for file in all_files if file in entries]
+        if not file_names:
+            state.save(all_files)
+            return None
+        
+        self.progress('index', 0, 1)
+        presorted = self.presorted
+        if len(key_columns) == 1:
+            keys = [entries[file]['keys'] for file in file_names]
+        else:
+            keys = composite_keys([entries[file]['keys'] for file in file_names], [key_columns] * len(file_names))
+            presorted = False
+        membership = MembershipIndex.from_columns(keys, file_names, sort=self.sort, presorted=presorted)
+        self.progress('index', 1, 1)
+        
+        def file_unique_keys(file_index, file):
+            """القيم الفريدة للملف بصيغة ثابتة بين التشغيلات (أجزاء المفتاح بدلاً من رمزه للمفاتيح المركبة)"""
+            if len(key_columns) == 1:
+                return membership.values[membership.only_in(file_index)]
+            parts = entries[file]['keys'][membership.row_mask(file_index, membership.only_in(file_index))]
+            parts = parts.astype(object).where(parts.notna(), None)
+            return set(parts.itertuples(index=False, name=None))
+        
+        # الملفات التي تحتاج إعادة حساب ورقتها: المقروءة الآن أو التي تغيرت قيمها الفريدة
+        unique_keys = {}
+        affected = []
+        for file_index, file in enumerate(file_names):
+            unique_keys[file] = file_unique_keys(file_index, file)
+            if file in frames or set(unique_keys[file]) != set(entries[file]['unique_keys']):
+                affected.append(file)
+        
+        check_cancelled(self.cancel)
+        reread = [file for file in affected if file not in frames]
+        for file, task, result in read(reread):
+            if result['error'] is not None:
+                raise RuntimeError(f"تعذر إعادة قراءة الملف '{file}': {result['error']}")
+            frames[file] = result['df']
+        
+        unique_frames = []
+        first_frames = []
+        missing = membership.first_missing()
+        for file_index, file in enumerate(file_names):
+            entry = entries[file]
+            if file in affected:
+                df = frames[file]
+                entry['unique_rows'] = df[membership.row_mask(file_index, membership.only_in(file_index))]
+                entry['unique_keys'] = unique_keys[file]
+                state.update(file, sources[file]['path'], {'kind': 'read'}, entry)
+            unique_frames.append(entry['unique_rows'].assign(source_file=file))
+            
+            # أول ظهور لكل قيمة بين جميع الملفات هو دائماً أول ظهور لها داخل ملفها
+            first_rows = membership.first_rows_in(file_index)
+            if missing is not None and missing[0] == file_index:
+                first_rows = np.sort(np.append(first_rows, missing[1]))
+            first_frames.append(entry['first_rows'].loc[first_rows].assign(source_file=file))
+        
+        state.save(all_files)
+        self.log(f"الملفات المقروءة: {len(frames)} من {len(all_files)} - الأوراق المعاد حسابها: {len(affected)} من {len(file_names)}")
+        
+        unique_records = pd.concat(first_frames, ignore_index=True)
+        return ComparisonResult(file_names, [len(entries[file]['keys']) for file in file_names], membership,
+                                key_columns, self.skipped_files, self.error_files, lambda: unique_records,
+                                lambda file_index: unique_frames[file_index])
+    
+    def _run_stream(self):
+        """
+        مقارنة الملفات بالقراءة المتدفقة بدون تحميلها في الذاكرة
+        
+        تُقرأ الملفات صفاً بصف لبناء فهرس المفاتيح (رمز لكل صف وموقع أول ظهور لكل
+        مفتاح)، ثم تُقرأ في تمريرة ثانية الصفوف التي تظهر في التقرير فقط، لذلك
+        تعتمد الذاكرة على عدد المفاتيح المميزة وحجم التقرير وليس على حجم البيانات.
+        """
+        key_columns = self.key_columns
+        tasks = [{'path': source['path'], 'sheet': source.get('sheet')} for source in self.sources]
+        index, results = index_sheets(tasks, key_columns, self.chunk_size, self.steps,
+                                      on_progress=lambda done, total: self.progress('read', done, total),
+                                      cancel=self.cancel)
+        
+        read_files = []
+        for source, task, result in zip(self.sources, tasks, results):
+            if result['error'] is not None:
+                self._error(source, result['error'])
+            elif result['missing_column']:
+                self._skip(source, self._missing_label(source, result['columns']),
+                           ', '.join(str(column) for column in result['columns']))
+            else:
+                read_files.append((source, task, result))
+                self.log(f"تم قراءة الملف: {source['name']} (قراءة متدفقة) - عدد السجلات: {result['rows']}")
+        
+        if not read_files:
+            return None
+        
+        file_names = [source['name'] for source, _, _ in read_files]
+        membership = MembershipIndex.from_codes(index.values, [index.codes(i) for i in range(len(file_names))], file_names)
+        
+        # تمريرة ثانية لكل ملف تقرأ فقط أول ظهور لكل مفتاح والصفوف الفريدة للملف
+        first_frames = []
+        file_uniques = []
+        for file_index, (source, task, result) in enumerate(read_files):
+            self.progress('fetch', file_index + 1, len(read_files))
+            first_rows = index.first_rows_in(file_index)
+            if index.first_missing is not None and index.first_missing[0] == file_index:
+                first_rows = np.append(first_rows, index.first_missing[1])
+            only_rows = np.flatnonzero(membership.row_mask(file_index, membership.only_in(file_index)))
+            
+            rows = fetch_rows(task['path'], task['sheet'], np.union1d(first_rows, only_rows), self.read_columns,
+                              self.chunk_size, self.cancel, result['numeric_columns'])
+            rows['source_file'] = source['name']
+            first_frames.append(rows.loc[np.unique(first_rows)])
+            file_uniques.append(rows.loc[only_rows])
+        
+        # ترتيب الملفات ثم الصفوف يطابق drop_duplicates بعد دمج الجداول
+        unique_records = pd.concat(first_frames, ignore_index=True)
+        return ComparisonResult(file_names, [result['rows'] for _, _, result in read_files], membership, key_columns,
+                                self.skipped_files, self.error_files, lambda: unique_records,
+                                lambda file_index: file_uniques[file_index])
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TOLERANCE = 0.0
+
+_NAT = np.iinfo(np.int64).min
+
+def _first_positions(codes, size):
+    """موقع أول صف لكل مفتاح في الملف (-1 للمفاتيح غير الموجودة فيه)"""
+    positions = np.full(size, -1, dtype=np.int64)
+    codes = np.asarray(codes)
+    present = np.flatnonzero(codes >= 0)[::-1]
+    # عند تكرار الموقع في الإسناد تبقى القيمة الأخيرة، لذلك يُسند بترتيب عكسي ليبقى أول صف
+    positions[codes[present]] = present
+    return positions
+
+def _comparison_kind(series_list):
+    """
+    نوع المقارنة لعامود حسب نوعه في جميع الملفات
+    
+    'numeric' إذا كان رقمياً في جميع الملفات (تُطبق المسافة المسموحة)،
+    و 'datetime' إذا كان تاريخاً في جميع الملفات، و 'object' لغير ذلك
+    (مقارنة القيم نفسها، لذلك تتساوى 1 و 1.0 ولا يتساوى 1 و "1").
+    """
+    if all(pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+           for series in series_list):
+        return 'numeric'
+    if all(pd.api.types.is_datetime64_any_dtype(series.dtype) for series in series_list):
+        return 'datetime'
+    return 'object'
+
+def _aligned_values(series, rows, kind):
+    """
+    قيم العامود في صفوف المفاتيح بنوع المقارنة (القيم غير الموجودة فارغة)
+    
+    القيمة المرجعة:
+    tuple: (القيم، قناع القيم الفارغة)
+    """
+    present = rows >= 0
+    taken = series.iloc[rows[present]]
+    if kind == 'numeric':
+        values = np.full(len(rows), np.nan)
+        values[present] = taken.to_numpy(dtype=np.float64, na_value=np.nan)
+        return values, np.isnan(values)
+    if kind == 'datetime':
+        values = np.full(len(rows), _NAT, dtype=np.int64)
+        values[present] = taken.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        return values, values == _NAT
+    values = np.full(len(rows), None, dtype=object)
+    values[present] = taken.to_numpy(dtype=object)
+    return values, pd.isna(values)
+
+def _is_number(values):
+    """القيم الرقمية (بدون القيم المنطقية) في مصفوفة من نوع object"""
+    return np.fromiter((isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+                        for value in values), dtype=bool, count=len(values))
+
+def _values_equal(a, missing_a, b, missing_b, kind, tolerance):
+    """مقارنة مصفوفتين عنصراً بعنصر (القيم الفارغة متساوية)"""
+    if kind == 'numeric':
+        with np.errstate(invalid='ignore'):
+            return (a == b) | (np.abs(a - b) <= tolerance) | (missing_a & missing_b)
+    if kind == 'datetime':
+        return a == b
+    equal = missing_a & missing_b
+    both = ~missing_a & ~missing_b
+    equal[both] = np.asarray(a[both] == b[both], dtype=bool)
+    if tolerance:
+        # الأرقام داخل الأعمدة المختلطة (مثل عامود به نص في أحد الملفات) تُقارن بالفرق المسموح
+        different = np.flatnonzero(both & ~equal)
+        numbers = different[_is_number(a[different]) & _is_number(b[different])]
+        if len(numbers) > 0:
+            difference = a[numbers].astype(np.float64) - b[numbers].astype(np.float64)
+            equal[numbers] = np.abs(difference) <= tolerance
+    return equal
+
+def changed_records(frames, index, key_columns, columns=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    القيم المختلفة للمفاتيح الموجودة في أكثر من ملف
+    
+    تتم محاذاة الصفوف بين الملفات برموز فهرس العضوية (أول صف لكل مفتاح في كل
+    ملف) بدلاً من ربط الجداول صفاً بصف، ثم مقارنة كل عامود مشترك بعمليات على
+    المصفوفات كاملة: قيمة كل ملف تُقارن بقيمة أول ملف يوجد فيه المفتاح.
+    
+    المعاملات:
+    frames (list): جداول الملفات بنفس ترتيب index.file_names
+    index (MembershipIndex): فهرس العضوية المبني من أعمدة المفتاح لهذه الجداول
+    key_columns (list): أعمدة المفتاح (تعرض قيمها من أول ملف يوجد فيه المفتاح)
+    columns (list): الأعمدة المطلوب مقارنتها (None لجميع الأعمدة الموجودة في ملفين على الأقل)
+    tolerance (float): أكبر فرق مسموح بين القيم الرقمية
+    
+    القيمة المرجعة:
+    DataFrame: أعمدة المفتاح ثم 'column' ثم عامود لكل ملف بقيمته، صف لكل مفتاح
+               وعامود مختلف (الملف الذي لا يوجد فيه المفتاح أو العامود قيمته فارغة)
+    """
+    file_names = list(index.file_names)
+    result_columns = list(key_columns) + ['column'] + file_names
+    if columns is None:
+        seen = [column for df in frames for column in df.columns if column not in key_columns]
+        columns = [column for column in dict.fromkeys(seen) if sum(column in df.columns for df in frames) > 1]
+    
+    shared = np.flatnonzero(index.file_counts() > 1)
+    if len(shared) == 0 or not columns:
+        return pd.DataFrame(columns=result_columns)
+    
+    rows = [_first_positions(codes, len(index))[shared] for codes in index.file_codes]
+    present = np.stack([file_rows >= 0 for file_rows in rows])
+    
+    key_ids = []
+    column_ids = []
+    file_values = [[] for _ in frames]
+    for column_id, column in enumerate(columns):
+        available = [i for i, df in enumerate(frames) if column in df.columns]
+        if len(available) < 2:
+            continue
+        kind = _comparison_kind([frames[i][column] for i in available])
+        values = {i: _aligned_values(frames[i][column], rows[i], kind) for i in available}
+        
+        # القيمة المرجعية لكل مفتاح من أول ملف يوجد فيه المفتاح والعامود
+        reference, reference_missing = (array.copy() for array in values[available[0]])
+        has_reference = present[available[0]].copy()
+        for i in available[1:]:
+            take = present[i] & ~has_reference
+            reference[take] = values[i][0][take]
+            reference_missing[take] = values[i][1][take]
+            has_reference |= present[i]
+        
+        changed = np.zeros(len(shared), dtype=bool)
+        for i in available:
+            changed |= present[i] & ~_values_equal(reference, reference_missing, *values[i], kind, tolerance)
+        changed_ids = np.flatnonzero(changed)
+        if len(changed_ids) == 0:
+            continue
+        
+        key_ids.append(changed_ids)
+        column_ids.append(np.full(len(changed_ids), column_id))
+        for i, df in enumerate(frames):
+            shown = np.full(len(changed_ids), None, dtype=object)
+            if column in df.columns:
+                changed_rows = rows[i][changed_ids]
+                found = changed_rows >= 0
+                shown[found] = df[column].iloc[changed_rows[found]].to_numpy(dtype=object)
+            file_values[i].append(shown)
+    
+    if not key_ids:
+        return pd.DataFrame(columns=result_columns)
+    
+    # ترتيب النتيجة حسب المفتاح ثم ترتيب الأعمدة
+    key_ids = np.concatenate(key_ids)
+    column_ids = np.concatenate(column_ids)
+    order = np.lexsort((column_ids, key_ids))
+    key_ids = key_ids[order]
+    
+    result = {}
+    source = present[:, key_ids].argmax(axis=0)
+    for key_column in key_columns:
+        shown = np.full(len(key_ids), None, dtype=object)
+        for i, df in enumerate(frames):
+            here = source == i
+            if here.any():
+                shown[here] = df[key_column].iloc[rows[i][key_ids[here]]].to_numpy(dtype=object)
+        result[key_column] = shown
+    result['column'] = np.array(columns, dtype=object)[column_ids[order]]
+    for file_name, values in zip(file_names, file_values):
+        result[file_name] = np.concatenate(values)[order]
+    return pd.DataFrame(result, columns=result_columns)
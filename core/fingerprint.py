@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+def normalize_rows(df, columns):
+    """
+    توحيد أعمدة الصفوف قبل حساب البصمة
+    
+    يتم ترتيب الأعمدة حسب القائمة المحددة (الأعمدة غير الموجودة تصبح فارغة)
+    وتحويل الأعمدة الرقمية إلى float64 حتى تتطابق بصمة 1 و 1.0 بين الملفات.
+    التحويل يفقد دقة الأعداد الصحيحة الأكبر من 2**53، لذلك يُستخدم للبصمة فقط.
+    """
+    normalized = df.reindex(columns=columns)
+    for column in columns:
+        series = normalized[column]
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            normalized[column] = series.astype(np.float64)
+    return normalized
+
+def hash_rows(df, columns):
+    """حساب بصمة 64 بت لكل صف بناءً على الأعمدة المحددة"""
+    return pd.util.hash_pandas_object(normalize_rows(df, columns), index=False).to_numpy()
+
+def _original_rows(frames, columns, offsets, positions):
+    """
+    القيم الأصلية (object) للصفوف المحددة بمواقعها في جميع الجداول
+    
+    يتم تحويل كل جدول إلى object قبل الدمج حتى لا يحول pd.concat أعمدة int64
+    إلى float64 عند دمجها مع أعمدة عشرية من ملف آخر.
+    """
+    positions = np.unique(positions)
+    parts = []
+    for i, df in enumerate(frames):
+        selected = positions[(positions >= offsets[i]) & (positions < offsets[i + 1])]
+        rows = df.iloc[selected - offsets[i]].reindex(columns=columns).astype(object)
+        parts.append(rows.set_axis(selected, axis=0))
+    return pd.concat(parts)
+
+def _rows_equal(left, right):
+    """مقارنة صفوف جدولين متساويين في الحجم عامود بعامود (القيم الفارغة متساوية)"""
+    equal = np.ones(len(left), dtype=bool)
+    for column in left.columns:
+        a = left[column].to_numpy(dtype=object)
+        b = right[column].to_numpy(dtype=object)
+        both_missing = pd.isna(a) & pd.isna(b)
+        equal &= (a == b) | both_missing
+    return equal
+
+def row_fingerprints(frames, columns):
+    """
+    حساب مفتاح هوية لكل صف في كل جدول بناءً على جميع الأعمدة المحددة
+    
+    يتم حساب بصمة 64 بت لكل صف مرة واحدة، ثم التحقق من عدم وجود تصادم بمقارنة
+    القيم الأصلية (قبل تحويلها إلى float64) لكل صف بأول صف يحمل نفس البصمة.
+    الصفوف المتصادمة فقط تحصل على مفاتيح جديدة بناءً على قيمها الفعلية، لذلك
+    تبقى النتيجة دقيقة حتى للأعداد الصحيحة الكبيرة (2**53 و 2**53 + 1 مختلفان).
+    
+    المعاملات:
+    frames (list): قائمة الجداول
+    columns (list): الأعمدة التي تحدد هوية الصف
+    
+    القيمة المرجعة:
+    list: مصفوفة مفاتيح int64 لكل جدول (الصفوف المتطابقة تحمل نفس المفتاح)
+    """
+    hashed = [hash_rows(df, columns) for df in frames]
+    lengths = [len(hashes) for hashes in hashed]
+    offsets = np.cumsum([0] + lengths)
+    
+    if not hashed or offsets[-1] == 0:
+        return [np.zeros(0, dtype=np.int64) for _ in frames]
+    
+    all_hashes = np.concatenate(hashed)
+    codes, uniques = pd.factorize(all_hashes)
+    codes = codes.astype(np.int64)
+    
+    # أول صف يحمل كل بصمة يمثل مجموعتها
+    positions = np.arange(len(codes))
+    first = np.empty(len(uniques), dtype=np.int64)
+    first[codes[::-1]] = positions[::-1]
+    representatives = first[codes]
+    
+    candidates = np.flatnonzero(representatives != positions)
+    if len(candidates):
+        combined = _original_rows(frames, columns, offsets, np.concatenate([candidates, representatives[candidates]]))
+        equal = _rows_equal(combined.loc[candidates], combined.loc[representatives[candidates]])
+        collided = candidates[~equal]
+        
+        if len(collided):
+            # إعادة ترميز الصفوف المتصادمة بناءً على قيمها الفعلية
+            collided_rows = combined.loc[collided].where(combined.loc[collided].notna(), None)
+            collided_codes, _ = pd.factorize(pd.Series(list(map(tuple, collided_rows.to_numpy()))))
+            codes[collided] = len(uniques) + collided_codes
+    
+    return [codes[offsets[i]:offsets[i + 1]] for i in range(len(frames))]
+
+def composite_keys(frames, key_columns):
+    """
+    مفتاح مركب واحد لكل صف من عدة أعمدة (مثل الفرع ورقم الفاتورة والتاريخ)
+    
+    تُحسب المفاتيح لجميع الصفوف دفعة واحدة من بصمات الصفوف (انظر row_fingerprints)
+    بدلاً من إنشاء tuple لكل صف. أجزاء المفتاح تُطابق حسب ترتيبها، لذلك يمكن أن
+    تختلف أسماء الأعمدة بين الملفات.
+    
+    المعاملات:
+    frames (list): قائمة الجداول
+    key_columns (list): قائمة أعمدة المفتاح لكل جدول (بنفس العدد في جميع الجداول)
+    
+    القيمة المرجعة:
+    list: مفاتيح Int64 لكل جدول (فارغة للصفوف التي جميع أجزاء مفتاحها فارغة)
+    """
+    width = len(key_columns[0]) if key_columns else 0
+    parts = [df[list(columns)].set_axis(range(width), axis=1) for df, columns in zip(frames, key_columns)]
+    codes = row_fingerprints(parts, list(range(width)))
+    
+    keys = []
+    for part, part_codes in zip(parts, codes):
+        missing = part.isna().all(axis=1).to_numpy()
+        keys.append(pd.Series(pd.arrays.IntegerArray(part_codes.astype(np.int64), missing), index=part.index))
+    return keys
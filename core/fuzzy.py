@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_DISTANCE = 1
+DEFAULT_MIN_SIMILARITY = 0.8
+
+def edit_distance(a, b, max_distance):
+    """
+    مسافة التعديل بين نصين (إضافة أو حذف أو استبدال حرف، أو تبديل حرفين متجاورين)
+    
+    يتم حذف البداية والنهاية المشتركتين أولاً، ثم حساب الخلايا القريبة من القطر
+    فقط (بعرض 2 × الحد الأقصى + 1) مع التوقف مبكراً عند تجاوز الحد، لذلك تكون
+    التكلفة خطية في طول الجزء المختلف.
+    
+    القيمة المرجعة:
+    int: المسافة، أو None إذا تجاوزت max_distance
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    
+    limit = max_distance + 1
+    before = None
+    previous = [j if j <= max_distance else limit for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [limit] * (len(b) + 1)
+        if i <= max_distance:
+            current[0] = i
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        for j in range(low, high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if before is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = min(value, limit)
+        if min(current[low - 1:high + 1]) > max_distance:
+            return None
+        before, previous = previous, current
+    
+    distance = previous[len(b)]
+    return distance if distance <= max_distance else None
+
+def deletion_variants(text, max_distance):
+    """
+    النص وجميع النصوص الناتجة عن حذف حتى max_distance حرف منه
+    
+    لا يتم الحذف حتى النص الفارغ: المفاتيح التي لا يزيد طولها عن max_distance
+    كانت ستشترك جميعها في النص الفارغ وتُقارن كل منها بالأخرى. الأزواج التي لا
+    تشترك إلا في النص الفارغ ليس بينها حرف مشترك، لذلك نسبة تشابهها 0.
+    """
+    variants = {text}
+    level = {text}
+    for _ in range(max_distance):
+        level = {variant[:i] + variant[i + 1:] for variant in level if len(variant) > 1 for i in range(len(variant))}
+        variants |= level
+    return variants
+
+def _variant_table(texts, ids, max_distance):
+    """جدول (النص المحذوف منه، رقم المفتاح) لكل مفتاح لاستخدامه كفهرس مقلوب"""
+    variants = [deletion_variants(text, max_distance) for text in texts]
+    owners = np.repeat(np.asarray(ids, dtype=np.int64), [len(key_variants) for key_variants in variants])
+    return pd.DataFrame({'variant': list(chain.from_iterable(variants)), 'id': owners})
+
+def similar_pairs(texts, probe_ids, target_ids=None, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    أزواج المفاتيح المتشابهة بين مفاتيح البحث والمفاتيح المستهدفة
+    
+    يتم بناء فهرس مقلوب من النصوص الناتجة عن حذف حتى max_distance حرف من كل
+    مفتاح: أي نصين بينهما مسافة تعديل لا تتجاوز k يشتركان في أحد هذه النصوص،
+    لذلك تُقارن فقط الأزواج التي تشترك في نص من الفهرس (بربط جدولين بدلاً من
+    مقارنة كل مفتاح بجميع المفاتيح)، ثم يتم التحقق من مسافة كل زوج.
+    
+    المعاملات:
+    texts (ndarray): الصيغة النصية لجميع المفاتيح
+    probe_ids (ndarray): أرقام المفاتيح التي يتم البحث عن مفاتيح مشابهة لها
+    target_ids (ndarray): أرقام المفاتيح التي يتم البحث فيها (None لجميع المفاتيح)
+    max_distance (int): أقصى مسافة تعديل
+    
+    القيمة المرجعة:
+    DataFrame: الأعمدة 'left' (مفتاح البحث) و 'right' و 'distance'
+               (الزوج الذي يكون طرفاه من مفاتيح البحث يظهر مرة واحدة فقط)
+    """
+    if target_ids is None:
+        target_ids = np.arange(len(texts))
+    
+    # جدول واحد لجميع المفاتيح المطلوبة، ثم أخذ صفوف مفاتيح البحث والمفاتيح المستهدفة منه
+    ids = np.union1d(probe_ids, target_ids)
+    table = _variant_table(texts[ids], ids, max_distance)
+    probes = table[np.isin(table['id'].to_numpy(), probe_ids)]
+    index = table[np.isin(table['id'].to_numpy(), target_ids)]
+    
+    candidates = probes.merge(index, on='variant', suffixes=('_left', '_right'))[['id_left', 'id_right']]
+    left = candidates['id_left'].to_numpy()
+    right = candidates['id_right'].to_numpy()
+    keep = (left != right) & ~((right < left) & np.isin(right, probe_ids))
+    candidates = candidates[keep].drop_duplicates()
+    
+    left = candidates['id_left'].to_numpy()
+    right = candidates['id_right'].to_numpy()
+    distances = [edit_distance(texts[i], texts[j], max_distance) for i, j in zip(left, right)]
+    distances = np.array([-1 if distance is None else distance for distance in distances], dtype=np.int64)
+    found = distances >= 0
+    return pd.DataFrame({'left': left[found], 'right': right[found], 'distance': distances[found]})
+
+def possible_matches(index, max_distance=DEFAULT_MAX_DISTANCE, min_similarity=DEFAULT_MIN_SIMILARITY, values=None):
+    """
+    المفاتيح الفريدة في ملف والتي تشبه مفتاحاً في ملفات أخرى (مثل خطأ في كتابة رقم)
+    
+    يتم البحث فقط عن المفاتيح الموجودة في ملف واحد، ويُقبل المفتاح المشابه فقط إذا
+    لم يكن موجوداً في نفس الملف. نسبة التشابه هي 1 - المسافة / طول المفتاح الأطول.
+    
+    المعاملات:
+    index (MembershipIndex): فهرس العضوية لجميع الملفات
+    max_distance (int): أقصى مسافة تعديل
+    min_similarity (float): أدنى نسبة تشابه (بين 0 و 1)
+    values (ndarray): القيمة المعروضة لكل قيمة في الفهرس في عمودي 'value' و 'match'
+                      (مثل القيم الأصلية قبل توحيدها، None لقيم الفهرس نفسها)
+    
+    القيمة المرجعة:
+    DataFrame: الأعمدة 'value' و 'file' و 'match' و 'match_files' و 'distance' و 'similarity'
+               مرتبة تنازلياً حسب نسبة التشابه
+    """
+    columns = ['value', 'file', 'match', 'match_files', 'distance', 'similarity']
+    counts = index.file_counts()
+    probe_ids = np.flatnonzero(counts == 1)
+    if len(probe_ids) == 0 or len(index.file_names) < 2:
+        return pd.DataFrame(columns=columns)
+    
+    # المفتاح الموجود في جميع الملفات موجود في ملف المفتاح الفريد، لذلك لا يدخل الفهرس
+    target_ids = np.flatnonzero(counts < len(index.file_names))
+    texts = np.array([str(value) for value in index.values], dtype=object)
+    pairs = similar_pairs(texts, probe_ids, target_ids, max_distance)
+    
+    presence = index.presence
+    left = pairs['left'].to_numpy()
+    right = pairs['right'].to_numpy()
+    left_file = presence[left].argmax(axis=1)
+    
+    # المفتاح المشابه يجب ألا يكون في ملف المفتاح الفريد نفسه
+    keep = ~presence[right, left_file]
+    
+    lengths = np.array([max(len(texts[i]), len(texts[j])) for i, j in zip(left, right)], dtype=np.float64)
+    similarity = 1 - pairs['distance'].to_numpy() / np.maximum(lengths, 1)
+    keep &= similarity >= min_similarity
+    
+    left, right, left_file, similarity = left[keep], right[keep], left_file[keep], similarity[keep]
+    file_names = np.array(index.file_names, dtype=object)
+    values = index.values if values is None else values
+    matches = pd.DataFrame({
+        'value': values[left],
+        'file': file_names[left_file],
+        'match': values[right],
+        'match_files': [", ".join(file_names[row]) for row in presence[right]],
+        'distance': pairs['distance'].to_numpy()[keep],
+        'similarity': np.round(similarity, 4),
+    }, columns=columns)
+    return matches.sort_values(['similarity', 'file'], ascending=[False, True], kind="stable").reset_index(drop=True)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import uuid
+import hashlib
+import datetime
+import numpy as np
+import pandas as pd
+
+from core.cache import file_content_hash
+
+# يتم تغييره عند تغيير طريقة تخزين الحالة لإبطال الحالات القديمة
+STATE_FORMAT_VERSION = 2
+
+DEFAULT_STATE_DIR = os.path.join(os.path.expanduser("~"), ".excel_compare_state")
+
+def file_signature(path, verify_content=False):
+    """وقت تعديل الملف وحجمه (ومحتواه اختيارياً) لاكتشاف تغيره بين التشغيلات"""
+    stat = os.stat(path)
+    signature = {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+    if verify_content:
+        signature['content'] = file_content_hash(path)
+    return signature
+
+# أجزاء مدخل الملف، كل جزء جدول في ملف Parquet منفصل
+_ENTRY_PARTS = ('keys', 'first_rows', 'unique_rows', 'unique_keys')
+
+def _encode_value(value):
+    """نوع القيمة وصيغتها النصية لحفظ الأعمدة المختلطة (مثل أرقام ونصوص) بدون فقد"""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return "none", ""
+    if isinstance(value, (bool, np.bool_)):
+        return "bool", "1" if value else ""
+    if isinstance(value, (int, np.integer)):
+        return "int", str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return "float", repr(float(value))
+    if isinstance(value, str):
+        return "str", value
+    if isinstance(value, datetime.datetime):
+        return "datetime", value.isoformat()
+    if isinstance(value, datetime.date):
+        return "date", value.isoformat()
+    if isinstance(value, datetime.time):
+        return "time", value.isoformat()
+    raise TypeError(f"نوع قيمة غير مدعوم في حالة المقارنة: {type(value).__name__}")
+
+_DECODERS = {
+    "none": lambda text: None,
+    "bool": bool,
+    "int": int,
+    "float": float,
+    "str": str,
+    "datetime": pd.Timestamp,
+    "date": datetime.date.fromisoformat,
+    "time": datetime.time.fromisoformat,
+}
+
+def _write_frame(df, path):
+    """
+    حفظ جدول بصيغة Parquet مع إمكانية استرجاعه بنفس الأعمدة والأنواع
+    
+    الأعمدة من نوع object (التي قد تختلط فيها الأرقام والنصوص والتواريخ من إكسل)
+    تُحفظ كعامودين: نوع كل قيمة وصيغتها النصية، وأسماء الأعمدة تُحفظ بنفس الطريقة
+    في البيانات الوصفية المرجعة، لأن Parquet يقبل فقط أسماء نصية وعموداً بنوع واحد.
+    
+    القيمة المرجعة:
+    dict: البيانات الوصفية اللازمة لـ _read_frame
+    """
+    data = {}
+    encoded = []
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        if column.dtype == object:
+            pairs = [_encode_value(value) for value in column.tolist()]
+            data[f"t{position}"] = [kind for kind, _ in pairs]
+            data[f"v{position}"] = [text for _, text in pairs]
+            encoded.append(position)
+        else:
+            data[f"v{position}"] = column.to_numpy()
+    pd.DataFrame(data, index=df.index).to_parquet(path)
+    return {'columns': [_encode_value(name) for name in df.columns], 'encoded': encoded}
+
+def _read_frame(path, meta):
+    """قراءة جدول محفوظ بواسطة _write_frame"""
+    data = pd.read_parquet(path)
+    columns = []
+    for position in range(len(meta['columns'])):
+        if position in meta['encoded']:
+            values = [_DECODERS[kind](text) for kind, text in zip(data[f"t{position}"], data[f"v{position}"])]
+            columns.append(pd.Series(values, index=data.index, dtype=object))
+        else:
+            columns.append(data[f"v{position}"])
+    names = [_DECODERS[kind](text) for kind, text in meta['columns']]
+    if not columns:
+        return pd.DataFrame(index=data.index, columns=names)
+    return pd.concat(columns, axis=1).set_axis(names, axis=1)
+
+class ComparisonState:
+    """
+    حالة المقارنة السابقة لمجلد الإدخال لإعادة المقارنة بشكل تزايدي
+    
+    يحتفظ سجل الملفات (manifest) ببصمة كل ملف، ولكل ملف مدخل يحمل قيم عامود
+    المقارنة لكل صف وأول صف لكل قيمة داخل الملف والسجلات الفريدة للملف في
+    التشغيل السابق. في التشغيل التالي تُقرأ الملفات المتغيرة أو الجديدة فقط،
+    ويُعاد حساب الأوراق التي تغيرت قيمها الفريدة فقط.
+    
+    الحالة منفصلة لكل مجلد إدخال وإعدادات قراءة (عامود المقارنة والأعمدة المقروءة).
+    تُحفظ المدخلات بصيغة Parquet (وليس pickle، لأن قراءة pickle من مجلد مشترك قد
+    تنفذ أوامر)، والمدخل الذي لا يمكن حفظه أو قراءته يُعامل كملف متغير.
+    """
+    
+    def __init__(self, state_dir, input_folder, options, verify_content=False):
+        """
+        المعاملات:
+        state_dir (str): المجلد الرئيسي لحالات المقارنة
+        input_folder (str): مجلد ملفات الإدخال
+        options (dict): إعدادات القراءة التي تؤثر على المحتوى المحفوظ
+        verify_content (bool): التحقق من محتوى الملفات بالإضافة إلى وقت التعديل والحجم
+        """
+        parts = {
+            'version': STATE_FORMAT_VERSION,
+            'input_folder': os.path.abspath(input_folder),
+            'options': options,
+        }
+        key = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        self.folder = os.path.join(state_dir, key)
+        self.verify_content = verify_content
+        self.files = self._load_manifest()
+        # المدخلات المكتوبة والمستبدلة في هذا التشغيل (تُحذف المستبدلة بعد حفظ السجل فقط)
+        self._created = []
+        self._replaced = []
+    
+    @property
+    def manifest_path(self):
+        return os.path.join(self.folder, "manifest.json")
+    
+    def _entry_paths(self, entry):
+        """ملفات المدخل: جدول Parquet لكل جزء والبيانات الوصفية"""
+        base = os.path.join(self.folder, entry)
+        return [f"{base}.{part}.parquet" for part in _ENTRY_PARTS] + [base + ".json"]
+    
+    def _load_manifest(self):
+        """قراءة سجل الملفات من التشغيل السابق (فارغ إذا لم يوجد أو كان تالفاً)"""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)['files']
+        except (OSError, ValueError, KeyError):
+            return {}
+    
+    def is_current(self, file_name, path):
+        """التحقق من أن الملف لم يتغير منذ التشغيل السابق"""
+        record = self.files.get(file_name)
+        if record is None:
+            return False
+        try:
+            return record['signature'] == file_signature(path, self.verify_content)
+        except OSError:
+            return False
+    
+    def record(self, file_name):
+        """بيانات الملف في السجل (النوع وعدد الصفوف أو سبب التخطي)"""
+        return self.files[file_name]
+    
+    def load_entry(self, file_name):
+        """
+        قراءة مدخل الملف المحفوظ
+        
+        القيمة المرجعة:
+        dict: يحتوي على 'keys' و 'first_rows' و 'unique_rows' و 'unique_keys'، أو None عند تعذر القراءة
+        """
+        try:
+            paths = self._entry_paths(self.files[file_name]['entry'])
+            with open(paths[-1], "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            frames = {part: _read_frame(path, meta[part]) for part, path in zip(_ENTRY_PARTS, paths)}
+        except Exception:
+            return None
+        
+        entry = {'first_rows': frames['first_rows'], 'unique_rows': frames['unique_rows']}
+        # المفاتيح مصفوفة لمفتاح واحد وجدول أجزاء لمفتاح مركب (انظر _run_incremental)
+        entry['keys'] = frames['keys'] if meta['composite'] else frames['keys'].iloc[:, 0].to_numpy()
+        if meta['composite']:
+            parts = frames['unique_keys'].astype(object)
+            entry['unique_keys'] = set(parts.where(parts.notna(), None).itertuples(index=False, name=None))
+        else:
+            entry['unique_keys'] = frames['unique_keys'].iloc[:, 0].to_numpy()
+        return entry
+    
+    def _write_entry(self, name, entry):
+        """حفظ مدخل الملف بصيغة Parquet (البيانات الوصفية أخيراً حتى لا يُقرأ مدخل غير مكتمل)"""
+        composite = isinstance(entry['keys'], pd.DataFrame)
+        frames = {
+            'keys': entry['keys'] if composite else pd.DataFrame({0: entry['keys']}),
+            'first_rows': entry['first_rows'],
+            'unique_rows': entry['unique_rows'],
+            'unique_keys': pd.DataFrame(list(entry['unique_keys']), dtype=object) if composite
+                           else pd.DataFrame({0: entry['unique_keys']}),
+        }
+        paths = self._entry_paths(name)
+        meta = {'composite': composite}
+        for part, path in zip(_ENTRY_PARTS, paths):
+            meta[part] = _write_frame(frames[part], path)
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+    
+    def update(self, file_name, path, record, entry=None):
+        """
+        تسجيل حالة الملف في هذا التشغيل
+        
+        المعاملات:
+        file_name (str): اسم الملف
+        path (str): مسار الملف لحساب بصمته
+        record (dict): بيانات صغيرة تُحفظ في السجل (مثل 'kind' و 'rows')
+        entry (dict): بيانات الملف الكبيرة (تُحفظ في ملف منفصل، None للإبقاء على المدخل السابق)
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        previous = self.files.get(file_name, {})
+        record = dict(record, signature=file_signature(path, self.verify_content), entry=previous.get('entry'))
+        
+        if entry is not None:
+            name = uuid.uuid4().hex
+            self._created.append(name)
+            try:
+                self._write_entry(name, entry)
+                record['entry'] = name
+            except Exception:
+                # بدون مدخل يُعاد قراءة الملف في التشغيل التالي
+                self._remove_entry(name)
+                record['entry'] = None
+        
+        self.files[file_name] = record
+        if previous.get('entry') and previous['entry'] != record['entry']:
+            self._replaced.append(previous['entry'])
+    
+    def _remove_entry(self, entry):
+        for path in self._entry_paths(entry):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def save(self, file_names):
+        """
+        حفظ سجل الملفات بعد انتهاء المقارنة
+        
+        الملفات التي لم تعد في مجلد الإدخال تُحذف من السجل مع مدخلاتها.
+        المدخلات القديمة تُحذف بعد استبدال السجل حتى يبقى السجل المحفوظ صالحاً
+        إذا توقف التشغيل قبل ذلك.
+        """
+        for file_name in list(self.files):
+            if file_name not in file_names:
+                entry = self.files.pop(file_name).get('entry')
+                if entry:
+                    self._replaced.append(entry)
+        
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = self.manifest_path + f".{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({'version': STATE_FORMAT_VERSION, 'files': self.files}, f, ensure_ascii=False)
+        os.replace(temp_path, self.manifest_path)
+        
+        for entry in self._replaced:
+            self._remove_entry(entry)
+        self._created = []
+        self._replaced = []
+    
+    def discard(self):
+        """
+        التراجع عن تغييرات هذا التشغيل (مثل إلغاء المقارنة قبل حفظ السجل)
+        
+        تُحذف المدخلات المكتوبة في هذا التشغيل ويُعاد تحميل السجل المحفوظ،
+        لذلك يبدأ التشغيل التالي من حالة التشغيل السابق.
+        """
+        for entry in self._created:
+            self._remove_entry(entry)
+        self._created = []
+        self._replaced = []
+        self.files = self._load_manifest()
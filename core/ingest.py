@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import signal
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from core.cache import SheetCache
+from core.cancel import ComparisonCancelled, check_cancelled
+from core.workbooks import WorkbookPool
+
+def read_sheet(task, pool=None):
+    """
+    قراءة ورقة عمل واحدة
+    
+    عند تحديد أعمدة في المهمة تتم قراءة صف العناوين أولاً لتحويل أسماء الأعمدة
+    إلى مواقعها، ثم قراءة هذه الأعمدة فقط (usecols) بدلاً من الورقة كاملة.
+    عند تمرير إعدادات الذاكرة المؤقتة تُقرأ الورقة منها إذا لم يتغير الملف.
+    
+    المعاملات:
+    task (dict): يحتوي على 'path' (مسار الملف) و 'sheet' (اسم الورقة أو رقمها، الافتراضي الورقة الأولى)
+                 و 'columns' (اختياري: أسماء الأعمدة المطلوبة فقط)
+                 و 'cache' (اختياري: إعدادات SheetCache.options())
+    pool (WorkbookPool): ملفات مفتوحة يعاد استخدامها (None لفتح الملف وإغلاقه بعد القراءة)
+    
+    القيمة المرجعة:
+    dict: يحتوي على 'df' (البيانات) و 'columns' (جميع أعمدة الورقة) و 'cached' أو 'error' (وصف الخطأ)
+    """
+    try:
+        sheet = task.get('sheet', 0)
+        wanted = task.get('columns')
+        
+        cache = SheetCache(**task['cache']) if task.get('cache') else None
+        if cache is not None:
+            cached = cache.load(task['path'], sheet, wanted)
+            if cached is not None:
+                df, columns = cached
+                return {'df': df, 'columns': columns, 'cached': True, 'error': None}
+        
+        # فتح الملف فقط عند عدم وجود الورقة في الذاكرة المؤقتة
+        owned = pool is None
+        if owned:
+            pool = WorkbookPool(max_open=1)
+        
+        try:
+            with pool.open(task['path']) as xls:
+                if not wanted:
+                    df = xls.parse(sheet)
+                    columns = df.columns.tolist()
+                else:
+                    # تحويل أسماء الأعمدة المطلوبة إلى مواقعها في صف العناوين
+                    header = xls.parse(sheet, nrows=0)
+                    columns = header.columns.tolist()
+                    positions = [i for i, column in enumerate(columns) if column in wanted]
+                    
+                    if positions:
+                        df = xls.parse(sheet, usecols=positions)
+                    else:
+                        df = header
+        finally:
+            if owned:
+                pool.close_all()
+        
+        if cache is not None:
+            cache.store(task['path'], sheet, wanted, df, columns)
+        return {'df': df, 'columns': columns, 'cached': False, 'error': None}
+    except Exception as e:
+        return {'df': None, 'columns': None, 'cached': False, 'error': str(e)}
+
+def resolve_jobs(jobs):
+    """تحديد عدد العمليات المتوازية (0 أو None تعني عدد المعالجات)"""
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, int(jobs))
+
+def _ignore_interrupt():
+    """عمليات القراءة تتجاهل Ctrl+C حتى تتوقف المقارنة عبر إشارة الإيقاف في العملية الرئيسية"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def read_workbook_sheets(tasks):
+    """
+    قراءة مجموعة أوراق من نفس الملف مع فتحه مرة واحدة فقط
+    
+    المعاملات:
+    tasks (list): مهام قراءة لنفس الملف (انظر read_sheet)
+    
+    القيمة المرجعة:
+    list: نتيجة لكل مهمة بنفس الترتيب
+    """
+    pool = WorkbookPool(max_open=1)
+    try:
+        return [read_sheet(task, pool) for task in tasks]
+    finally:
+        pool.close_all()
+
+def read_sheets(tasks, jobs=1, cache=None, pool=None, on_progress=None, cancel=None):
+    """
+    قراءة مجموعة من أوراق العمل، بالتوازي عند طلب أكثر من عملية
+    
+    تحليل ملفات XLSX يعتمد على المعالج، لذلك تتم القراءة في عمليات منفصلة.
+    يتم تجميع أوراق نفس الملف في مهمة واحدة حتى يُفتح كل ملف مرة واحدة فقط.
+    النتائج تُعاد بنفس ترتيب المهام دائماً، وأخطاء القراءة تُعاد كنتائج
+    بدلاً من رفعها حتى يتمكن المستدعي من تسجيلها كما في القراءة المتسلسلة.
+    
+    المعاملات:
+    tasks (list): قائمة مهام القراءة (انظر read_sheet)
+    jobs (int): عدد العمليات المتوازية (1 للقراءة المتسلسلة، 0 لاستخدام جميع المعالجات)
+    cache (SheetCache): الذاكرة المؤقتة للأوراق المحللة (None لتعطيلها)
+    pool (WorkbookPool): ملفات الجلسة المفتوحة، تُستخدم في القراءة المتسلسلة فقط
+                         لأن الملفات المفتوحة لا يمكن مشاركتها بين العمليات
+    on_progress (callable): دالة تستقبل (عدد الملفات المقروءة، عدد الملفات) بعد قراءة كل ملف
+    cancel (CancelToken): إشارة الإيقاف، يتم التحقق منها بعد كل ملف (ترفع ComparisonCancelled)
+    
+    القيمة المرجعة:
+    list: نتيجة لكل مهمة بنفس الترتيب
+    """
+    tasks = list(tasks)
+    if cache is not None:
+        tasks = [dict(task, cache=cache.options()) for task in tasks]
+    
+    # تجميع المهام حسب الملف مع الاحتفاظ بمواقعها الأصلية
+    groups = {}
+    for position, task in enumerate(tasks):
+        groups.setdefault(os.path.abspath(task['path']), []).append(position)
+    groups = list(groups.values())
+    
+    jobs = min(resolve_jobs(jobs), len(groups))
+    results = [None] * len(tasks)
+    
+    def collect(group_results):
+        # النتائج تصل بترتيب الملفات، ويُبلغ عن التقدم بعد كل ملف
+        for done, (group, group_result) in enumerate(zip(groups, group_results), 1):
+            for position, result in zip(group, group_result):
+                results[position] = result
+            if on_progress is not None:
+                on_progress(done, len(groups))
+            check_cancelled(cancel)
+    
+    if jobs <= 1:
+        if pool is not None:
+            collect([read_sheet(tasks[position], pool) for position in group] for group in groups)
+        else:
+            collect(read_workbook_sheets([tasks[position] for position in group]) for group in groups)
+    else:
+        # استخدام spawn في جميع الأنظمة لتجنب نسخ حالة الخيوط (مثل خيط الواجهة الرسومية)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_ignore_interrupt) as executor:
+            try:
+                collect(executor.map(read_workbook_sheets, [[tasks[position] for position in group] for group in groups]))
+            except ComparisonCancelled:
+                # إلغاء الملفات التي لم تبدأ قراءتها بدلاً من انتظارها
+                executor.shutdown(cancel_futures=True)
+                raise
+    
+    # الحذف من الذاكرة المؤقتة يتم مرة واحدة بعد انتهاء جميع العمليات
+    if cache is not None:
+        cache.evict()
+    return results
+
+def _sheet_dimensions(xls, sheet):
+    """عدد الصفوف والأعمدة في الورقة من بيانات الملف الوصفية (بدون قراءة الخلايا)"""
+    book = xls.book
+    try:
+        if hasattr(book, 'sheet_by_name'):
+            # ملفات xls القديمة (xlrd)
+            ws = book.sheet_by_name(sheet)
+            return ws.nrows, ws.ncols
+        ws = book[sheet]
+        return ws.max_row, ws.max_column
+    except Exception:
+        return None, None
+
+def probe_sheet(xls, sheet):
+    """
+    قراءة مخطط ورقة العمل فقط: صف العناوين وأبعاد الورقة
+    
+    المعاملات:
+    xls (pd.ExcelFile): الملف المفتوح
+    sheet (str): اسم الورقة
+    
+    القيمة المرجعة:
+    dict: يحتوي على 'columns' (أسماء الأعمدة) و 'rows' (عدد صفوف البيانات التقريبي أو None)
+          و 'width' (عدد الأعمدة أو None)
+    """
+    # قراءة الأبعاد قبل صف العناوين لأن pandas يعيد ضبط أبعاد الورقة عند القراءة
+    max_row, max_column = _sheet_dimensions(xls, sheet)
+    header = xls.parse(sheet, nrows=0)
+    return {
+        'columns': header.columns.tolist(),
+        'rows': max(max_row - 1, 0) if max_row else None,
+        'width': max_column
+    }
+
+def probe_workbook(path, sheets=None, pool=None):
+    """
+    قراءة أسماء أوراق العمل ومخطط الأوراق المطلوبة بدون تحليل البيانات
+    
+    المعاملات:
+    path (str): مسار الملف
+    sheets (list): الأوراق المطلوب قراءة مخططها (الافتراضي الورقة الأولى فقط)
+    pool (WorkbookPool): ملفات الجلسة المفتوحة (None لفتح الملف وإغلاقه بعد القراءة)
+    
+    القيمة المرجعة:
+    dict: يحتوي على 'sheet_names' و 'sheets' (مخطط كل ورقة مطلوبة حسب اسمها)
+    """
+    owned = pool is None
+    if owned:
+        pool = WorkbookPool(max_open=1)
+    
+    try:
+        with pool.open(path) as xls:
+            sheet_names = xls.sheet_names
+            if sheets is None:
+                sheets = sheet_names[:1]
+            return {
+                'sheet_names': sheet_names,
+                'sheets': {sheet: probe_sheet(xls, sheet) for sheet in sheets}
+            }
+    finally:
+        if owned:
+            pool.close_all()
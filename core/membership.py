@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+# عدد البتات المضبوطة في كل بايت (0-255)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def integer_keys(column):
+    """
+    تحويل عامود المفاتيح إلى أرقام int64 إذا كانت جميع قيمه غير الفارغة أرقاماً صحيحة
+    
+    يشمل ذلك الأعمدة العشرية التي قيمها صحيحة (123.0) والأعمدة المختلطة من أرقام
+    صحيحة وعشرية، حتى تتطابق 123 و 123.0 بين الملفات التي قرأها pandas بأنواع مختلفة.
+    
+    القيمة المرجعة:
+    tuple: (المفاتيح int64، مصفوفة منطقية للقيم غير الفارغة) أو None إذا لم يكن العامود رقمياً صحيحاً
+    """
+    if isinstance(column, pd.Series) and isinstance(column.dtype, pd.api.extensions.ExtensionDtype) \
+            and column.dtype.kind in "iu":
+        # الأعداد الصحيحة التي تقبل القيم الفارغة (مثل المفاتيح المركبة) بدون تحويلها إلى كائنات
+        present = column.notna().to_numpy()
+        return column.to_numpy(dtype=np.int64, na_value=0), present
+    
+    array = column.to_numpy() if isinstance(column, pd.Series) else np.asarray(column)
+    
+    if array.dtype == object:
+        kind = pd.api.types.infer_dtype(array, skipna=True)
+        if kind not in ("integer", "floating", "mixed-integer-float"):
+            return None
+        present = ~pd.isna(array)
+        try:
+            values = array[present].astype(np.int64 if kind == "integer" else np.float64)
+        except (OverflowError, TypeError, ValueError):
+            return None
+    elif array.dtype.kind in "iu":
+        present = np.ones(len(array), dtype=bool)
+        values = array
+        if array.dtype.kind == "u" and len(array) and array.max() > np.iinfo(np.int64).max:
+            return None
+    elif array.dtype.kind == "f":
+        present = ~np.isnan(array)
+        values = array[present]
+    else:
+        return None
+    
+    if values.dtype.kind == "f":
+        # القيم العشرية مقبولة فقط إذا كانت صحيحة وضمن نطاق int64
+        if not (np.isfinite(values).all() and (values == np.floor(values)).all()
+                and (np.abs(values) < 2.0 ** 63).all()):
+            return None
+    
+    keys = np.zeros(len(array), dtype=np.int64)
+    keys[present] = values.astype(np.int64)
+    return keys, present
+
+def _sorted_unique(values):
+    """القيم الفريدة المرتبة لمصفوفة أرقام (بالترتيب ثم حذف المتكرر وهو أسرع من np.unique للأرقام)"""
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+def sorted_keys(column, as_text=False):
+    """
+    قيم عامود المفاتيح غير الفارغة إذا كانت مرتبة تصاعدياً (مثل التصديرات المرتبة حسب المفتاح)
+    
+    عند المقارنة بالصيغة النصية تُقبل الأعمدة النصية فقط، لأن ترتيب الأرقام أو
+    التواريخ يختلف عن ترتيب صيغتها النصية.
+    
+    القيمة المرجعة:
+    tuple: (القيم غير الفارغة بالترتيب، مصفوفة منطقية للقيم غير الفارغة) أو None إذا لم يكن العامود مرتباً
+    """
+    array = column.to_numpy() if isinstance(column, pd.Series) else np.asarray(column)
+    present = ~pd.isna(array)
+    values = array[present]
+    
+    if as_text and pd.api.types.infer_dtype(values, skipna=True) not in ("string", "empty"):
+        return None
+    # يتوقف الفحص عند أول قيمة غير مرتبة، والأنواع غير القابلة للمقارنة تعتبر غير مرتبة
+    if not pd.Index(values, dtype=values.dtype, copy=False).is_monotonic_increasing:
+        return None
+    return values, present
+
+def _text_uniques(uniques):
+    """الصيغة النصية للقيم الفريدة كما في astype(str) (الأرقام الصحيحة بدون ".0")"""
+    numeric = integer_keys(uniques)
+    if numeric is not None:
+        uniques = numeric[0]
+    return pd.Series(uniques).astype(str)
+
+def text_column(column):
+    """
+    تحويل قيم العامود إلى صيغتها النصية (انظر as_text في MembershipIndex.from_columns)
+    
+    يتم تحويل القيم الفريدة فقط ثم توزيعها على الصفوف، وتبقى القيم الفارغة فارغة.
+    """
+    codes, uniques = pd.factorize(column)
+    text = _text_uniques(uniques).to_numpy(dtype=object)
+    values = np.full(len(codes), np.nan, dtype=object)
+    present = codes >= 0
+    values[present] = text[codes[present]]
+    return pd.Series(values, index=column.index, name=column.name)
+
+class MembershipIndex:
+    """
+    فهرس يحدد الملفات التي تحتوي على كل قيمة من قيم المقارنة
+    
+    يحمل كل مفتاح قناع بتات مضغوط (بت لكل ملف)، وتُستخرج منه جميع الإحصائيات
+    (فريد في ملف، موجود في جميع الملفات، موجود في k ملفات، مفقود من ملف)
+    بتمريرة عدّ بتات واحدة.
+    """
+    
+    def __init__(self, values, masks, file_names, file_codes=None):
+        """
+        المعاملات:
+        values (ndarray): القيم الفريدة
+        masks (ndarray): مصفوفة uint8 بحجم (عدد القيم × ceil(عدد الملفات / 8)) تحمل بت لكل ملف
+        file_names (list): أسماء الملفات بنفس ترتيب البتات
+        file_codes (list): رمز القيمة لكل صف في كل ملف (-1 للقيم الفارغة)
+        """
+        self.values = values
+        self.masks = masks
+        self.file_names = list(file_names)
+        self.file_codes = file_codes if file_codes is not None else []
+        self._file_counts = None
+        self._first_rows = None
+    
+    @classmethod
+    def from_columns(cls, columns, file_names, sort=True, as_text=False, presorted=None):
+        """
+        بناء الفهرس من أعمدة المقارنة لجميع الملفات
+        
+        يتم ترميز كل عامود على حدة، ثم إضافة قيمه الفريدة فقط (وليس جميع الصفوف)
+        إلى قاموس مشترك وتحويل رموز الملف إليه، لذلك لا تُنشأ نسخة مدمجة من جميع
+        القيم. تُحفظ رموز الصفوف كأرقام int32. القيم الفارغة لا تدخل الفهرس.
+        
+        المعاملات:
+        columns (list): قائمة بأعمدة المقارنة (Series أو مصفوفات) لكل ملف
+        file_names (list): أسماء الملفات بنفس الترتيب
+        sort (bool): ترتيب القيم الفريدة تصاعدياً
+        as_text (bool): مقارنة القيم بصيغتها النصية كما في astype(str)
+                        (يتم تحويل القيم الفريدة لكل ملف فقط وليس كل صف)
+        
+        presorted (bool): استخدام الدمج المرتب عندما تكون جميع الأعمدة مرتبة تصاعدياً
+                          (None للاكتشاف التلقائي في الأعمدة ذات الأنواع الأصلية مثل الأرقام العشرية
+                          والتواريخ، True لطلبه لجميع الأنواع مع رفع ValueError إذا لم تكن مرتبة،
+                          False لتعطيله)
+        
+        إذا كانت جميع الأعمدة أرقاماً صحيحة (انظر integer_keys) تتم المقارنة كأرقام
+        int64 مرتبة بدلاً من القاموس العام، وتُرتب القيم تصاعدياً دائماً.
+        وإذا كانت جميع الأعمدة مرتبة (انظر from_sorted_keys) يتم دمجها بدون قاموس.
+        في الأعمدة المختلطة تتحول الأرقام الصحيحة إلى نصوص بدون ".0".
+        """
+        if presorted is not False:
+            ordered_columns = []
+            for column in columns:
+                keys = sorted_keys(column, as_text)
+                if keys is None:
+                    if presorted:
+                        raise ValueError("عامود المقارنة غير مرتب تصاعدياً في أحد الملفات")
+                    break
+                if presorted is None and keys[0].dtype == object:
+                    # مقارنة الكائنات (مثل النصوص) في numpy أبطأ من جدول التجزئة في pandas،
+                    # لذلك لا يُستخدم الدمج المرتب لها إلا عند طلبه
+                    break
+                ordered_columns.append(keys)
+            else:
+                # الأعمدة الرقمية الصحيحة تبقى في المسار الرقمي حتى تتطابق 123 و 123.0
+                if not all(integer_keys(values) is not None for values, _ in ordered_columns):
+                    try:
+                        return cls.from_sorted_keys(ordered_columns, file_names)
+                    except TypeError:
+                        # أنواع غير قابلة للمقارنة بين الملفات (مثل أرقام في ملف ونصوص في آخر)
+                        if presorted:
+                            raise ValueError("لا يمكن دمج أعمدة المقارنة المرتبة لاختلاف أنواع قيمها بين الملفات")
+        
+        integer_columns = []
+        for column in columns:
+            keys = integer_keys(column)
+            if keys is None:
+                break
+            integer_columns.append(keys)
+        else:
+            return cls.from_integer_keys(integer_columns, file_names)
+        
+        dictionary = pd.Index([], dtype=object)
+        file_codes = []
+        for column in columns:
+            # الحفاظ على نوع Series (مثل التواريخ) حتى تطابق الصيغة النصية astype(str)
+            codes, uniques = pd.factorize(column if isinstance(column, pd.Series) else np.asarray(column))
+            if as_text:
+                uniques = _text_uniques(uniques)
+            uniques = pd.Index(uniques)
+            
+            # إضافة القيم الجديدة فقط إلى القاموس المشترك (بترتيب أول ظهور في الملفات ثم الصفوف)
+            if len(dictionary) == 0:
+                dictionary = uniques
+                mapping = np.arange(len(uniques), dtype=np.int64)
+            else:
+                mapping = dictionary.get_indexer(uniques)
+                new = mapping < 0
+                mapping[new] = len(dictionary) + np.arange(int(new.sum()))
+                if new.any():
+                    dictionary = dictionary.append(uniques[new])
+            
+            file_codes.append((codes, mapping))
+        
+        values = dictionary.to_numpy()
+        order = None
+        if sort and len(values):
+            try:
+                sorter = np.argsort(values, kind="stable")
+                order = np.empty(len(values), dtype=np.int64)
+                order[sorter] = np.arange(len(values))
+                values = values[sorter]
+            except TypeError:
+                # القيم المختلطة (أرقام ونصوص) تُرتب بنفس طريقة pandas
+                order, values = pd.factorize(values, sort=True)
+        
+        code_type = np.int32 if len(values) < np.iinfo(np.int32).max else np.int64
+        for i, (codes, mapping) in enumerate(file_codes):
+            if order is not None:
+                mapping = order[mapping]
+            mapped = np.full(len(codes), -1, dtype=code_type)
+            present = codes >= 0
+            mapped[present] = mapping[codes[present]]
+            file_codes[i] = mapped
+        return cls.from_codes(values, file_codes, file_names)
+    
+    @classmethod
+    def from_integer_keys(cls, integer_columns, file_names):
+        """
+        بناء الفهرس من مفاتيح رقمية صحيحة باستخدام مصفوفات int64 مرتبة
+        
+        القيم الفريدة هي اتحاد القيم الفريدة المرتبة لكل ملف، ورمز كل صف هو موقع
+        قيمته في هذا الاتحاد (بحث ثنائي)، بدون أي كائنات Python لكل قيمة.
+        
+        المعاملات:
+        integer_columns (list): زوج (المفاتيح، القيم غير الفارغة) لكل ملف كما في integer_keys
+        file_names (list): أسماء الملفات بنفس الترتيب
+        """
+        uniques = [_sorted_unique(keys[present]) for keys, present in integer_columns]
+        values = _sorted_unique(np.concatenate(uniques)) if uniques else np.zeros(0, dtype=np.int64)
+        
+        code_type = np.int32 if len(values) < np.iinfo(np.int32).max else np.int64
+        file_codes = []
+        for keys, present in integer_columns:
+            codes = np.full(len(keys), -1, dtype=code_type)
+            codes[present] = np.searchsorted(values, keys[present])
+            file_codes.append(codes)
+        return cls.from_codes(values, file_codes, file_names)
+    
+    @classmethod
+    def from_sorted_keys(cls, sorted_columns, file_names):
+        """
+        بناء الفهرس بالدمج المرتب لأعمدة مرتبة مسبقاً (بدون جدول تجزئة)
+        
+        القيم المتساوية في كل ملف متتالية، لذلك تُستخرج قيمه الفريدة ورمز كل صف
+        بمقارنة كل قيمة بالتي قبلها فقط. ثم تُدمج القوائم المرتبة لجميع الملفات
+        بترتيب مستقر (يدمج timsort القوائم المرتبة دون إعادة ترتيبها) وتُحدد القيم
+        الفريدة العامة بنفس الطريقة. القيم الناتجة مرتبة تصاعدياً.
+        
+        المعاملات:
+        sorted_columns (list): زوج (القيم المرتبة، القيم غير الفارغة) لكل ملف كما في sorted_keys
+        file_names (list): أسماء الملفات بنفس الترتيب
+        """
+        runs = []
+        run_ids = []
+        for values, _ in sorted_columns:
+            starts = np.ones(len(values), dtype=bool)
+            if len(values) > 1:
+                starts[1:] = values[1:] != values[:-1]
+            runs.append(values[starts])
+            run_ids.append(np.cumsum(starts) - 1)
+        
+        if len({array.dtype for array in runs}) > 1:
+            runs = [array.astype(object) for array in runs]
+        combined = np.concatenate(runs) if runs else np.array([], dtype=object)
+        
+        order = np.argsort(combined, kind="stable")
+        merged = combined[order]
+        starts = np.ones(len(merged), dtype=bool)
+        if len(merged) > 1:
+            starts[1:] = merged[1:] != merged[:-1]
+        values = merged[starts]
+        
+        code_type = np.int32 if len(values) < np.iinfo(np.int32).max else np.int64
+        run_codes = np.empty(len(combined), dtype=code_type)
+        run_codes[order] = np.cumsum(starts) - 1
+        
+        offsets = np.cumsum([0] + [len(array) for array in runs])
+        file_codes = []
+        for i, (_, present) in enumerate(sorted_columns):
+            codes = np.full(len(present), -1, dtype=code_type)
+            codes[present] = run_codes[offsets[i]:offsets[i + 1]][run_ids[i]]
+            file_codes.append(codes)
+        return cls.from_codes(values, file_codes, file_names)
+    
+    @classmethod
+    def from_codes(cls, values, file_codes, file_names):
+        """
+        بناء الفهرس من رموز جاهزة لكل صف (مثل الفهرس التزايدي في القراءة المتدفقة)
+        
+        المعاملات:
+        values (list): القيم الفريدة بترتيب رموزها
+        file_codes (list): رمز القيمة لكل صف في كل ملف (-1 للقيم الفارغة)
+        file_names (list): أسماء الملفات بنفس الترتيب
+        """
+        masks = np.zeros((len(values), (len(file_codes) + 7) // 8), dtype=np.uint8)
+        for i, current_codes in enumerate(file_codes):
+            masks[current_codes[current_codes >= 0], i // 8] |= np.uint8(1 << (i % 8))
+        
+        # القيم الرقمية تبقى مصفوفة بنوعها، والقيم الأخرى (نصوص أو بصمات) كمصفوفة كائنات
+        if isinstance(values, np.ndarray) and values.dtype.kind in "iuf":
+            values_array = values
+        else:
+            values_array = np.empty(len(values), dtype=object)
+            values_array[:] = list(values)
+        return cls(values_array, masks, file_names, list(file_codes))
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def contains(self, file_index):
+        """مصفوفة منطقية للقيم الموجودة في الملف المحدد"""
+        return (self.masks[:, file_index // 8] >> (file_index % 8)) & 1 == 1
+    
+    @property
+    def presence(self):
+        """مصفوفة الوجود المنطقية بحجم (عدد القيم × عدد الملفات)"""
+        bits = np.unpackbits(self.masks, axis=1, bitorder="little")
+        return bits[:, :len(self.file_names)].astype(bool)
+    
+    def file_counts(self):
+        """عدد الملفات التي تحتوي على كل قيمة (عدّ البتات في القناع)"""
+        if self._file_counts is None:
+            self._file_counts = _POPCOUNT_TABLE[self.masks].sum(axis=1, dtype=np.int64)
+        return self._file_counts
+    
+    def only_in(self, file_index):
+        """القيم الموجودة في هذا الملف فقط"""
+        return (self.file_counts() == 1) & self.contains(file_index)
+    
+    def in_all(self):
+        """القيم الموجودة في جميع الملفات"""
+        return self.file_counts() == len(self.file_names)
+    
+    def in_exactly(self, k):
+        """القيم الموجودة في k ملفات بالضبط"""
+        return self.file_counts() == k
+    
+    def missing_from(self, file_index):
+        """القيم غير الموجودة في الملف المحدد"""
+        return ~self.contains(file_index)
+    
+    def unique_counts(self):
+        """عدد القيم الفريدة (الموجودة في ملف واحد فقط) لكل ملف"""
+        single = self.file_counts() == 1
+        if not single.any():
+            return np.zeros(len(self.file_names), dtype=np.int64)
+        
+        # موقع البت الوحيد المضبوط في كل قناع يحدد الملف المالك للقيمة
+        bits = np.unpackbits(self.masks[single], axis=1, bitorder="little")
+        owners = bits.argmax(axis=1)
+        return np.bincount(owners, minlength=len(self.file_names))[:len(self.file_names)]
+    
+    def row_mask(self, file_index, value_mask):
+        """تحويل قناع على القيم إلى قناع على صفوف الملف المحدد"""
+        codes = self.file_codes[file_index]
+        if len(value_mask) == 0:
+            return np.zeros(len(codes), dtype=bool)
+        return (codes >= 0) & value_mask[np.maximum(codes, 0)]
+    
+    def _first_occurrences(self):
+        """موقع أول ظهور لكل قيمة في كل ملف بترتيب الملفات ثم الصفوف"""
+        if self._first_rows is None:
+            seen = np.zeros(len(self.values), dtype=bool)
+            self._first_rows = []
+            for codes in self.file_codes:
+                codes = np.asarray(codes)
+                present = np.flatnonzero(codes >= 0)
+                file_values, positions = np.unique(codes[present], return_index=True)
+                new = ~seen[file_values]
+                seen[file_values] = True
+                self._first_rows.append(np.sort(present[positions[new]]))
+        return self._first_rows
+    
+    def first_rows_in(self, file_index):
+        """
+        أرقام صفوف الملف التي ظهرت فيها قيمة لأول مرة بين جميع الملفات
+        
+        هذه الصفوف من جميع الملفات بالترتيب تطابق drop_duplicates بعد دمج الجداول،
+        لذلك يمكن بناء جدول السجلات الفريدة منها بدون دمج جميع البيانات.
+        """
+        return self._first_occurrences()[file_index]
+    
+    def first_missing(self):
+        """(الملف، الصف) لأول صف بقيمة فارغة، أو None إذا لم توجد قيم فارغة"""
+        for file_index, codes in enumerate(self.file_codes):
+            missing = np.flatnonzero(np.asarray(codes) < 0)
+            if len(missing):
+                return file_index, int(missing[0])
+        return None
+    
+    def iter_rows(self, labels=None, chunk_size=50000):
+        """
+        صفوف جدول المقارنة (القيمة ثم 1 أو 0 لكل ملف) دفعة بعد دفعة
+        
+        تُكتب الصفوف مباشرة إلى التقرير بدلاً من إنشاء جدول المقارنة كاملاً (انظر to_frame).
+        
+        المعاملات:
+        labels (list): بداية كل صف بدلاً من القيمة (مثل أجزاء المفتاح المركب) بنفس ترتيب القيم
+        """
+        for start in range(0, len(self.values), chunk_size):
+            if labels is None:
+                prefixes = [[value] for value in self.values[start:start + chunk_size].tolist()]
+            else:
+                prefixes = labels[start:start + chunk_size]
+            bits = np.unpackbits(self.masks[start:start + chunk_size], axis=1, bitorder="little")
+            bits = bits[:, :len(self.file_names)].tolist()
+            for prefix, row in zip(prefixes, bits):
+                yield list(prefix) + row
+    
+    def to_frame(self, key_name):
+        """تحويل الفهرس إلى جدول مقارنة (1 إذا كانت القيمة موجودة في الملف، 0 إذا لم تكن موجودة)"""
+        if len(self.values) == 0:
+            return pd.DataFrame()
+        
+        data = {key_name: self.values}
+        for i, file_name in enumerate(self.file_names):
+            data[file_name] = self.contains(i).astype(np.int64)
+        
+        return pd.DataFrame(data)
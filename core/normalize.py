@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+# خطوات التوحيد المتاحة بترتيب تطبيقها
+NORMALIZATION_STEPS = ('whitespace', 'case', 'arabic', 'digits')
+
+# الأرقام العربية الهندية (٠-٩) والفارسية (۰-۹) إلى أرقام لاتينية
+DIGITS_TABLE = str.maketrans(
+    {**{chr(0x0660 + i): str(i) for i in range(10)}, **{chr(0x06F0 + i): str(i) for i in range(10)}}
+)
+
+# أشكال الحروف العربية المتقاربة إلى شكل واحد مع حذف التشكيل والتطويل
+ARABIC_TABLE = str.maketrans(
+    {'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ة': 'ه', 'ى': 'ي', 'ـ': None,
+     **{chr(code): None for code in range(0x064B, 0x0653)}}
+)
+
+def resolve_steps(steps):
+    """
+    التحقق من خطوات التوحيد المطلوبة وترتيبها
+    
+    المعاملات:
+    steps (list): أسماء الخطوات (قائمة فارغة أو True لجميع الخطوات، None لتعطيل التوحيد)
+    
+    القيمة المرجعة:
+    tuple: الخطوات بترتيب NORMALIZATION_STEPS (فارغة عند تعطيل التوحيد)
+    """
+    if steps is None or steps is False:
+        return ()
+    if steps is True or len(steps) == 0:
+        return NORMALIZATION_STEPS
+    unknown = [step for step in steps if step not in NORMALIZATION_STEPS]
+    if unknown:
+        raise ValueError(f"خطوات توحيد غير معروفة: {', '.join(unknown)}")
+    return tuple(step for step in NORMALIZATION_STEPS if step in steps)
+
+def normalize_text(values, steps=NORMALIZATION_STEPS):
+    """
+    توحيد سلسلة نصوص بعمليات .str على السلسلة كاملة
+    
+    whitespace: حذف المسافات من الطرفين وتوحيد المسافات الداخلية
+    case: توحيد حالة الأحرف اللاتينية (casefold)
+    arabic: توحيد أ/إ/آ إلى ا و ة إلى ه و ى إلى ي وحذف التشكيل والتطويل
+    digits: تحويل الأرقام العربية الهندية إلى أرقام لاتينية (انظر normalize_column)
+    """
+    if 'whitespace' in steps:
+        values = values.str.strip().str.replace(r"\s+", " ", regex=True)
+    if 'case' in steps:
+        values = values.str.casefold()
+    # جدول تحويل واحد للحروف والأرقام حتى تُمر القيم مرة واحدة
+    table = {}
+    if 'arabic' in steps:
+        table.update(ARABIC_TABLE)
+    if 'digits' in steps:
+        table.update(DIGITS_TABLE)
+    if table:
+        values = values.str.translate(table)
+    return values
+
+def normalize_column(column, steps=NORMALIZATION_STEPS):
+    """
+    مفتاح موحد لكل صف من عامود المقارنة
+    
+    يتم توحيد القيم الفريدة فقط ثم توزيعها على الصفوف، لذلك يُحسب التوحيد مرة
+    واحدة لكل قيمة مختلفة. القيم غير النصية (مثل الأرقام والتواريخ) تبقى كما هي،
+    والعامود الأصلي لا يتغير حتى يعرض التقرير القيم الأصلية.
+    
+    مع خطوة digits تتحول النصوص التي أصبحت أعداداً صحيحة بصيغتها المعتادة (بدون
+    أصفار بادئة، مثل '١٢٣' بعد توحيدها إلى '123') إلى أرقام، حتى تتطابق مع الخلايا
+    الرقمية في الملفات الأخرى. النصوص مثل '007' تبقى نصوصاً حتى لا تتطابق مع 7.
+    
+    المعاملات:
+    column (Series): عامود المقارنة
+    steps (tuple): خطوات التوحيد (انظر normalize_text)
+    
+    القيمة المرجعة:
+    Series: المفاتيح الموحدة بنفس فهرس العامود
+    """
+    if not steps or not (pd.api.types.is_object_dtype(column.dtype) or pd.api.types.is_string_dtype(column.dtype)):
+        return column
+    
+    codes, uniques = pd.factorize(column)
+    uniques = pd.Series(uniques, dtype=object)
+    text = uniques.map(type) == str
+    if text.any():
+        uniques[text] = normalize_text(uniques[text].astype(str), steps)
+        if 'digits' in steps:
+            integers = uniques[text].str.fullmatch(r"-?(0|[1-9][0-9]*)")
+            integers = integers[integers].index
+            uniques[integers] = uniques[integers].map(int)
+    
+    values = np.full(len(codes), np.nan, dtype=object)
+    present = codes >= 0
+    values[present] = uniques.to_numpy()[codes[present]]
+    return pd.Series(values, index=column.index, name=column.name)
+
+def normalize_frame(df, columns, steps=NORMALIZATION_STEPS):
+    """نسخة من أعمدة المفتاح المحددة بعد توحيدها (انظر normalize_column)"""
+    return pd.DataFrame({column: normalize_column(df[column], steps) for column in columns}, index=df.index)
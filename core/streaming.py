@@ -0,0 +1,417 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+from array import array
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from core.cancel import check_cancelled
+from core.normalize import normalize_column
+
+try:
+    from pandas._libs.parsers import STR_NA_VALUES
+except ImportError:
+    STR_NA_VALUES = {""}
+
+DEFAULT_CHUNK_SIZE = 50000
+
+def _cell_value(value):
+    """تحويل قيمة الخلية كما يفعل pandas عند القراءة (النصوص الفارغة أو NA تعتبر فارغة)"""
+    if isinstance(value, str) and value in STR_NA_VALUES:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _numeric_values(values):
+    """
+    قيم جزء من عامود كأرقام كما يحولها pandas عند القراءة (النصوص الرقمية والقيم المنطقية)
+    
+    القيمة المرجعة:
+    list: القيم بعد التحويل (None للقيم الفارغة) أو None إذا كانت إحدى القيم غير رقمية
+    """
+    try:
+        numbers = pd.to_numeric(pd.Series(values, dtype=object))
+    except (ValueError, TypeError):
+        return None
+    return [None if pd.isna(value) else _cell_value(value) for value in numbers.tolist()]
+
+def convert_numeric_columns(rows, positions, failed):
+    """
+    تحويل الأعمدة النصية الرقمية في دفعة صفوف إلى أرقام (في مكانها) كما في القراءة بالذاكرة
+    
+    يحول pandas العامود كاملاً إلى أرقام فقط إذا كانت جميع قيمه قابلة للتحويل (مثل
+    '3' في عامود أرقام)، لذلك تُضاف الأعمدة التي بها قيمة غير رقمية إلى failed ولا
+    تُحول في الدفعات التالية. الأعمدة التي قيمها أرقام فقط لا يتم فحصها.
+    
+    القيمة المرجعة:
+    set: أرقام الأعمدة التي تم تحويل قيم فيها في هذه الدفعة
+    """
+    converted = set()
+    for position in positions:
+        if position in failed:
+            continue
+        column = [values[position] for values in rows]
+        if not any(isinstance(value, (str, bool)) for value in column):
+            continue
+        numbers = _numeric_values(column)
+        if numbers is None:
+            failed.add(position)
+            continue
+        for values, number in zip(rows, numbers):
+            values[position] = number
+        converted.add(position)
+    return converted
+
+def header_names(values):
+    """أسماء الأعمدة من صف العناوين بنفس طريقة pandas (Unnamed وترقيم الأسماء المكررة)"""
+    values = list(values)
+    while values and values[-1] is None:
+        values.pop()
+    
+    names = []
+    seen = {}
+    for position, value in enumerate(values):
+        name = value if value is not None else f"Unnamed: {position}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+class SheetStream:
+    """
+    قراءة ورقة عمل صفاً بصف بدون تحميلها كاملة في الذاكرة
+    
+    تُقرأ ملفات xlsx بنمط القراءة فقط في openpyxl، لذلك لا يحتفظ الملف إلا بالصف
+    الحالي. الصفوف الفارغة في آخر الورقة يتم تجاهلها كما في pandas. ملفات xls
+    القديمة لا تدعم القراءة المتدفقة فتُقرأ كاملة ثم تُعرض بنفس الطريقة.
+    """
+    
+    def __init__(self, path, sheet=None):
+        """
+        المعاملات:
+        path (str): مسار الملف
+        sheet (str): اسم الورقة (الافتراضي الورقة الأولى)
+        """
+        self.path = path
+        self.sheet = sheet
+        self._wb = None
+        self._frame = None
+        self.columns = []
+        
+        if str(path).lower().endswith(".xls"):
+            self._frame = pd.read_excel(path, sheet_name=sheet if sheet is not None else 0)
+            self.columns = self._frame.columns.tolist()
+        else:
+            self._wb = load_workbook(path, read_only=True, data_only=True)
+            header = next(self._worksheet().iter_rows(max_row=1, values_only=True), ())
+            self.columns = header_names(header)
+    
+    def _worksheet(self):
+        """ورقة العمل المطلوبة"""
+        if self.sheet is None:
+            return self._wb.worksheets[0]
+        return self._wb[self.sheet]
+    
+    def rows(self):
+        """صفوف البيانات كقوائم بنفس عدد الأعمدة (بدون صف العناوين)"""
+        width = len(self.columns)
+        
+        if self._frame is not None:
+            for row in self._frame.itertuples(index=False):
+                yield [None if pd.isna(value) else value for value in row]
+            return
+        
+        # الصفوف الفارغة تؤجل حتى ظهور صف غير فارغ بعدها
+        pending_blank = 0
+        for raw in self._worksheet().iter_rows(min_row=2, values_only=True):
+            values = [_cell_value(value) for value in raw[:width]]
+            values.extend([None] * (width - len(values)))
+            if all(value is None for value in values):
+                pending_blank += 1
+                continue
+            for _ in range(pending_blank):
+                yield [None] * width
+            pending_blank = 0
+            yield values
+    
+    def chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """صفوف البيانات على دفعات بحجم chunk_size"""
+        chunk = []
+        for values in self.rows():
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def close(self):
+        """إغلاق الملف"""
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+        self._frame = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def row_digest(names, values):
+    """
+    بصمة الصف كاملاً (128 بت) للمقارنة بجميع الأعمدة بدون الاحتفاظ بالقيم
+    
+    تُحسب البصمة من أزواج (العامود، القيمة) غير الفارغة بترتيب ثابت، لذلك
+    تتطابق الصفوف بين ملفات تختلف في ترتيب أعمدتها أو في الأعمدة الفارغة
+    كما في drop_duplicates بعد دمج الجداول. الأرقام تُحول إلى float حتى تتطابق 1 و 1.0.
+    """
+    pairs = sorted(((str(name), float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value)
+                    for name, value in zip(names, values) if value is not None), key=lambda pair: pair[0])
+    return hashlib.blake2b(repr(pairs).encode("utf-8"), digest_size=16).digest()
+
+def _normalized_values(values, steps):
+    """توحيد قيم جزء من المفتاح في دفعة (None للقيم الفارغة)"""
+    normalized = normalize_column(pd.Series(values, dtype=object), steps)
+    return normalized.astype(object).where(normalized.notna(), None).tolist()
+
+def composite_digest(values, positions):
+    """بصمة المفتاح المركب من قيم الأعمدة المحددة بترتيبها (None إذا كانت جميع الأجزاء فارغة)"""
+    parts = [values[position] for position in positions]
+    if all(part is None for part in parts):
+        return None
+    return row_digest(range(len(parts)), parts)
+
+class KeyIndex:
+    """
+    فهرس تزايدي لمفاتيح المقارنة أثناء القراءة المتدفقة
+    
+    يحتفظ فقط برمز لكل مفتاح مميز وموقع أول ظهور له (الملف ورقم الصف)،
+    ولكل ملف برمز المفتاح لكل صف (4 بايت)، لذلك تعتمد الذاكرة على عدد
+    المفاتيح المميزة وليس على حجم البيانات.
+    """
+    
+    def __init__(self):
+        self._codes = {}
+        self.values = []
+        self.first_file = array('i')
+        self.first_row = array('q')
+        self.file_codes = []
+        self.first_missing = None  # (الملف، الصف) لأول صف بدون مفتاح
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def start_file(self):
+        """بدء ملف جديد وإرجاع رقمه"""
+        self.file_codes.append(array('i'))
+        return len(self.file_codes) - 1
+    
+    def add_chunk(self, keys):
+        """
+        إضافة مفاتيح دفعة من صفوف الملف الحالي (None للصفوف بدون مفتاح)
+        
+        يتم ترميز الدفعة أولاً ثم البحث عن المفاتيح المميزة فيها فقط في الفهرس.
+        """
+        file_index = len(self.file_codes) - 1
+        file_codes = self.file_codes[file_index]
+        offset = len(file_codes)
+        
+        chunk_codes, uniques = pd.factorize(np.asarray(keys, dtype=object))
+        # موقع أول ظهور لكل مفتاح في الدفعة (الرمز -1 إن وجد يأتي أولاً بعد الترتيب)
+        _, first_positions = np.unique(chunk_codes, return_index=True)
+        first_positions = first_positions[len(first_positions) - len(uniques):]
+        
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for position, key in enumerate(uniques):
+            code = self._codes.get(key)
+            if code is None:
+                code = len(self.values)
+                self._codes[key] = code
+                self.values.append(key)
+                self.first_file.append(file_index)
+                self.first_row.append(offset + int(first_positions[position]))
+            mapping[position] = code
+        
+        codes = np.full(len(chunk_codes), -1, dtype=np.int32)
+        present = chunk_codes >= 0
+        codes[present] = mapping[chunk_codes[present]]
+        file_codes.frombytes(codes.tobytes())
+        
+        if self.first_missing is None and not present.all():
+            self.first_missing = (file_index, offset + int(np.argmin(present)))
+    
+    def discard_file(self):
+        """حذف آخر ملف من الفهرس مع المفاتيح التي ظهرت فيه لأول مرة (لإعادة فهرسته)"""
+        file_index = len(self.file_codes) - 1
+        self.file_codes.pop()
+        # مفاتيح آخر ملف هي آخر المفاتيح المضافة إلى الفهرس
+        keep = len(self.values) - self.first_file.count(file_index)
+        for key in self.values[keep:]:
+            del self._codes[key]
+        del self.values[keep:]
+        del self.first_file[keep:]
+        del self.first_row[keep:]
+        if self.first_missing is not None and self.first_missing[0] == file_index:
+            self.first_missing = None
+    
+    def codes(self, file_index):
+        """رموز المفاتيح لصفوف الملف كمصفوفة (-1 للصفوف بدون مفتاح)"""
+        return np.frombuffer(self.file_codes[file_index], dtype=np.int32).astype(np.int64)
+    
+    def first_rows_in(self, file_index):
+        """أرقام صفوف الملف التي ظهر فيها مفتاح لأول مرة"""
+        first_file = np.frombuffer(self.first_file, dtype=np.int32)
+        first_row = np.frombuffer(self.first_row, dtype=np.int64)
+        return first_row[first_file == file_index]
+
+def fetch_rows(path, sheet, offsets, columns=None, chunk_size=DEFAULT_CHUNK_SIZE, cancel=None, numeric_columns=()):
+    """
+    قراءة صفوف محددة فقط من الورقة (تمريرة متدفقة ثانية)
+    
+    المعاملات:
+    path (str): مسار الملف
+    sheet (str): اسم الورقة (None للورقة الأولى)
+    offsets (array): أرقام الصفوف المطلوبة (بدون صف العناوين)
+    columns (list): الأعمدة المطلوبة (الافتراضي جميع الأعمدة)
+    cancel (CancelToken): إشارة الإيقاف، يتم التحقق منها بعد كل دفعة
+    numeric_columns (list): الأعمدة التي تُحول قيمها النصية إلى أرقام (انظر index_sheets)
+    
+    القيمة المرجعة:
+    DataFrame: الصفوف المطلوبة مع أرقامها كفهرس
+    """
+    wanted = np.unique(np.asarray(offsets, dtype=np.int64))
+    with SheetStream(path, sheet) as stream:
+        names = stream.columns
+        positions = list(range(len(names)))
+        if columns:
+            positions = [i for i, name in enumerate(names) if name in columns]
+        
+        rows = []
+        if len(wanted) > 0:
+            next_position = 0
+            offset = 0
+            for chunk in stream.chunks(chunk_size):
+                chunk_end = offset + len(chunk)
+                while next_position < len(wanted) and wanted[next_position] < chunk_end:
+                    values = chunk[wanted[next_position] - offset]
+                    rows.append([values[i] for i in positions])
+                    next_position += 1
+                offset = chunk_end
+                if next_position >= len(wanted):
+                    break
+                check_cancelled(cancel)
+        
+        selected = [names[i] for i in positions]
+        convert_numeric_columns(rows, [i for i, name in enumerate(selected) if name in numeric_columns], set())
+    
+    return pd.DataFrame(rows, columns=[names[i] for i in positions], index=wanted[:len(rows)])
+
+def _index_keys(stream, index, key_positions, chunk_size, steps, cancel, failed):
+    """
+    تمريرة واحدة على الورقة تضيف مفاتيحها إلى الفهرس (انظر _index_sheet)
+    
+    القيمة المرجعة:
+    tuple: (عدد الصفوف، أرقام الأعمدة التي تم تحويلها إلى أرقام) أو None إذا
+           تبين أن عاموداً من أعمدة المفتاح تم تحويل بعض قيمه لا يقبل التحويل
+    """
+    positions = range(len(stream.columns))
+    key_set = set(key_positions) if key_positions is not None else set(positions)
+    rows = 0
+    converted = set()
+    for chunk in stream.chunks(chunk_size):
+        failed_before = set(failed)
+        converted |= convert_numeric_columns(chunk, positions, failed)
+        if (failed - failed_before) & converted & key_set:
+            return None
+        
+        if key_positions is None:
+            keys = [row_digest(stream.columns, values) for values in chunk]
+        elif steps:
+            # توحيد كل جزء من المفتاح على مستوى الدفعة ثم تجميع الأجزاء لكل صف
+            parts = [_normalized_values([values[position] for values in chunk], steps)
+                     for position in key_positions]
+            if len(parts) == 1:
+                keys = parts[0]
+            else:
+                keys = [composite_digest(values, range(len(parts))) for values in zip(*parts)]
+        elif len(key_positions) == 1:
+            keys = [values[key_positions[0]] for values in chunk]
+        else:
+            keys = [composite_digest(values, key_positions) for values in chunk]
+        index.add_chunk(keys)
+        rows += len(chunk)
+        check_cancelled(cancel)
+    return rows, converted - failed
+
+def _index_sheet(task, index, key_columns, chunk_size, steps, cancel):
+    """
+    إضافة مفاتيح ورقة واحدة إلى الفهرس (انظر index_sheets)
+    
+    تُحول النصوص الرقمية إلى أرقام كما في القراءة بالذاكرة (انظر convert_numeric_columns).
+    إذا ظهرت قيمة غير رقمية في عامود مفتاح بعد تحويل بعض قيمه، يتم حذف الملف من
+    الفهرس وإعادة قراءته بدون تحويل هذا العامود.
+    """
+    result = {'columns': None, 'rows': 0, 'file_index': None, 'error': None, 'missing_column': False,
+              'numeric_columns': []}
+    failed = set()
+    while True:
+        # أخطاء الفتح تُعاد كنتائج كما في read_sheets، أما أخطاء منتصف القراءة فتُرفع
+        # لأن جزءاً من مفاتيح الملف يكون قد دخل الفهرس
+        try:
+            stream = SheetStream(task['path'], task.get('sheet'))
+        except Exception as e:
+            result['error'] = str(e)
+            return result
+        
+        with stream:
+            result['columns'] = stream.columns
+            if key_columns and any(column not in stream.columns for column in key_columns):
+                result['missing_column'] = True
+                return result
+            
+            result['file_index'] = index.start_file()
+            key_positions = [stream.columns.index(column) for column in key_columns] if key_columns else None
+            indexed = _index_keys(stream, index, key_positions, chunk_size, steps, cancel, failed)
+        
+        if indexed is not None:
+            result['rows'], converted = indexed
+            result['numeric_columns'] = [result['columns'][position] for position in sorted(converted)]
+            return result
+        index.discard_file()
+
+def index_sheets(tasks, key_columns=None, chunk_size=DEFAULT_CHUNK_SIZE, steps=(), on_progress=None, cancel=None):
+    """
+    بناء فهرس المفاتيح لمجموعة أوراق بقراءتها صفاً بصف على دفعات
+    
+    لا يتم الاحتفاظ بأي صف بعد إضافة مفتاحه إلى الفهرس. عند عدم تحديد عامود
+    للمقارنة يكون المفتاح بصمة الصف كاملاً (انظر row_digest)، وعند تحديد عدة
+    أعمدة يكون المفتاح بصمة أجزاء المفتاح بترتيبها.
+    
+    المعاملات:
+    tasks (list): مهام القراءة، كل مهمة تحتوي على 'path' و 'sheet' (اختياري)
+    key_columns (list): أعمدة المقارنة (None للمقارنة بجميع الأعمدة)
+    chunk_size (int): عدد الصفوف في كل دفعة
+    steps (tuple): خطوات توحيد قيم أعمدة المقارنة في كل دفعة (انظر core.normalize)
+    on_progress (callable): دالة تستقبل (عدد الملفات المقروءة، عدد الملفات) بعد قراءة كل ملف
+    cancel (CancelToken): إشارة الإيقاف، يتم التحقق منها بعد كل دفعة (ترفع ComparisonCancelled)
+    
+    القيمة المرجعة:
+    tuple: (KeyIndex، قائمة نتائج لكل مهمة بنفس الترتيب)
+           كل نتيجة تحتوي على 'columns' و 'rows' و 'file_index' (رقم الملف في الفهرس)
+           و 'error' (وصف خطأ الفتح) و 'missing_column' (عامود المقارنة غير موجود)
+           و 'numeric_columns' (الأعمدة التي تحولت نصوصها الرقمية إلى أرقام، لتمريرها إلى fetch_rows)
+    """
+    index = KeyIndex()
+    results = []
+    for done, task in enumerate(tasks, 1):
+        results.append(_index_sheet(task, index, key_columns, chunk_size, steps, cancel))
+        if on_progress is not None:
+            on_progress(done, len(tasks))
+    return index, results
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import pandas as pd
+
+DEFAULT_MAX_OPEN = 8
+
+class WorkbookPool:
+    """
+    مدير لملفات الإكسل المفتوحة خلال الجلسة
+    
+    يحتفظ بكائن pd.ExcelFile واحد لكل ملف حتى يتم فك ضغط الملف وقراءة جدول
+    النصوص المشتركة مرة واحدة فقط بين عرض أسماء الأوراق وقراءة العناوين والبيانات.
+    عند تجاوز العدد الأقصى يتم إغلاق الملف الأقل استخداماً، وعند تغير الملف
+    على القرص (وقت التعديل أو الحجم) يتم إعادة فتحه.
+    """
+    
+    def __init__(self, max_open=DEFAULT_MAX_OPEN):
+        """
+        المعاملات:
+        max_open (int): العدد الأقصى للملفات المفتوحة في نفس الوقت
+        """
+        self.max_open = max(1, max_open)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _signature(self, path):
+        """وقت تعديل الملف وحجمه لاكتشاف تغيره"""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _close_entry(self, entry):
+        """إغلاق ملف بعد انتهاء استخدامه الحالي"""
+        with entry['lock']:
+            entry['xls'].close()
+    
+    def _acquire(self, path):
+        """
+        الحصول على مدخل الملف (فتحه إذا لم يكن مفتوحاً أو إذا تغير)
+        
+        يتم فتح الملف خارج القفل العام حتى يمكن فتح عدة ملفات في نفس الوقت من
+        خيوط مختلفة (مثل خيوط تحميل الملفات في الواجهة الرسومية).
+        """
+        key = os.path.abspath(path)
+        signature = self._signature(path)
+        stale = []
+        opened = None
+        
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry['signature'] != signature:
+                    stale.append(self._entries.pop(key))
+                    entry = None
+                
+                if entry is None and opened is not None:
+                    entry, opened = opened, None
+                    self._entries[key] = entry
+                
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_open:
+                        stale.append(self._entries.popitem(last=False)[1])
+                    break
+            
+            opened = {'xls': pd.ExcelFile(path), 'signature': signature, 'lock': threading.Lock()}
+        
+        # الملف الذي فتحه خيط آخر في نفس الوقت يُغلق ويُستخدم المدخل الموجود
+        if opened is not None:
+            stale.append(opened)
+        for old_entry in stale:
+            self._close_entry(old_entry)
+        return entry
+    
+    @contextmanager
+    def open(self, path):
+        """
+        استخدام الملف المفتوح داخل كتلة with (لا يتم إغلاقه عند الخروج)
+        
+        يتم منع استخدام نفس الملف من خيطين في نفس الوقت لأن قراءة الأوراق
+        تعتمد على حالة الملف المفتوح.
+        """
+        entry = self._acquire(path)
+        with entry['lock']:
+            yield entry['xls']
+    
+    def sheet_names(self, path):
+        """أسماء أوراق العمل في الملف"""
+        with self.open(path) as xls:
+            return list(xls.sheet_names)
+    
+    def close(self, path):
+        """إغلاق ملف محدد (مثلاً عند إزالته من القائمة)"""
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(path), None)
+        if entry is not None:
+            self._close_entry(entry)
+    
+    def close_all(self):
+        """إغلاق جميع الملفات المفتوحة"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._close_entry(entry)
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._entries
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter, range_boundaries
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+from core.cancel import ComparisonCancelled, check_cancelled
+
+# عدد الصفوف المكتوبة بين كل تحقق من إشارة الإيقاف
+CANCEL_CHECK_ROWS = 1000
+
+def _thin_border():
+    """حدود رفيعة من جميع الجهات"""
+    return Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+
+def _fill(color):
+    """تعبئة بلون ثابت"""
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+def _report_styles():
+    """الأنماط المسماة المشتركة بين جميع خلايا التقرير"""
+    centered = Alignment(horizontal='center', vertical='center')
+    
+    definitions = {
+        'report_header': dict(font=Font(bold=True, color="FFFFFF"), fill=_fill("366092"), alignment=centered, border=_thin_border()),
+        'report_header_plain': dict(font=Font(bold=True, color="FFFFFF"), fill=_fill("366092"), alignment=centered),
+        'report_header_warning': dict(font=Font(bold=True, color="9C5700"), fill=_fill("FFEB9C"), alignment=centered, border=_thin_border()),
+        'report_header_error': dict(font=Font(bold=True, color="9C0006"), fill=_fill("FFC7CE"), alignment=centered, border=_thin_border()),
+        'report_data': dict(border=_thin_border()),
+        'report_total': dict(font=Font(bold=True), fill=_fill("D8E4BC")),
+        'report_title': dict(font=Font(bold=True, size=14, color="366092"), alignment=centered),
+        'report_main_title': dict(font=Font(bold=True, size=16, color="366092"), alignment=centered),
+        'report_description': dict(font=Font(italic=True), alignment=centered),
+        'report_note': dict(font=Font(italic=True)),
+        'report_no_data': dict(font=Font(italic=True, color="9C0006"), alignment=centered),
+        'report_label': dict(font=Font(bold=True)),
+        'report_section': dict(font=Font(bold=True, size=12, color="366092")),
+        'report_section_warning': dict(font=Font(bold=True, size=12, color="9C5700")),
+        'report_section_error': dict(font=Font(bold=True, size=12, color="9C0006")),
+        'report_success': dict(font=Font(color="006100"), fill=_fill("C6EFCE")),
+        'report_warning': dict(font=Font(color="9C5700"), fill=_fill("FFEB9C")),
+        'report_error': dict(font=Font(color="9C0006"), fill=_fill("FFC7CE")),
+    }
+    
+    styles = []
+    for name, attributes in definitions.items():
+        style = NamedStyle(name=name)
+        for attribute, value in attributes.items():
+            setattr(style, attribute, value)
+        styles.append(style)
+    return styles
+
+def text_width(value):
+    """طول القيمة كنص لحساب عرض العامود"""
+    return len(str(value))
+
+# التقارير السابقة كانت تحسب الخلايا الفارغة كنص "None"، لذلك لا يقل عرض أي عامود عن طوله
+EMPTY_CELL_WIDTH = text_width(None)
+
+def frame_widths(df, index=False):
+    """أقصى طول نصي لكل عامود في الجدول بما في ذلك العنوان (بدون إنشاء خلايا)"""
+    widths = []
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        width = text_width(df.columns[position])
+        if len(column) > 0:
+            width = max(width, int(column.astype(str).str.len().max()))
+        widths.append(width)
+    return widths
+
+def rows_widths(rows):
+    """أقصى طول نصي لكل عامود في قائمة صفوف صغيرة"""
+    widths = []
+    for row in rows:
+        for position, value in enumerate(row):
+            if isinstance(value, Cell):
+                value = value.value
+            elif isinstance(value, tuple):
+                value = value[0]
+            if value is None:
+                continue
+            while len(widths) <= position:
+                widths.append(0)
+            widths[position] = max(widths[position], text_width(value))
+    return widths
+
+def merge_widths(*width_lists):
+    """دمج قوائم عرض الأعمدة بأخذ الأقصى لكل عامود"""
+    merged = []
+    for widths in width_lists:
+        for position, width in enumerate(widths):
+            while len(merged) <= position:
+                merged.append(0)
+            merged[position] = max(merged[position], width)
+    return merged
+
+class StreamingReportWriter:
+    """
+    كاتب تقارير إكسل بنمط الكتابة فقط (write-only)
+    
+    تُكتب الصفوف مباشرة إلى الملف عند إضافتها باستخدام أنماط مسماة مشتركة،
+    لذلك يبقى استهلاك الذاكرة ثابتاً مهما كان حجم التقرير. يجب تحديد عرض
+    الأعمدة والخلايا المدمجة عند إنشاء الورقة وقبل إضافة الصفوف.
+    
+    عند إلغاء المقارنة أثناء الكتابة تُحذف الملفات المؤقتة للأوراق، ولا يظهر
+    ملف التقرير إلا بعد اكتمال حفظه.
+    """
+    
+    def __init__(self, cancel=None):
+        """
+        المعاملات:
+        cancel (CancelToken): إشارة الإيقاف، يتم التحقق منها كل CANCEL_CHECK_ROWS صف
+        """
+        self.wb = Workbook(write_only=True)
+        for style in _report_styles():
+            self.wb.add_named_style(style)
+        self.cancel = cancel
+        self.rows_written = 0
+        # الملف المؤقت المحفوظ إذا تعذر نقله إلى ملف الإخراج (مثل ملف مفتوح في إكسل)
+        self._saved_temp = None
+    
+    def check_cancelled(self):
+        """رفع ComparisonCancelled بعد حذف الأوراق المكتوبة جزئياً إذا طُلب الإيقاف"""
+        try:
+            check_cancelled(self.cancel)
+        except ComparisonCancelled:
+            self.discard()
+            raise
+    
+    def discard(self):
+        """حذف الملفات المؤقتة للأوراق والتقرير بدون حفظه"""
+        if self._saved_temp is not None:
+            try:
+                os.remove(self._saved_temp)
+            except OSError:
+                pass
+            self._saved_temp = None
+        for ws in self.wb.worksheets:
+            if ws._writer is None:
+                continue
+            try:
+                if not ws.closed:
+                    ws.close()
+                ws._writer.cleanup()
+            except (OSError, ValueError):
+                pass
+    
+    def create_sheet(self, title, widths=None, merged=None, right_to_left=False):
+        """
+        إنشاء ورقة جديدة
+        
+        المعاملات:
+        title (str): اسم الورقة (يتم اقتطاعه إلى 31 حرفاً)
+        widths (list): أطوال النصوص القصوى لكل عامود (يضاف إليها 2 كما في التقارير السابقة،
+                       وتشمل أعمدة الخلايا المدمجة بأقل عرض EMPTY_CELL_WIDTH)
+        merged (list): نطاقات الخلايا المدمجة مثل 'A1:E1'
+        right_to_left (bool): عرض الورقة من اليمين إلى اليسار
+        """
+        self.check_cancelled()
+        ws = self.wb.create_sheet(title=title[:31])
+        if widths is not None:
+            widths = list(widths)
+            for cell_range in merged or []:
+                last_column = range_boundaries(cell_range)[2]
+                widths.extend([0] * (last_column - len(widths)))
+            for position, width in enumerate(widths, 1):
+                ws.column_dimensions[get_column_letter(position)].width = max(width, EMPTY_CELL_WIDTH) + 2
+        for cell_range in merged or []:
+            ws.merged_cells.add(cell_range)
+        if right_to_left:
+            ws.sheet_view.rightToLeft = True
+        return ws
+    
+    def cell(self, ws, value, style=None):
+        """إنشاء خلية مؤقتة بنمط مسمى"""
+        cell = WriteOnlyCell(ws, value=value)
+        if style:
+            cell.style = style
+        return cell
+    
+    def append(self, ws, values=(), style=None):
+        """
+        إضافة صف إلى الورقة
+        
+        يمكن أن يكون كل عنصر قيمة عادية (يُطبق عليها النمط الافتراضي للصف إن وجد)
+        أو زوجاً (القيمة، اسم النمط) أو خلية جاهزة.
+        """
+        row = []
+        for value in values:
+            if isinstance(value, tuple):
+                row.append(self.cell(ws, *value))
+            elif isinstance(value, Cell) or style is None:
+                row.append(value)
+            else:
+                row.append(self.cell(ws, value, style))
+        ws.append(row)
+        self.rows_written += 1
+        if self.rows_written % CANCEL_CHECK_ROWS == 0:
+            self.check_cancelled()
+    
+    def append_frame(self, ws, df, header_style='report_header', data_style='report_data'):
+        """كتابة جدول كاملاً صفاً بصف بدون الاحتفاظ بالخلايا في الذاكرة"""
+        for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True)):
+            self.append(ws, row, header_style if r_idx == 0 else data_style)
+    
+    def save(self, output_file):
+        """
+        حفظ الملف (يمكن الحفظ مرة واحدة فقط)
+        
+        يُكتب التقرير إلى ملف مؤقت بجانب ملف الإخراج ثم يُستبدل به، لذلك لا يبقى
+        ملف تقرير ناقص إذا توقف الحفظ. إذا تعذر الاستبدال فقط يبقى الملف المؤقت
+        حتى يمكن الحفظ مرة أخرى باسم مختلف (أو حذفه باستدعاء discard).
+        """
+        self.check_cancelled()
+        if self._saved_temp is None:
+            temp_file = output_file + ".tmp"
+            try:
+                self.wb.save(temp_file)
+            except BaseException:
+                self.discard()
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                raise
+            self._saved_temp = temp_file
+        os.replace(self._saved_temp, output_file)
+        self._saved_temp = None